@@ -3,6 +3,14 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+ASGI profile: set ASYNC_VIEWS=True so the dashboard, calendar feed and kanban
+URLs use their async variants, and run an ASGI server, e.g.
+
+    ASYNC_VIEWS=True gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker
+
+(uvicorn is not in requirements.txt; add it on the ASGI host.) Compare the
+two code paths with `manage.py benchmark_async_views`.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
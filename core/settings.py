@@ -54,8 +54,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crm.metrics.MetricsMiddleware',
+    'crm.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'crm.routers.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +86,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# ASGI profile: serve the async dashboard/calendar/kanban variants (see core/asgi.py)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
 
 # Database - use DATABASE_URL for Production (Supabase), else SQLite
 DATABASES = {
@@ -93,14 +99,46 @@ DATABASES = {
     )
 }
 
+# Optional read replica for dashboard/KPI/report reads (crm/routers.py).
+# Locally: REPLICA_DATABASE_URL=sqlite:///replica.sqlite3 (a copy of db.sqlite3).
+REPLICA_DB_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+if os.getenv('REPLICA_DATABASE_URL'):
+    replica_url = os.getenv('REPLICA_DATABASE_URL')
+    DATABASES[REPLICA_DB_ALIAS] = dj_database_url.parse(
+        replica_url, conn_max_age=600, ssl_require=not replica_url.startswith('sqlite')
+    )
+    # Tests read the primary's test database through the replica alias
+    DATABASES[REPLICA_DB_ALIAS]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['crm.routers.ReplicaRouter']
+
+# Opt-in SQLite performance profile for tenants without DATABASE_URL:
+# WAL + tuned pragmas on every connection (crm/sqlite.py). Override single
+# pragmas with SQLITE_PRAGMAS, e.g. {'busy_timeout': 10000}.
+SQLITE_PERFORMANCE = os.getenv('SQLITE_PERFORMANCE', 'False') == 'True'
+if SQLITE_PERFORMANCE and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # BEGIN IMMEDIATE: writers queue on busy_timeout instead of failing on lock upgrade
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
 # Caching for Dashboard performance
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # LocMemCache that counts hits/misses for /metrics
+        'BACKEND': 'crm.metrics.InstrumentedLocMemCache',
         'LOCATION': 'unique-snowflake',
     }
 }
 
+# /metrics (crm/metrics.py): scrapers send "Authorization: Bearer <token>";
+# without a token only logged-in superusers can read it
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# N+1 detection (crm/nplusone.py): per request, flag query shapes repeated
+# NPLUSONE_THRESHOLD times - logged, or raised with NPLUSONE_RAISE. On under DEBUG.
+NPLUSONE_DETECT = os.getenv('NPLUSONE_DETECT', str(DEBUG)) == 'True'
+NPLUSONE_RAISE = os.getenv('NPLUSONE_RAISE', 'False') == 'True'
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -158,6 +196,9 @@ WHITENOISE_MANIFEST_STRICT = False
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Columnar analytics snapshots (manage.py export_snapshot)
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', BASE_DIR / 'snapshots')
+
 # Email Configuration — Gmail SMTP
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -22,12 +22,18 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
+from crm.metrics import metrics_view
 from crm.views import (
     generate_invoice_pdf, dashboard, kanban_board,
     update_kanban_item, calendar_view, calendar_events_api, quick_add_task,
-    health_check
+    health_check, suggest_api, pnl_report_view, receivables_report_view,
+    client_statement, client_statement_api, kanban_events,
+    dashboard_async, kanban_board_async, update_kanban_item_async, calendar_events_api_async, quick_add_task_async,
 )
 
+# ASGI profile: the same URLs, served by the async variants
+ASYNC = settings.ASYNC_VIEWS
+
 urlpatterns = [
     # Root Redirect
     path('', RedirectView.as_view(url='/dashboard/', permanent=True)),
@@ -36,20 +42,35 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 
     # Custom Dashboard
-    path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/', dashboard_async if ASYNC else dashboard, name='dashboard'),
 
     # Calendar
     path('calendar/', calendar_view, name='calendar_view'),
-    path('api/events/', calendar_events_api, name='calendar_events_api'),
+    path('api/events/', calendar_events_api_async if ASYNC else calendar_events_api, name='calendar_events_api'),
+
+    # Typeahead (trigram name lookup)
+    path('api/suggest/', suggest_api, name='suggest_api'),
+
+    # Profit & Loss report (JSON / CSV)
+    path('reports/pnl/', pnl_report_view, name='pnl_report'),
+    path('reports/receivables/', receivables_report_view, name='receivables_report'),
 
     # Invoice Download
     path('invoice/<int:client_id>/', generate_invoice_pdf, name='generate_invoice_pdf'),
 
+    # Client Statement (running balances, keyset-paginated)
+    path('statement/<int:client_id>/', client_statement, name='client_statement'),
+    path('api/statement/<int:client_id>/', client_statement_api, name='client_statement_api'),
+
     # Kanban Board
-    path('kanban/', kanban_board, name='kanban_board'),
-    path('kanban/update/<str:item_type>/<int:item_id>/', update_kanban_item, name='update_kanban_item'),
-    path('kanban/quick-add/', quick_add_task, name='quick_add_task'),
+    path('kanban/', kanban_board_async if ASYNC else kanban_board, name='kanban_board'),
+    path('kanban/update/<str:item_type>/<int:item_id>/', update_kanban_item_async if ASYNC else update_kanban_item, name='update_kanban_item'),
+    path('kanban/quick-add/', quick_add_task_async if ASYNC else quick_add_task, name='quick_add_task'),
+    path('kanban/events/', kanban_events, name='kanban_events'),
     
     # Health Check
     path('health/', health_check, name='health_check'),
+
+    # Prometheus scrape endpoint (crm/metrics.py)
+    path('metrics', metrics_view, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
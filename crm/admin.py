@@ -1,15 +1,24 @@
 
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, reverse
 from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
 from django.utils.html import format_html, mark_safe
 from django.utils import timezone
-from .models import Client, Lead, Project, Task, TaskChecklist, Interaction, Transaction, Document, KPITarget
+from .models import Client, Lead, Project, Task, TaskChecklist, Interaction, Transaction, Document, KPITarget, KPISnapshot, ReminderLog, LeadCohort, BoardEvent
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 import datetime
 from .views import import_leads
+from .kpi import attach_actuals, month_bounds, is_closed_month
+from .pagination import KeysetPaginationMixin, PaginatedInlineMixin, InlinePagesMixin
+from .search import FullTextSearchMixin
+from .autocomplete import RLSForeignKeyMixin, autocomplete_view
+from .filters import CountedChoicesFilter, DueAmountFilter, LazyRelatedFilter, bump_facet_version, facet_version
+from .exports import ExportActionsMixin
+from .funnel import changelist_metrics
+from .rollups import revenue_rollup
+from .rls_utils import get_filtered_queryset
+from .metrics import observe_timing
 from django.shortcuts import redirect as _redirect
 
 # Redirect /admin/ index to /dashboard/
@@ -17,13 +26,25 @@ def _admin_index(request, extra_context=None):
     return _redirect('/dashboard/')
 
 admin.site.index = _admin_index
+# Autocomplete lookups honour RLS and let staff search users
+admin.site.autocomplete_view = autocomplete_view(admin.site)
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ExportActionsMixin, RLSForeignKeyMixin, FullTextSearchMixin, KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ('date', 'transaction_type', 'amount', 'client', 'project', 'created_by')
-    list_filter = ('transaction_type', 'date', 'client')
+    # Nullable FKs aren't joined by default; Project.__str__ also needs its client
+    list_select_related = ('client', 'project__client', 'created_by')
+    list_filter = (('transaction_type', CountedChoicesFilter), 'date', ('client', LazyRelatedFilter))
     search_fields = ('description', 'client__name', 'project__project_name')
+    fulltext_related = ('client', 'project')
+    autocomplete_fields = ('client', 'project', 'created_by')
     date_hierarchy = 'date'
+    actions = ['export_csv', 'export_xlsx']
+    export_fields = (
+        ('ID', 'id'), ('Date', 'date'), ('Type', 'transaction_type'), ('Amount', 'amount'),
+        ('Client', 'client__name'), ('Project', 'project__project_name'),
+        ('Description', 'description'), ('Created By', 'created_by__username'), ('Created At', 'created_at'),
+    )
 
     change_list_template = "admin/transaction_changelist.html"
 
@@ -47,36 +68,59 @@ class TransactionAdmin(admin.ModelAdmin):
         response.context_data['summary'] = metrics
         return response
 
-class TransactionInline(admin.TabularInline):
+class TransactionInline(PaginatedInlineMixin, RLSForeignKeyMixin, admin.TabularInline):
     model = Transaction
+    inline_ordering = ('-date', '-id')
     extra = 1
     fields = ('date', 'transaction_type', 'amount', 'description', 'created_by')
+    autocomplete_fields = ('created_by',)
     readonly_fields = ('created_at',)
     
     def get_changeform_initial_data(self, request):
         return {'created_by': request.user}
 
-class ProjectInline(admin.TabularInline):
+class ProjectInline(PaginatedInlineMixin, admin.TabularInline):
     model = Project
+    inline_ordering = ('-created_at', '-id')
     extra = 1
     fields = ('project_name', 'status', 'deadline', 'progress_percentage')
     show_change_link = True
 
 # --- INTERACTION INLINE ---
-class InteractionInline(admin.TabularInline):
+class InteractionInline(PaginatedInlineMixin, RLSForeignKeyMixin, admin.TabularInline):
     model = Interaction
+    inline_ordering = ('-created_at', '-id')
     extra = 1
     readonly_fields = ('created_at',)
     fields = ('interaction_type', 'notes', 'created_by', 'created_at')
+    autocomplete_fields = ('created_by',)
 
     def get_changeform_initial_data(self, request):
         return {'created_by': request.user}
 
+@admin.register(Interaction)
+class InteractionAdmin(ExportActionsMixin, RLSForeignKeyMixin, KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ('interaction_type', 'client', 'lead', 'created_by', 'created_at')
+    list_filter = (('interaction_type', CountedChoicesFilter), 'created_at', ('created_by', LazyRelatedFilter))
+    search_fields = ('notes', 'client__name', 'lead__name')
+    autocomplete_fields = ('client', 'lead', 'created_by')
+    date_hierarchy = 'created_at'
+    actions = ['export_csv', 'export_xlsx']
+    export_fields = (
+        ('ID', 'id'), ('Type', 'interaction_type'), ('Client', 'client__name'), ('Lead', 'lead__name'),
+        ('Notes', 'notes'), ('Created By', 'created_by__username'), ('Created At', 'created_at'),
+    )
+
+    def get_queryset(self, request):
+        return get_filtered_queryset(request.user, Interaction).select_related('client', 'lead', 'created_by')
+
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(RLSForeignKeyMixin, KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ('title', 'project', 'client', 'file_preview_modern', 'uploaded_at', 'download_link_modern')
-    list_filter = ('uploaded_at', 'project', 'client')
+    list_select_related = ('project__client', 'client')
+    list_filter = ('uploaded_at', ('project', LazyRelatedFilter), ('client', LazyRelatedFilter))
     search_fields = ('title', 'project__project_name', 'client__name')
+    autocomplete_fields = ('project', 'client', 'lead', 'uploaded_by')
     readonly_fields = ('file_preview_modern',)
 
     @admin.display(description="Preview")
@@ -125,10 +169,12 @@ class DocumentAdmin(admin.ModelAdmin):
         except (ValueError, AttributeError):
             return "-"
 
-class DocumentInline(admin.TabularInline):
+class DocumentInline(PaginatedInlineMixin, RLSForeignKeyMixin, admin.TabularInline):
     model = Document
+    inline_ordering = ('-uploaded_at', '-id')
     extra = 1
     fields = ('title', 'file', 'file_preview_modern', 'uploaded_by')
+    autocomplete_fields = ('uploaded_by',)
     readonly_fields = ('file_preview_modern',)
 
     @admin.display(description="Preview")
@@ -149,18 +195,28 @@ class DocumentInline(admin.TabularInline):
 
 # --- CLIENT ADMIN: Financials & Revenue Chart ---
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'company_name', 'get_active_projects_count', 'total_payable', 'paid_amount', 'due_amount', 'get_assigned_staff', 'download_invoice')
+class ClientAdmin(ExportActionsMixin, InlinePagesMixin, FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'company_name', 'get_active_projects_count', 'total_payable', 'paid_amount', 'due_amount', 'get_assigned_staff', 'download_invoice', 'view_statement')
     search_fields = ('name', 'company_name')
+    list_filter = (DueAmountFilter,)
     readonly_fields = ('paid_amount',) 
     filter_horizontal = ('assigned_to',)
     change_list_template = "admin/client_changelist.html"
     inlines = [InteractionInline, ProjectInline, TransactionInline, DocumentInline] # Added Projects
+    actions = ['export_csv', 'export_xlsx']
+    export_fields = (
+        ('ID', 'id'), ('Name', 'name'), ('Company', 'company_name'), ('Services', 'services'),
+        ('Total Payable', 'total_payable'), ('Paid', 'paid_amount'), ('Due', 'due_amount'), ('Created At', 'created_at'),
+    )
 
     @admin.display(description="Invoice")
     def download_invoice(self, obj):
         return format_html('<a class="button" href="/invoice/{}/" target="_blank" style="background-color: #447e9b; color: white; padding: 5px 10px; border-radius: 4px; text-decoration: none;">Download Invoice</a>', obj.id)
 
+    @admin.display(description="Statement")
+    def view_statement(self, obj):
+        return format_html('<a class="button" href="{}" style="background-color: #1f2937; color: white; padding: 5px 10px; border-radius: 4px; text-decoration: none;">Statement</a>', reverse('client_statement', args=[obj.id]))
+
     @admin.display(description="Assigned Staff")
     def get_assigned_staff(self, obj):
         return ", ".join([user.username for user in obj.assigned_to.all()])
@@ -178,7 +234,7 @@ class ClientAdmin(admin.ModelAdmin):
         start = time.time()
         
         # Simple aggregated metrics (Cached for 15 min)
-        cache_key = "admin_client_metrics_simple"
+        cache_key = f"admin_client_metrics_simple_{facet_version(Client)}"
         metrics = cache.get(cache_key)
         
         if not metrics:
@@ -203,7 +259,7 @@ class ClientAdmin(admin.ModelAdmin):
         extra_context['chart_labels'] = []
         extra_context['chart_data'] = []
 
-        print(f"DEBUG: Client changelist view metrics took {time.time() - start:.4f}s")
+        observe_timing('client_changelist.metrics', time.time() - start)
         return super().changelist_view(request, extra_context=extra_context)
 
     def get_queryset(self, request):
@@ -224,29 +280,105 @@ class ClientAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         if not change and not obj.assigned_to.exists():
             obj.assigned_to.add(request.user)
-        print(f"DEBUG: Client save_model took {time.time() - start:.4f}s")
+        observe_timing('client_admin.save_model', time.time() - start)
 
 # --- LEAD ADMIN: Conversion & Performance Chart ---
 @admin.register(Lead)
-class LeadAdmin(admin.ModelAdmin):
+class LeadAdmin(ExportActionsMixin, InlinePagesMixin, FullTextSearchMixin, KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ('name', 'source', 'colored_status', 'next_follow_up', 'assigned_to', 'created_at')
-    list_filter = ('status', 'assigned_to', 'next_follow_up')
+    list_filter = (('status', CountedChoicesFilter), ('assigned_to', LazyRelatedFilter), 'next_follow_up')
     search_fields = ('name', 'company_name', 'source', 'contact_info')
+    autocomplete_fields = ('assigned_to',)
     change_list_template = "admin/lead_changelist.html"
-    actions = ['convert_to_client']
+    actions = ['convert_to_client', 'export_csv', 'export_xlsx']
+    export_fields = (
+        ('ID', 'id'), ('Name', 'name'), ('Company', 'company_name'), ('Source', 'source'),
+        ('Contact', 'contact_info'), ('Status', 'status'), ('Next Follow-up', 'next_follow_up'),
+        ('Assigned To', 'assigned_to__username'), ('Created At', 'created_at'), ('Converted At', 'converted_at'),
+    )
     inlines = [InteractionInline, DocumentInline] # Interaction + Documents
 
     @admin.action(description='Convert selected leads to Clients')
     def convert_to_client(self, request, queryset):
-        converted_count = 0
-        for lead in queryset:
-            if lead.status == 'CONVERTED':
-                continue
-            
-            self.process_conversion(lead)
-            converted_count += 1
-            
-        self.message_user(request, f"{converted_count} leads successfully converted to Clients.")
+        leads = list(queryset.exclude(status='CONVERTED'))
+        clients = self.bulk_conversion(leads)
+        self.message_user(request, f"{len(clients)} leads successfully converted to Clients.")
+
+    def bulk_conversion(self, leads, batch_size=500):
+        """
+        Set-based version of process_conversion() for many leads at once: one
+        atomic block, bulk inserts/updates, a single cache invalidation and one
+        digest email instead of a notification per client. The leads are
+        locked and re-read first, so overlapping conversions (or a stale
+        selection) never convert a lead twice.
+        """
+        from django.db import transaction
+        from django.db.models import Case, When, Value, IntegerField
+        from .rollups import refresh_revenue_month
+        from .signals import clear_dashboard_cache, notify_converted_clients
+        from .suggest import index_instance
+
+        if not leads:
+            return []
+
+        converted_at = timezone.now()
+        with transaction.atomic():
+            leads = list(
+                Lead.objects.select_for_update()
+                .filter(pk__in=[lead.pk for lead in leads]).exclude(status='CONVERTED').order_by('pk')
+            )
+            if not leads:
+                return []
+
+            # 1. Clients (bulk_create skips post_save: no per-client email or cache clear)
+            clients = Client.objects.bulk_create([
+                Client(
+                    name=lead.name or lead.source,
+                    company_name=lead.company_name or lead.name or lead.source,
+                    services='Consulting',  # Default service
+                )
+                for lead in leads
+            ], batch_size=batch_size)
+            client_for_lead = {lead.pk: client.pk for lead, client in zip(leads, clients)}
+
+            # 2. Assigned staff via one insert into the M2M through table
+            Through = Client.assigned_to.through
+            Through.objects.bulk_create([
+                Through(client_id=client_for_lead[lead.pk], user_id=lead.assigned_to_id)
+                for lead in leads if lead.assigned_to_id
+            ], batch_size=batch_size)
+
+            # 3. Interaction history and documents follow the lead to its client
+            lead_ids = list(client_for_lead)
+            for i in range(0, len(lead_ids), batch_size):
+                chunk = lead_ids[i:i + batch_size]
+                client_case = Case(
+                    *[When(lead_id=lid, then=Value(client_for_lead[lid])) for lid in chunk],
+                    output_field=IntegerField(),
+                )
+                Interaction.objects.filter(lead_id__in=chunk).update(client_id=client_case)
+                Document.objects.filter(lead_id__in=chunk).update(client_id=client_case, lead=None)
+
+            # 4. Leads marked converted in one bulk UPDATE
+            for lead in leads:
+                lead.status = 'CONVERTED'
+                lead.converted_at = converted_at
+            Lead.objects.bulk_update(leads, ['status', 'converted_at'], batch_size=batch_size)
+
+            # 5. Bulk writes send no signals: do their cache, rollup and index work once
+            def after_commit():
+                clear_dashboard_cache(None)
+                for model in (Lead, Client, Document):
+                    bump_facet_version(model)
+                for month in {timezone.localdate(client.created_at).replace(day=1) for client in clients}:
+                    refresh_revenue_month(month)
+                for client in clients:
+                    index_instance('client', client)
+                notify_converted_clients(clients)
+
+            transaction.on_commit(after_commit)
+
+        return clients
 
     def process_conversion(self, lead):
         # Create Client from Lead
@@ -292,37 +424,14 @@ class LeadAdmin(admin.ModelAdmin):
         return format_html('<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 4px; font-weight: bold;">{}</span>', colors.get(obj.status, '#777'), obj.get_status_display())
 
     def changelist_view(self, request, extra_context=None):
-        today = timezone.now().date()
-        follow_up_count = Lead.objects.filter(next_follow_up=today).count()
-        
-        total_leads = Lead.objects.count()
-        converted_leads = Lead.objects.filter(status='CONVERTED').count()
-        conversion_rate = round((converted_leads / total_leads * 100), 2) if total_leads > 0 else 0
-
-        staff_performance = (
-            Lead.objects.filter(status='CONVERTED')
-            .values('assigned_to__username')
-            .annotate(total=Count('id'))
-            .order_by('-total')[:3]
-        )
-
-        revenue_data = (
-            Client.objects.annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(total=Sum('total_payable'))
-            .order_by('month')
-        )
-        chart_labels = [entry['month'].strftime('%b %Y') for entry in revenue_data]
-        chart_data = [float(entry['total']) for entry in revenue_data]
+        # Counters and funnel (crm.funnel) and the revenue rollup (crm.rollups)
+        # are cached, so paging/filtering/searching only pays for the list
+        revenue = revenue_rollup()
 
         extra_context = extra_context or {}
-        extra_context['today_follow_ups'] = follow_up_count
-        extra_context['conversion_rate'] = conversion_rate
-        extra_context['total_leads'] = total_leads
-        extra_context['converted_leads'] = converted_leads
-        extra_context['staff_performance'] = staff_performance
-        extra_context['chart_labels'] = chart_labels
-        extra_context['chart_data'] = chart_data
+        extra_context.update(changelist_metrics(timezone.localdate()))
+        extra_context['chart_labels'] = [month.strftime('%b %Y') for month in revenue]
+        extra_context['chart_data'] = list(revenue.values())
         
         return super().changelist_view(request, extra_context=extra_context)
 
@@ -344,13 +453,16 @@ class TaskInline(admin.TabularInline):
     model = Task
     extra = 1 
     fields = ('task_name', 'assigned_to', 'priority', 'status', 'due_date')
+    autocomplete_fields = ('assigned_to',)
 
 # --- PROJECT ADMIN: Progress Tracking with Inline Tasks ---
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(InlinePagesMixin, RLSForeignKeyMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('project_name', 'client', 'colored_progress', 'status', 'deadline')
-    list_filter = ('status', 'client')
+    list_filter = (('status', CountedChoicesFilter), ('client', LazyRelatedFilter))
     search_fields = ('project_name', 'client__name')
+    fulltext_related = ('client',)
+    autocomplete_fields = ('client',)
     # NOTUN: Eita add korle Project-er bhetorei Task list dekhabe
     inlines = [TaskInline, DocumentInline] 
 
@@ -360,12 +472,6 @@ class ProjectAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(client__assigned_to=request.user).distinct()
 
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "client":
-            if not (request.user.is_superuser or request.user.groups.filter(name='Manager').exists()):
-                kwargs["queryset"] = Client.objects.filter(assigned_to=request.user).distinct()
-        return super().formfield_for_foreignkey(db_field, request, **kwargs) 
-
     @admin.display(description="Progress")
     def colored_progress(self, obj):
         color = "#28a745" if obj.progress_percentage > 70 else "#ffc107"
@@ -386,11 +492,20 @@ class TaskChecklistInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ExportActionsMixin, RLSForeignKeyMixin, KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ('task_name', 'priority', 'project', 'assigned_to', 'status', 'due_date')
-    list_filter = ('status', 'priority', 'assigned_to', 'due_date', 'project')
+    list_select_related = ('project__client', 'assigned_to')
+    list_filter = (('status', CountedChoicesFilter), ('priority', CountedChoicesFilter),
+                   ('assigned_to', LazyRelatedFilter), 'due_date', ('project', LazyRelatedFilter))
     search_fields = ('task_name', 'project__project_name')
+    autocomplete_fields = ('project', 'assigned_to')
     inlines = [TaskChecklistInline]
+    actions = ['export_csv', 'export_xlsx']
+    export_fields = (
+        ('ID', 'id'), ('Task', 'task_name'), ('Project', 'project__project_name'),
+        ('Client', 'project__client__name'), ('Assigned To', 'assigned_to__username'),
+        ('Status', 'status'), ('Priority', 'priority'), ('Due Date', 'due_date'),
+    )
 
 
 # ══════════════════════════════════════════════════════════
@@ -404,7 +519,7 @@ class KPITargetAdmin(admin.ModelAdmin):
                     'interactions_progress', 'revenue_progress', 'overall_badge')
     list_filter = ('month', 'staff')
     search_fields = ('staff__username',)
-    autocomplete_fields = []
+    autocomplete_fields = ('staff',)
 
     fieldsets = (
         ('Staff & Month', {
@@ -437,6 +552,13 @@ class KPITargetAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    def get_changelist_instance(self, request):
+        # Prime every row's actuals in one batch per month so the progress
+        # columns below don't query per row
+        cl = super().get_changelist_instance(request)
+        attach_actuals(cl.result_list, request)
+        return cl
+
     # ── Display helpers ───────────────────────────────────────────────
     @admin.display(description='Month')
     def month_display(self, obj):
@@ -513,15 +635,13 @@ class KPITargetAdmin(admin.ModelAdmin):
             next_year, next_month = selected_year, selected_month + 1
 
         # ── Build KPI card data ────────────────────────────────────────
-        if request.user.is_superuser or request.user.groups.filter(name='Manager').exists():
-            kpi_qs = KPITarget.objects.filter(
-                month__year=selected_year, month__month=selected_month
-            ).select_related('staff')
-        else:
-            kpi_qs = KPITarget.objects.filter(
-                staff=request.user,
-                month__year=selected_year, month__month=selected_month
-            ).select_related('staff')
+        month_start, month_end = month_bounds(selected_date)
+        kpi_qs = KPITarget.objects.filter(
+            month__gte=month_start, month__lt=month_end
+        ).select_related('staff')
+        if not (request.user.is_superuser or request.user.groups.filter(name='Manager').exists()):
+            kpi_qs = kpi_qs.filter(staff=request.user)
+        kpi_qs = attach_actuals(list(kpi_qs), request)
 
         kpi_cards = []
         for kpi in kpi_qs:
@@ -544,9 +664,65 @@ class KPITargetAdmin(admin.ModelAdmin):
         extra_context = extra_context or {}
         extra_context['kpi_cards']          = kpi_cards
         extra_context['selected_month']     = selected_date.strftime('%B %Y')
+        extra_context['is_closed_month']    = is_closed_month(selected_date)
         extra_context['prev_url']           = f'?kpi_year={prev_year}&kpi_month={prev_month}'
         extra_context['next_url']           = f'?kpi_year={next_year}&kpi_month={next_month}'
         extra_context['is_manager']         = (
             request.user.is_superuser or request.user.groups.filter(name='Manager').exists()
         )
         return super().changelist_view(request, extra_context=extra_context)
+
+
+# --- KPI SNAPSHOT ADMIN (frozen actuals for closed months, read-only) ---
+@admin.register(KPISnapshot)
+class KPISnapshotAdmin(admin.ModelAdmin):
+    list_display = ('staff', 'month', 'leads', 'tasks', 'interactions', 'revenue', 'frozen_at')
+    list_filter = ('month', 'staff')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# --- REMINDER LOG ADMIN (read-only audit of send_reminders) ---
+@admin.register(ReminderLog)
+class ReminderLogAdmin(admin.ModelAdmin):
+    list_display = ('sent_on', 'staff', 'follow_up_count', 'overdue_task_count', 'created_at')
+    list_filter = ('sent_on', 'staff')
+    date_hierarchy = 'sent_on'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# --- LEAD COHORT ADMIN (funnel table written by refresh_lead_cohorts, read-only) ---
+@admin.register(LeadCohort)
+class LeadCohortAdmin(admin.ModelAdmin):
+    list_display = ('cohort_month', 'source', 'staff', 'total', 'cold', 'warm', 'hot', 'converted', 'refreshed_at')
+    list_filter = ('cohort_month', 'staff')
+    list_select_related = ('staff',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# --- BOARD EVENT ADMIN (kanban change journal streamed by kanban_events, read-only) ---
+@admin.register(BoardEvent)
+class BoardEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'board', 'kind', 'object_id', 'client', 'created_by', 'created_at')
+    list_filter = ('board', 'kind')
+    list_select_related = ('client', 'created_by')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -6,3 +6,6 @@ class CrmConfig(AppConfig):
 
     def ready(self):
         import crm.signals
+        import crm.sqlite
+        import crm.metrics
+        import crm.nplusone
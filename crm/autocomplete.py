@@ -0,0 +1,67 @@
+"""
+RLS-aware autocomplete for the crm admin.
+
+Foreign keys listed in a ModelAdmin/inline's `autocomplete_fields` render as
+select2 widgets that only load the selected option, and fetch the rest from
+/admin/autocomplete/ as the user types. That endpoint searches through the
+related model's own ModelAdmin (get_queryset + get_search_results), so a Sales
+Agent only ever sees the clients, leads and projects they are assigned to.
+"""
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth.models import User
+
+from .models import Project, Task
+from .rls_utils import get_filtered_queryset
+
+# Relations each model's __str__ dereferences
+LABEL_RELATED = {
+    Project: ('client',),
+    Task: ('project',),
+}
+
+
+class RLSAutocompleteJsonView(AutocompleteJsonView):
+    """
+    Admin autocomplete endpoint. Staff may look up (active) users to assign
+    work to without needing the auth.view_user permission.
+    """
+
+    def has_perm(self, request, obj=None):
+        if self.model_admin.model is User:
+            return request.user.is_active and request.user.is_staff
+        return super().has_perm(request, obj)
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        related = LABEL_RELATED.get(qs.model)
+        if related:
+            qs = qs.select_related(*related)
+        if qs.model is User:
+            qs = qs.filter(is_active=True)
+        if not qs.ordered:
+            # Stable pages for select2's infinite scroll
+            qs = qs.order_by('pk')
+        return qs
+
+
+def autocomplete_view(admin_site):
+    def view(request):
+        return RLSAutocompleteJsonView.as_view(admin_site=admin_site)(request)
+    return view
+
+
+class RLSForeignKeyMixin:
+    """
+    ModelAdmin/inline mixin: restrict foreign-key choices to rows the user may
+    see, so a posted id outside their scope fails validation, and join the
+    relations the option labels need.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if 'queryset' not in kwargs and db_field.related_model is not User:
+            model = db_field.related_model
+            qs = get_filtered_queryset(request.user, model)
+            if model in LABEL_RELATED:
+                qs = qs.select_related(*LABEL_RELATED[model])
+            kwargs['queryset'] = qs.distinct()
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
@@ -0,0 +1,190 @@
+"""
+Kanban change feed.
+
+The kanban update paths (card moves, task quick-adds) and the project
+progress signal append BoardEvent rows; views.kanban_events streams them as
+server-sent events so open boards patch cards in place instead of
+reloading. The event id is the cursor: boards start from the id they were
+rendered at and EventSource resends it as Last-Event-ID on reconnect.
+
+Each connection only holds its cursor and one batch of at most
+STREAM_BATCH events, and ends after STREAM_MAX_SECONDS (the browser
+reconnects), so memory per connection is bounded. Under WSGI a held-open
+request would tie up a worker, so the endpoint answers at once with the
+pending batch (or nothing) and a POLL_RETRY_MS reconnect delay.
+"""
+import asyncio
+import datetime
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import BoardEvent, Client
+
+STREAM_POLL_SECONDS = 1
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = 300
+STREAM_BATCH = 100
+# Reconnect delay sent to EventSource (ms): after a stream ends, and between WSGI polls
+RETRY_MS = 1000
+POLL_RETRY_MS = 5000
+RETENTION = datetime.timedelta(days=2)
+PRUNE_EVERY = 1000
+
+
+def task_card(task):
+    return {
+        'id': task.id, 'status': task.status, 'task_name': task.task_name, 'priority': task.priority,
+        'project_name': task.project.project_name,
+        'assigned_to': task.assigned_to.username if task.assigned_to else None,
+        'due_date': task.due_date,
+    }
+
+
+def project_card(project):
+    return {
+        'id': project.id, 'status': project.status, 'project_name': project.project_name,
+        'client_name': project.client.name, 'progress': project.progress_percentage,
+        'deadline': project.deadline,
+    }
+
+
+def _record(board, kind, obj, client_id, payload, user=None):
+    event = BoardEvent.objects.create(
+        board=board, kind=kind, object_id=obj.id, client_id=client_id,
+        payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+        created_by=user if user and user.is_authenticated else None,
+    )
+    if event.id % PRUNE_EVERY == 0:
+        BoardEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+    return event
+
+
+def record_task_event(kind, task, user=None):
+    """Journal a task card change ('MOVED' or 'ADDED')."""
+    return _record('tasks', kind, task, task.project.client_id, task_card(task), user)
+
+
+def record_project_event(kind, project, user=None):
+    """Journal a project card change ('MOVED')."""
+    return _record('projects', kind, project, project.client_id, project_card(project), user)
+
+
+def record_progress(project):
+    return _record('projects', 'PROGRESS', project, project.client_id, {
+        'id': project.id, 'progress': project.progress_percentage,
+    })
+
+
+def latest_event_id():
+    return BoardEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def next_events(user, is_manager, board, after):
+    """
+    The next batch of `board` events after id `after`: (new cursor, the
+    ones `user` may see, whether more are waiting). RLS (by client) is
+    applied after the seek, so the cursor also moves past events the user
+    can't see.
+    """
+    rows = list(
+        BoardEvent.objects.filter(board=board, id__gt=after)
+        .order_by('id').values('id', 'kind', 'payload', 'client_id')[:STREAM_BATCH]
+    )
+    if not rows:
+        return after, rows, False
+    if not is_manager:
+        allowed = set(Client.objects.filter(
+            assigned_to=user, id__in={row['client_id'] for row in rows}
+        ).values_list('id', flat=True))
+        visible = [row for row in rows if row['client_id'] in allowed]
+    else:
+        visible = rows
+    return rows[-1]['id'], visible, len(rows) == STREAM_BATCH
+
+
+def _stream_next_events(*args):
+    try:
+        return next_events(*args)
+    finally:
+        close_old_connections()
+
+
+def sse(event=None, data=None, event_id=None, comment=None):
+    lines = []
+    if comment:
+        lines.append(f': {comment}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _format(rows, cursor):
+    messages = [sse(row['kind'].lower(), row['payload'], event_id=row['id']) for row in rows]
+    if not rows or rows[-1]['id'] != cursor:
+        # An id-only message moves EventSource's Last-Event-ID past hidden events
+        messages.append(sse(event_id=cursor))
+    return messages
+
+
+async def start_cursor(after):
+    """
+    Where a connection starts: `after` (Last-Event-ID / ?after=), or now.
+    Returns (cursor, first message), the message being a 'reset' when
+    events after `after` were already pruned - the board must reload.
+    """
+    bounds = await BoardEvent.objects.aaggregate(first=Min('id'), last=Max('id'))
+    last = bounds['last'] or 0
+    if after is None or after > last:
+        return last, sse(comment='ready', event_id=last)
+    if bounds['first'] and after < bounds['first'] - 1:
+        return last, sse('reset', {}, event_id=last)
+    return after, None
+
+
+async def event_stream(user, is_manager, board, after):
+    """Async generator of SSE messages for an ASGI connection."""
+    yield f'retry: {RETRY_MS}\n\n'
+    cursor, first = await start_cursor(after)
+    if first:
+        yield first
+
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < STREAM_MAX_SECONDS:
+        previous = cursor
+        # On a worker thread of its own: open boards don't queue on the one shared sync thread
+        cursor, rows, more = await sync_to_async(_stream_next_events, thread_sensitive=False)(
+            user, is_manager, board, cursor
+        )
+        if cursor != previous:
+            for message in _format(rows, cursor):
+                yield message
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_SECONDS:
+            yield sse(comment='keepalive')
+            last_sent = time.monotonic()
+
+        if not more:
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+
+async def poll(user, is_manager, board, after):
+    """One response body for WSGI: the pending batch, or nothing, without waiting."""
+    messages = [f'retry: {POLL_RETRY_MS}\n\n']
+    cursor, first = await start_cursor(after)
+    if first:
+        return ''.join(messages + [first])
+    previous = cursor
+    cursor, rows, more = await sync_to_async(next_events)(user, is_manager, board, cursor)
+    if cursor != previous:
+        messages += _format(rows, cursor)
+    return ''.join(messages)
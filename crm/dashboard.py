@@ -0,0 +1,187 @@
+"""
+Dashboard sections.
+
+The dashboard context is built from independent sections (counts,
+financials, deadlines, charts, KPI maps). views.dashboard runs them one
+after another; views.dashboard_async runs them concurrently, each in a
+worker thread with its own database connection, so the page costs about as
+much as its slowest section.
+
+Django's async ORM (acount(), aiterator(), ...) still executes every query
+on the single thread-sensitive executor, one at a time, so concurrent
+sections are offloaded with sync_to_async(thread_sensitive=False) instead.
+Sections return plain lists/values - nothing lazy is left for the template
+to query.
+"""
+import asyncio
+import calendar
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, Sum
+
+from .kpi import attach_actuals
+from .metrics import timed
+from .models import Client, Interaction, KPITarget, Lead, Project, Task, Transaction
+from .rls_utils import get_filtered_queryset
+
+
+def counts_section(user, is_manager, today, request):
+    return {
+        'total_leads': get_filtered_queryset(user, Lead).count(),
+        'total_clients': get_filtered_queryset(user, Client).count(),
+        'active_projects': get_filtered_queryset(user, Project).filter(status='IN_PROGRESS').count(),
+    }
+
+
+def financials_section(user, is_manager, today, request):
+    tx_totals = get_filtered_queryset(user, Transaction).values('transaction_type').annotate(total=Sum('amount'))
+    total_income = 0
+    total_expense = 0
+    for item in tx_totals:
+        if item['transaction_type'] == 'INCOME': total_income = item['total'] or 0
+        if item['transaction_type'] == 'EXPENSE': total_expense = item['total'] or 0
+    return {
+        'total_income': total_income, 'total_expense': total_expense, 'net_profit': total_income - total_expense,
+        'income_expense_dataset': json.dumps([float(total_income), float(total_expense)]),
+    }
+
+
+def interactions_section(user, is_manager, today, request):
+    qs = Interaction.objects.select_related('client', 'lead', 'created_by').order_by('-created_at')
+    if not is_manager:
+        qs = qs.filter(client__assigned_to=user)
+    return {'recent_interactions': list(qs[:5])}
+
+
+def deadlines_section(user, is_manager, today, request):
+    next_week = today + datetime.timedelta(days=7)
+    upcoming_projects = get_filtered_queryset(user, Project).filter(deadline__range=[today, next_week]).order_by('deadline')
+
+    task_qs = get_filtered_queryset(user, Task).select_related('project')
+    if not is_manager:
+        task_qs = task_qs.filter(assigned_to=user)
+    upcoming_tasks = task_qs.filter(due_date__range=[today, next_week], is_completed=False).order_by('due_date')
+    overdue_tasks = list(task_qs.filter(due_date__lt=today, is_completed=False).order_by('due_date'))
+    return {
+        'upcoming_projects': list(upcoming_projects), 'upcoming_tasks': list(upcoming_tasks),
+        'overdue_tasks': overdue_tasks, 'overdue_count': len(overdue_tasks),
+    }
+
+
+def lead_chart_section(user, is_manager, today, request):
+    lead_status_data = get_filtered_queryset(user, Lead).values('status').annotate(count=Count('id'))
+    lead_counts = {item['status']: item['count'] for item in lead_status_data}
+    lead_dataset = [lead_counts.get('COLD', 0), lead_counts.get('WARM', 0), lead_counts.get('HOT', 0), lead_counts.get('CONVERTED', 0)]
+    return {'lead_dataset': json.dumps(lead_dataset)}
+
+
+def sales_trend_section(user, is_manager, today, request):
+    """Income over the last 7 days."""
+    trend_data_map = {(today - datetime.timedelta(days=i)): 0 for i in range(7)}
+    trend_qs = get_filtered_queryset(user, Transaction).filter(
+        transaction_type='INCOME', date__gte=today - datetime.timedelta(days=6)
+    ).values('date').annotate(total=Sum('amount'))
+    for item in trend_qs:
+        if item['date'] in trend_data_map:
+            trend_data_map[item['date']] = float(item['total'] or 0)
+
+    trend_labels, trend_data = [], []
+    for i in range(6, -1, -1):
+        day = today - datetime.timedelta(days=i)
+        trend_labels.append(day.strftime('%a'))
+        trend_data.append(trend_data_map[day])
+    return {'trend_labels': json.dumps(trend_labels), 'trend_data': json.dumps(trend_data)}
+
+
+def monthly_section(user, is_manager, today, request):
+    """Income and expense for the last 6 months."""
+    tx_qs = get_filtered_queryset(user, Transaction)
+    monthly_labels, monthly_income, monthly_expense = [], [], []
+    for i in range(5, -1, -1):
+        month = today.month - i
+        year = today.year
+        while month <= 0: month += 12; year -= 1
+        m_start = datetime.date(year, month, 1)
+        m_end = datetime.date(year, month, calendar.monthrange(year, month)[1])
+        if i == 0: m_end = today
+
+        m_tx = tx_qs.filter(date__gte=m_start, date__lte=m_end).values('transaction_type').annotate(total=Sum('amount'))
+        inc, exp = 0, 0
+        for item in m_tx:
+            if item['transaction_type'] == 'INCOME': inc = item['total'] or 0
+            if item['transaction_type'] == 'EXPENSE': exp = item['total'] or 0
+
+        monthly_labels.append(m_start.strftime("%b %y"))
+        monthly_income.append(float(inc))
+        monthly_expense.append(float(exp))
+    return {
+        'monthly_labels': json.dumps(monthly_labels), 'monthly_income': json.dumps(monthly_income),
+        'monthly_expense': json.dumps(monthly_expense),
+    }
+
+
+def kpi_section(user, is_manager, today, request):
+    kpi_targets = KPITarget.objects.filter(month=today.replace(day=1))
+    if not is_manager:
+        kpi_targets = kpi_targets.filter(staff=user)
+    kpi_targets = attach_actuals(list(kpi_targets.select_related('staff')), request)
+
+    kpi_widget_data = []
+    for kpi in kpi_targets:
+        m_leads = {'label': '📞 Leads', 'actual': kpi.actual_leads(), 'target': kpi.target_leads, 'pct': kpi.leads_pct()}
+        m_tasks = {'label': '✅ Tasks', 'actual': kpi.actual_tasks(), 'target': kpi.target_tasks, 'pct': kpi.tasks_pct()}
+        m_comms = {'label': '💬 Comms', 'actual': kpi.actual_interactions(), 'target': kpi.target_interactions, 'pct': kpi.interactions_pct()}
+        m_rev   = {'label': '💰 Revenue', 'actual': int(kpi.actual_revenue()), 'target': int(kpi.target_revenue), 'pct': kpi.revenue_pct()}
+
+        kpi_widget_data.append({
+            'username': kpi.staff.get_full_name() or kpi.staff.username,
+            'overall_pct': kpi.overall_pct(),
+            'metrics': [m_leads, m_tasks, m_comms, m_rev]
+        })
+    return {'kpi_widget_data': kpi_widget_data, 'kpi_month': today.strftime('%B %Y')}
+
+
+DASHBOARD_SECTIONS = [
+    counts_section, financials_section, interactions_section, deadlines_section,
+    lead_chart_section, sales_trend_section, monthly_section, kpi_section,
+]
+
+
+def _timed(section, *args):
+    with timed(f'dashboard.{section.__name__}'):
+        return section(*args)
+
+
+def dashboard_context(request, user, is_manager, today):
+    """All sections, one after another."""
+    context = {'is_manager': is_manager}
+    for section in DASHBOARD_SECTIONS:
+        context.update(_timed(section, user, is_manager, today, request))
+    return context
+
+
+def _offloaded(section, *args):
+    # Runs in a pool thread: let Django recycle that thread's connection like a request would
+    try:
+        return _timed(section, *args)
+    finally:
+        close_old_connections()
+
+
+async def run_concurrently(*calls):
+    """Run sync (function, *args) `calls` concurrently in worker threads; their results in order."""
+    return await asyncio.gather(*(
+        sync_to_async(_offloaded, thread_sensitive=False)(*call) for call in calls
+    ))
+
+
+async def adashboard_context(request, user, is_manager, today):
+    """All sections concurrently."""
+    context = {'is_manager': is_manager}
+    results = await run_concurrently(*((section, user, is_manager, today, request) for section in DASHBOARD_SECTIONS))
+    for result in results:
+        context.update(result)
+    return context
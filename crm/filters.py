@@ -0,0 +1,199 @@
+"""
+List filters for the crm admin changelists.
+
+CountedChoicesFilter - choice fields (status, priority, ...) showing a count
+  per choice, all from one GROUP BY query. Counts are cached under the SQL of
+  the filtered queryset (which carries the RLS filter, so each scope caches
+  separately) plus a per-model version that crm.signals bumps on every write.
+LazyRelatedFilter - foreign keys with too many targets to list. Only the
+  selected value is rendered; a search box pulls matches from the admin
+  autocomplete endpoint, which is RLS-aware (see crm.autocomplete).
+DueAmountFilter - clients by outstanding balance, as range lookups on the
+  indexed Client.due_amount column.
+"""
+import hashlib
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.cache import cache
+from django.db.models import Count
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+from .autocomplete import LABEL_RELATED
+from .rls_utils import get_filtered_queryset
+
+FACET_CACHE_TIMEOUT = 600
+
+
+def cache_version(name):
+    """Current version of the cache namespace `name`; embed it in keys to invalidate them in bulk."""
+    key = f"version:{name}"
+    version = cache.get(key)
+    if version is None:
+        # Seeded from the clock so an evicted version never matches old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def acache_version(name):
+    """cache_version() for async views."""
+    key = f"version:{name}"
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_cache_version(name):
+    try:
+        cache.incr(f"version:{name}")
+    except ValueError:
+        cache.set(f"version:{name}", time.time_ns(), None)
+
+
+def facet_version(model):
+    return cache_version(f"facets:{model._meta.label_lower}")
+
+
+def bump_facet_version(model):
+    """Invalidate every cached facet count for `model`."""
+    bump_cache_version(f"facets:{model._meta.label_lower}")
+
+
+class CountedChoicesFilter(admin.ChoicesFieldListFilter):
+    """Choices filter with cached per-choice counts, e.g. "In Progress (42)"."""
+
+    def facet_counts(self, changelist):
+        qs = changelist.get_queryset(self.request, exclude_parameters=self.expected_parameters())
+        sql = hashlib.md5(str(qs.query).encode()).hexdigest()
+        key = f"facets:{qs.model._meta.label_lower}:{facet_version(qs.model)}:{self.field_path}:{sql}"
+        counts = cache.get(key)
+        if counts is None:
+            rows = qs.order_by().values_list(self.field_path).annotate(n=Count('pk', distinct=True))
+            counts = dict(rows)
+            cache.set(key, counts, FACET_CACHE_TIMEOUT)
+        return counts
+
+    def choices(self, changelist):
+        counts = self.facet_counts(changelist)
+        yield {
+            'selected': self.lookup_val is None and not self.lookup_val_isnull,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+        for lookup, title in self.field.flatchoices:
+            title = f"{title} ({counts.get(lookup, 0)})"
+            if lookup is None:
+                yield {
+                    'selected': bool(self.lookup_val_isnull),
+                    'query_string': changelist.get_query_string({self.lookup_kwarg_isnull: 'True'}, [self.lookup_kwarg]),
+                    'display': title,
+                }
+                continue
+            yield {
+                'selected': self.lookup_val is not None and str(lookup) in self.lookup_val,
+                'query_string': changelist.get_query_string({self.lookup_kwarg: lookup}, [self.lookup_kwarg_isnull]),
+                'display': title,
+            }
+
+
+class LazyRelatedFilter(admin.RelatedFieldListFilter):
+    """Related filter that searches its targets on demand instead of listing them all."""
+    template = 'admin/lazy_filter.html'
+
+    def field_choices(self, field, request, model_admin):
+        # Targets are fetched by the search box; only the selection is loaded, in choices()
+        return []
+
+    def has_output(self):
+        return True
+
+    def selected_choices(self):
+        if not self.lookup_val:
+            return []
+        model = self.field.remote_field.model
+        target = self.field.target_field.attname
+        qs = get_filtered_queryset(self.request.user, model).filter(**{f'{target}__in': self.lookup_val})
+        if model in LABEL_RELATED:
+            qs = qs.select_related(*LABEL_RELATED[model])
+        return [(getattr(obj, target), str(obj)) for obj in qs]
+
+    def choices(self, changelist):
+        opts = self.field.model._meta
+        self.search_url = reverse('admin:autocomplete')
+        self.source = {'app_label': opts.app_label, 'model_name': opts.model_name, 'field_name': self.field.name}
+        self.base_query_string = changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull])
+
+        yield {
+            'selected': self.lookup_val is None and not self.lookup_val_isnull,
+            'query_string': self.base_query_string,
+            'display': _('All'),
+        }
+        for pk_val, label in self.selected_choices():
+            yield {
+                'selected': True,
+                'query_string': changelist.get_query_string({self.lookup_kwarg: pk_val}, [self.lookup_kwarg_isnull]),
+                'display': label,
+            }
+        if self.include_empty_choice:
+            yield {
+                'selected': bool(self.lookup_val_isnull),
+                'query_string': changelist.get_query_string({self.lookup_kwarg_isnull: 'True'}, [self.lookup_kwarg]),
+                'display': self.empty_value_display,
+            }
+
+
+def parse_min_due(value):
+    """A due-amount threshold as a Decimal; ValueError unless it is a finite number."""
+    try:
+        amount = Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'{value!r} is not a number')
+    if not amount.is_finite():
+        raise ValueError(f'{value!r} is not a finite number')
+    return amount
+
+
+class DueAmountFilter(admin.SimpleListFilter):
+    """
+    Clients by outstanding balance (total payable - paid): one of the RANGES,
+    or any finite amount (?due=2500 is "owes more than 2,500").
+    """
+    title = _('outstanding balance')
+    parameter_name = 'due'
+    # value -> lookups on the generated, indexed due_amount column
+    RANGES = {
+        'owing': {'due_amount__gt': 0},
+        '1k': {'due_amount__gt': Decimal('1000')},
+        '10k': {'due_amount__gt': Decimal('10000')},
+        '100k': {'due_amount__gt': Decimal('100000')},
+        'settled': {'due_amount': 0},
+        'credit': {'due_amount__lt': 0},
+    }
+
+    def lookups(self, request, model_admin):
+        return (
+            ('owing', _('Owes anything')),
+            ('1k', _('Owes > 1,000')),
+            ('10k', _('Owes > 10,000')),
+            ('100k', _('Owes > 100,000')),
+            ('settled', _('Settled')),
+            ('credit', _('Overpaid')),
+        )
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        lookup = self.RANGES.get(value)
+        if lookup is None:
+            try:
+                lookup = {'due_amount__gt': parse_min_due(value)}
+            except ValueError as exc:
+                raise IncorrectLookupParameters(exc)
+        return queryset.filter(**lookup)
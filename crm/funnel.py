@@ -0,0 +1,201 @@
+"""
+Lead funnel and conversion-velocity analytics.
+
+compute_cohorts() turns every lead into one row of a pandas frame and rolls
+them up - vectorized - by creation month (site time zone) x source x staff:
+leads per stage, conversions and the converted_at - created_at distribution
+in fixed day bands. The refresh_lead_cohorts command stores the result in
+LeadCohort; funnel_summary() reads that (small) table back for the Lead
+changelist widgets, so they never scan Lead. Until the command has run
+(LeadCohort empty) the widgets show a "not computed yet" state.
+
+changelist_metrics() adds the live counters (today's follow-ups, totals) from
+one conditional-aggregation query. Both parts are cached under the Lead /
+LeadCohort versions crm.signals and refresh_cohorts() bump, so paging,
+filtering and searching the changelist reuse them.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .filters import bump_facet_version, facet_version
+from .models import Lead, LeadCohort
+
+# Upper bounds (days) of the time-to-convert bands; the last band is open-ended
+TTC_BUCKET_EDGES = (1, 7, 14, 30, 60, 90)
+TTC_BUCKET_LABELS = ('< 1 day', '1-7 days', '7-14 days', '14-30 days', '30-60 days', '60-90 days', '90+ days')
+STAGES = ('cold', 'warm', 'hot', 'converted')
+COHORT_KEYS = ['cohort_month', 'source', 'staff_id']
+METRICS_CACHE_TIMEOUT = 3600
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def lead_frame(since=None, using=DEFAULT_DB_ALIAS):
+    """DataFrame [created_at, converted_at, status, source, staff_id] of leads created on/after `since`."""
+    qs = Lead.objects.using(using).order_by()
+    if since:
+        qs = qs.filter(created_at__gte=_aware(since))
+    rows = qs.values_list('created_at', 'converted_at', 'status', 'source', 'assigned_to_id')
+    return pd.DataFrame.from_records(
+        list(rows), columns=['created_at', 'converted_at', 'status', 'source', 'staff_id']
+    )
+
+
+def compute_cohorts(df):
+    """Cohort rows (one per month x source x staff) for a lead_frame(), as a DataFrame."""
+    bucket_cols = [f'b{i}' for i in range(len(TTC_BUCKET_LABELS))]
+    if df.empty:
+        return pd.DataFrame(columns=COHORT_KEYS + ['total', *STAGES, 'ttc_days_total'] + bucket_cols)
+
+    created = pd.to_datetime(df['created_at'], utc=True).dt.tz_convert(settings.TIME_ZONE)
+    converted_at = pd.to_datetime(df['converted_at'], utc=True).dt.tz_convert(settings.TIME_ZONE)
+    status = df['status'].to_numpy()
+
+    days = ((converted_at - created).dt.total_seconds() / 86400).clip(lower=0)
+    has_ttc = ((status == 'CONVERTED') & days.notna()).to_numpy()
+    bucket = np.where(has_ttc, np.searchsorted(TTC_BUCKET_EDGES, days.fillna(0).to_numpy(), side='right'), -1)
+
+    frame = pd.DataFrame({
+        'cohort_month': created.dt.tz_localize(None).dt.to_period('M').dt.start_time.dt.date,
+        'source': df['source'].fillna(''),
+        'staff_id': df['staff_id'].fillna(0).astype('int64'),
+        'total': 1,
+        'ttc_days_total': np.where(has_ttc, days.fillna(0).to_numpy(), 0.0),
+    })
+    for stage in STAGES:
+        frame[stage] = (status == stage.upper()).astype('int64')
+    for i, col in enumerate(bucket_cols):
+        frame[col] = (bucket == i).astype('int64')
+
+    return frame.groupby(COHORT_KEYS, sort=False, as_index=False).sum()
+
+
+def refresh_cohorts(since=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recompute LeadCohort in database `using` for cohorts from the month of
+    `since` (default: all). Returns the number of rows written.
+    """
+    if since:
+        since = since.replace(day=1)
+    cohorts = compute_cohorts(lead_frame(since, using))
+    bucket_cols = [f'b{i}' for i in range(len(TTC_BUCKET_LABELS))]
+
+    objs = [
+        LeadCohort(
+            cohort_month=row['cohort_month'], source=row['source'], staff_id=row['staff_id'] or None,
+            total=row['total'], cold=row['cold'], warm=row['warm'], hot=row['hot'], converted=row['converted'],
+            ttc_days_total=round(row['ttc_days_total'], 4), ttc_buckets=[row[c] for c in bucket_cols],
+        )
+        for row in cohorts.astype({c: 'int64' for c in ['total', *STAGES] + bucket_cols}).to_dict('records')
+    ]
+    with transaction.atomic(using=using):
+        stale = LeadCohort.objects.using(using).all()
+        if since:
+            stale = stale.filter(cohort_month__gte=since)
+        stale.delete()
+        LeadCohort.objects.using(using).bulk_create(objs, batch_size=1000)
+        transaction.on_commit(lambda: bump_facet_version(LeadCohort), using=using)
+    return len(objs)
+
+
+def _rate(converted, total):
+    return round(float(converted) / float(total) * 100, 2) if total else 0
+
+
+def funnel_summary(months=12, top=3, sources=8):
+    """
+    Everything the Lead changelist widgets show, from one LeadCohort query:
+    totals, conversion rate, top staff, per-source funnel, the last `months`
+    cohorts and the time-to-convert distribution. Empty (refreshed_at None)
+    until refresh_cohorts() has run.
+    """
+    rows = list(LeadCohort.objects.values_list(
+        'cohort_month', 'source', 'staff__username', 'total', 'cold', 'warm', 'hot', 'converted',
+        'ttc_days_total', 'ttc_buckets', 'refreshed_at',
+    ))
+    summary = {
+        'total_leads': 0, 'converted_leads': 0, 'conversion_rate': 0, 'staff_performance': [],
+        'by_source': [], 'cohorts': [], 'ttc_distribution': [], 'avg_days_to_convert': None, 'refreshed_at': None,
+    }
+    if not rows:
+        return summary
+
+    df = pd.DataFrame.from_records(rows, columns=[
+        'cohort_month', 'source', 'staff', 'total', 'cold', 'warm', 'hot', 'converted',
+        'ttc_days_total', 'ttc_buckets', 'refreshed_at',
+    ])
+    per_row = np.array(df['ttc_buckets'].tolist(), dtype='int64').reshape(len(df), len(TTC_BUCKET_LABELS))
+    # Conversions with a known converted_at (older leads may lack one)
+    df['timed'] = per_row.sum(axis=1)
+    counts = ['total', *STAGES, 'ttc_days_total', 'timed']
+    total, converted = int(df['total'].sum()), int(df['converted'].sum())
+    buckets = per_row.sum(axis=0)
+    timed = int(buckets.sum())
+
+    staff = df.groupby(df['staff'].fillna(''), sort=False)['converted'].sum()
+    staff = staff[staff > 0].sort_values(ascending=False, kind='stable').head(top)
+
+    by_source = df.groupby('source', sort=False)[counts].sum().sort_values('total', ascending=False).head(sources)
+    by_month = df.groupby('cohort_month')[counts].sum().sort_index().tail(months)
+
+    summary.update({
+        'total_leads': total,
+        'converted_leads': converted,
+        'conversion_rate': _rate(converted, total),
+        'staff_performance': [
+            {'assigned_to__username': name or None, 'total': int(n)} for name, n in staff.items()
+        ],
+        'by_source': [
+            {'source': name or '-', 'total': int(r.total), 'cold': int(r.cold), 'warm': int(r.warm),
+             'hot': int(r.hot), 'converted': int(r.converted), 'rate': _rate(r.converted, r.total)}
+            for name, r in by_source.iterrows()
+        ],
+        'cohorts': [
+            {'month': month, 'total': int(r.total), 'converted': int(r.converted),
+             'rate': _rate(r.converted, r.total),
+             'avg_days': round(float(r.ttc_days_total) / float(r.timed), 1) if r.timed else None}
+            for month, r in by_month.iterrows()
+        ],
+        'ttc_distribution': [
+            {'label': label, 'count': int(n), 'pct': round(float(n) / timed * 100, 1) if timed else 0}
+            for label, n in zip(TTC_BUCKET_LABELS, buckets)
+        ],
+        'avg_days_to_convert': round(float(df['ttc_days_total'].sum()) / timed, 1) if timed else None,
+        'refreshed_at': df['refreshed_at'].max(),
+    })
+    return summary
+
+
+def lead_counters(today):
+    """Today's follow-ups, total and converted leads in one conditional-aggregation query."""
+    return Lead.objects.aggregate(
+        today_follow_ups=Count('pk', filter=Q(next_follow_up=today)),
+        total_leads=Count('pk'),
+        converted_leads=Count('pk', filter=Q(status='CONVERTED')),
+    )
+
+
+def changelist_metrics(today):
+    """Context for the Lead changelist widgets: live counters over the cohort funnel, both cached."""
+    key = f"lead_changelist:funnel:{facet_version(LeadCohort)}"
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = funnel_summary()
+        cache.set(key, metrics, METRICS_CACHE_TIMEOUT)
+
+    key = f"lead_changelist:counters:{facet_version(Lead)}:{today.isoformat()}"
+    counters = cache.get(key)
+    if counters is None:
+        counters = lead_counters(today)
+        cache.set(key, counters, METRICS_CACHE_TIMEOUT)
+
+    return {**metrics, **counters, 'conversion_rate': _rate(counters['converted_leads'], counters['total_leads'])}
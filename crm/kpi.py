@@ -0,0 +1,136 @@
+"""
+KPI actuals engine.
+
+Computes the four KPI actuals (converted leads, completed tasks, interactions,
+income) for any number of staff members and one month in four grouped,
+range-filtered queries. Used by KPITarget, KPITargetAdmin and the dashboard so
+they all agree on the numbers and never query per target.
+
+Closed months are read from KPISnapshot (see the close_kpi_month command);
+only the current month, or a closed month nobody has frozen yet, is live.
+"""
+import datetime
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Lead, Task, Interaction, Transaction, KPISnapshot
+from .routers import replica_reads
+
+EMPTY_ACTUALS = {'leads': 0, 'tasks': 0, 'interactions': 0, 'revenue': 0.0}
+
+
+def month_bounds(month):
+    """Return (first day, first day of next month) for the month containing `month`."""
+    start = month.replace(day=1)
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _aware(day):
+    """Local midnight of `day`, so datetime columns are range-filtered in the site timezone."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def compute_actuals(staff_ids, month):
+    """
+    Actuals for every staff id in `staff_ids` for the month containing `month`.
+    Returns {staff_id: {'leads', 'tasks', 'interactions', 'revenue'}}.
+    """
+    staff_ids = list(staff_ids)
+    if not staff_ids:
+        return {}
+
+    start, end = month_bounds(month)
+    start_dt, end_dt = _aware(start), _aware(end)
+
+    leads = (
+        Lead.objects.filter(
+            assigned_to__in=staff_ids, status='CONVERTED',
+            converted_at__gte=start_dt, converted_at__lt=end_dt,
+        ).values('assigned_to').annotate(val=Count('id'))
+    )
+    tasks = (
+        Task.objects.filter(
+            assigned_to__in=staff_ids, is_completed=True,
+            due_date__gte=start, due_date__lt=end,
+        ).values('assigned_to').annotate(val=Count('id'))
+    )
+    interactions = (
+        Interaction.objects.filter(
+            created_by__in=staff_ids,
+            created_at__gte=start_dt, created_at__lt=end_dt,
+        ).values('created_by').annotate(val=Count('id'))
+    )
+    revenue = (
+        Transaction.objects.filter(
+            created_by__in=staff_ids, transaction_type='INCOME',
+            date__gte=start, date__lt=end,
+        ).values('created_by').annotate(val=Sum('amount'))
+    )
+
+    result = {uid: dict(EMPTY_ACTUALS) for uid in staff_ids}
+    for row in leads:
+        result[row['assigned_to']]['leads'] = row['val']
+    for row in tasks:
+        result[row['assigned_to']]['tasks'] = row['val']
+    for row in interactions:
+        result[row['created_by']]['interactions'] = row['val']
+    for row in revenue:
+        result[row['created_by']]['revenue'] = float(row['val'] or 0)
+    return result
+
+
+def is_closed_month(month):
+    """True once the month containing `month` is over (its numbers can no longer change)."""
+    return month_bounds(month)[1] <= timezone.localdate()
+
+
+@replica_reads
+def load_actuals(staff_ids, month):
+    """
+    Actuals for a month, reading frozen snapshots for closed months and falling
+    back to live computation for the current month or anyone not yet frozen.
+    """
+    staff_ids = list(staff_ids)
+    result = {}
+    if staff_ids and is_closed_month(month):
+        snapshots = KPISnapshot.objects.filter(month=month.replace(day=1), staff_id__in=staff_ids)
+        result = {snap.staff_id: snap.as_actuals() for snap in snapshots}
+
+    missing = [uid for uid in staff_ids if uid not in result]
+    result.update(compute_actuals(missing, month))
+    return result
+
+
+def get_actuals_map(staff_ids, month, request=None):
+    """
+    Like load_actuals(), but memoized on `request` (when given) so the admin
+    cards, list columns and dashboard share one computation per request.
+    Only staff ids not already computed for that month are queried.
+    """
+    if request is None:
+        return load_actuals(staff_ids, month)
+
+    memo = getattr(request, '_kpi_actuals', None)
+    if memo is None:
+        memo = request._kpi_actuals = {}
+
+    start = month.replace(day=1)
+    missing = [uid for uid in set(staff_ids) if (start, uid) not in memo]
+    for uid, actuals in load_actuals(missing, start).items():
+        memo[(start, uid)] = actuals
+    return {uid: memo[(start, uid)] for uid in staff_ids}
+
+
+def attach_actuals(targets, request=None):
+    """Prime KPITarget instances with their actuals: one batch per distinct month."""
+    by_month = {}
+    for kpi in targets:
+        by_month.setdefault(kpi.month.replace(day=1), []).append(kpi)
+
+    for month, kpis in by_month.items():
+        actuals = get_actuals_map([k.staff_id for k in kpis], month, request)
+        for kpi in kpis:
+            kpi._kpi_actuals = actuals.get(kpi.staff_id, dict(EMPTY_ACTUALS))
+    return targets
@@ -0,0 +1,154 @@
+import json
+import re
+from contextlib import ExitStack
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve
+
+from crm.signals import clear_dashboard_cache
+
+# Hot paths to audit: name -> URLs requested (as --username) while capturing queries
+AUDIT_PATHS = {
+    'dashboard': ['/dashboard/'],
+    'kanban': ['/kanban/'],
+    'calendar': ['/calendar/', '/api/events/'],
+    'kpi': ['/admin/crm/kpitarget/'],
+}
+# "SCAN crm_task", "SCAN crm_task AS T3", "SCAN crm_task USING INDEX ..." (a full index walk)
+SQLITE_SCAN = re.compile(r'^SCAN (?P<table>\S+)(?: AS \S+)?(?P<index> USING (?:COVERING )?INDEX \S+)?')
+LIMITED = re.compile(r'\bLIMIT\s+(\d+|%s|\?)\s*$', re.IGNORECASE)
+# Statements run at least this often in one page load are reported as likely N+1s
+REPEAT_THRESHOLD = 10
+
+
+def sqlite_scans(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    scans = []
+    for row in cursor.fetchall():
+        match = SQLITE_SCAN.match(row[-1])
+        # An index walked in order under a LIMIT stops early (newest N rows etc.)
+        if match and not (match['index'] and LIMITED.search(sql)):
+            scans.append((match['table'], row[-1]))
+    return scans
+
+
+def postgres_scans(cursor, sql, params):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append((node['Relation Name'], f"Seq Scan on {node['Relation Name']}"))
+        stack.extend(node.get('Plans', []))
+    return scans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every query the dashboard, kanban, calendar and KPI pages issue and flag full table scans (run against a seeded database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to request the pages as (default: first active superuser)')
+        parser.add_argument('--paths', nargs='+', choices=sorted(AUDIT_PATHS), help='Default: all')
+        parser.add_argument('--min-rows', type=int, default=1000, help='Ignore full scans of tables smaller than this')
+        parser.add_argument('--show-plans', action='store_true', help='Print every query, not only flagged ones')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if anything is flagged (for CI)')
+
+    def handle(self, *args, **options):
+        # Every alias the pages may read from (the replica too, under replica_reads)
+        explainers = {}
+        for alias in connections:
+            vendor = connections[alias].vendor
+            explainers[alias] = {'sqlite': sqlite_scans, 'postgresql': postgres_scans}.get(vendor)
+            if explainers[alias] is None:
+                raise CommandError(f"Query plan audit supports SQLite and PostgreSQL, not {vendor} ({alias}).")
+
+        users = User.objects.filter(is_active=True)
+        user = (users.filter(username=options['username']) if options['username'] else users.filter(is_superuser=True)).first()
+        if user is None:
+            raise CommandError("No such active user; pass --username (or create a superuser).")
+
+        # Dashboard context is cached; start cold so every query shows up
+        clear_dashboard_cache(None)
+        factory = RequestFactory()
+        row_counts = {}
+
+        def table_rows(alias, table):
+            if (alias, table) not in row_counts:
+                connection = connections[alias]
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                        row_counts[alias, table] = cursor.fetchone()[0]
+                except Exception:
+                    # An alias or a subquery, not a table: always report it
+                    row_counts[alias, table] = None
+            return row_counts[alias, table]
+
+        flagged_total = 0
+        for name in options['paths'] or list(AUDIT_PATHS):
+            captured = []
+
+            def record(alias, execute, sql, params, many, context):
+                if not many:
+                    captured.append((alias, sql, params))
+                return execute(sql, params, many, context)
+
+            with ExitStack() as stack:
+                for alias in explainers:
+                    stack.enter_context(connections[alias].execute_wrapper(partial(record, alias)))
+                for url in AUDIT_PATHS[name]:
+                    request = factory.get(url)
+                    request.user = user
+                    request.session = SessionStore()
+                    match = resolve(url)
+                    response = match.func(request, *match.args, **match.kwargs)
+                    if hasattr(response, 'render'):
+                        response.render()
+                    if response.status_code != 200:
+                        self.stderr.write(f"{url}: HTTP {response.status_code}")
+
+            # Distinct statements (parameters aside), explained with their first parameters
+            statements = {}
+            for alias, sql, params in captured:
+                statements.setdefault((alias, sql), [params, 0])[1] += 1
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {len(captured)} queries ({len(statements)} distinct statements)"
+            ))
+
+            for (alias, sql), (params, count) in statements.items():
+                if count >= REPEAT_THRESHOLD:
+                    self.stdout.write(self.style.WARNING(f"  REPEATED {count}x (N+1?): {sql[:160]}"))
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                with connections[alias].cursor() as cursor:
+                    scans = explainers[alias](cursor, sql, params)
+                flagged = [
+                    (table, detail) for table, detail in scans
+                    if table_rows(alias, table) is None or table_rows(alias, table) >= options['min_rows']
+                ]
+                if flagged:
+                    flagged_total += len(flagged)
+                    for table, detail in flagged:
+                        rows = table_rows(alias, table)
+                        self.stdout.write(self.style.WARNING(
+                            f"  FULL SCAN {table} ({rows if rows is not None else '?'} rows): {detail}"
+                        ))
+                    self.stdout.write(f"    {sql[:300]}")
+                elif options['show_plans']:
+                    self.stdout.write(f"  ok: {sql[:160]}")
+
+        if flagged_total:
+            message = f"{flagged_total} full scan(s) of tables with >= {options['min_rows']} rows."
+            if options['fail']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No full scans of large tables."))
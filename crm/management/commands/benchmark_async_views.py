@@ -0,0 +1,92 @@
+import contextlib
+import io
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory
+
+from crm import views
+from crm.signals import clear_dashboard_cache
+
+# name -> (url, sync view, async view)
+BENCHMARKS = {
+    'dashboard': ('/dashboard/', views.dashboard, views.dashboard_async),
+    'calendar': ('/api/events/', views.calendar_events_api, views.calendar_events_api_async),
+    'kanban-projects': ('/kanban/', views.kanban_board, views.kanban_board_async),
+    'kanban-tasks': ('/kanban/?type=tasks', views.kanban_board, views.kanban_board_async),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare sync and async (concurrent-section) variants of the dashboard, calendar and kanban views (run against a seeded database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to request the pages as (default: first active superuser)')
+        parser.add_argument('--views', nargs='+', choices=sorted(BENCHMARKS), help='Default: all')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Add this many ms to every query, to model a database across the network (SQLite is in-process)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        user = (users.filter(username=options['username']) if options['username'] else users.filter(is_superuser=True)).first()
+        if user is None:
+            raise CommandError("No such active user; pass --username (or create a superuser).")
+
+        if options['db_latency']:
+            self._add_latency(options['db_latency'] / 1000)
+        sync_factory, async_factory = RequestFactory(), AsyncRequestFactory()
+
+        def call(view, factory, url):
+            request = factory.get(url)
+            request.user = user
+            request.session = SessionStore()
+            if factory is async_factory:
+                async def auser():
+                    return user
+                request.auser = auser
+                return async_to_sync(view)(request)
+            return view(request)
+
+        for name in options['views'] or list(BENCHMARKS):
+            url, sync_view, async_view = BENCHMARKS[name]
+            timings = {}
+            for label, view, factory in (('sync', sync_view, sync_factory), ('async', async_view, async_factory)):
+                runs = []
+                for _ in range(options['repeat']):
+                    # Cold dashboard every time: its context is cached otherwise
+                    clear_dashboard_cache(None)
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        response = call(view, factory, url)
+                    runs.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{name} ({label}): HTTP {response.status_code}")
+                timings[label] = statistics.median(runs)
+
+            speedup = timings['sync'] / timings['async'] if timings['async'] else 0
+            self.stdout.write(
+                f"{name:16} sync {timings['sync']:8.1f}ms   async {timings['async']:8.1f}ms   x{speedup:.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Median of {options['repeat']} cold requests per variant."))
+
+    def _add_latency(self, seconds):
+        def round_trip(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        # Every connection, including the ones worker threads open
+        def install(sender, connection, **kwargs):
+            if round_trip not in connection.execute_wrappers:
+                connection.execute_wrappers.append(round_trip)
+
+        connection_created.connect(install, weak=False)
+        connections.close_all()
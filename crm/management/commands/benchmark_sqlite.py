@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.sqlite import sqlite_pragmas, apply_pragmas
+
+SCHEMA = """
+CREATE TABLE bench_tx (id INTEGER PRIMARY KEY, client_id INTEGER NOT NULL, amount REAL NOT NULL, note TEXT);
+CREATE INDEX bench_tx_client ON bench_tx (client_id);
+CREATE TABLE bench_client (id INTEGER PRIMARY KEY, paid REAL NOT NULL DEFAULT 0);
+"""
+
+
+def _connect(path, tuned):
+    # Same as Django's backend: autocommit handled by explicit BEGIN, 5s busy timeout
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    if tuned:
+        apply_pragmas(db.cursor(), sqlite_pragmas())
+    return db
+
+
+def _worker(path, tuned, seconds, write_ratio, clients, seed, results):
+    rng = random.Random(seed)
+    db = _connect(path, tuned)
+    stats = {'reads': 0, 'writes': 0, 'locked': 0, 'write_ms': []}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client = rng.randrange(1, clients + 1)
+        if rng.random() < write_ratio:
+            # Read-modify-write, like a Transaction save updating Client.paid_amount
+            t = time.perf_counter()
+            try:
+                db.execute('BEGIN IMMEDIATE' if tuned else 'BEGIN')
+                paid = db.execute('SELECT paid FROM bench_client WHERE id = ?', (client,)).fetchone()[0]
+                amount = rng.randint(100, 100000) / 100
+                db.execute('INSERT INTO bench_tx (client_id, amount, note) VALUES (?, ?, ?)', (client, amount, 'bench'))
+                db.execute('UPDATE bench_client SET paid = ? WHERE id = ?', (paid + amount, client))
+                db.execute('COMMIT')
+                stats['writes'] += 1
+                stats['write_ms'].append((time.perf_counter() - t) * 1000)
+            except sqlite3.OperationalError:
+                stats['locked'] += 1
+                if db.in_transaction:
+                    db.execute('ROLLBACK')
+        else:
+            try:
+                db.execute('SELECT COUNT(*), SUM(amount) FROM bench_tx WHERE client_id = ?', (client,)).fetchone()
+                db.execute('SELECT paid FROM bench_client WHERE id = ?', (client,)).fetchone()
+                stats['reads'] += 1
+            except sqlite3.OperationalError:
+                stats['locked'] += 1
+    db.close()
+    results.put(stats)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent SQLite reads/writes with the default settings vs the SQLITE_PERFORMANCE profile (scratch database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent processes (like gunicorn workers)')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that write')
+        parser.add_argument('--rows', type=int, default=100000, help='Transactions to seed')
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--profile', choices=['default', 'tuned', 'both'], default='both')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1.')
+        profiles = ['default', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+
+        workdir = tempfile.mkdtemp(prefix='crm-sqlite-bench-')
+        try:
+            for profile in profiles:
+                self._run(os.path.join(workdir, f'{profile}.sqlite3'), profile == 'tuned', options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run(self, path, tuned, options):
+        rng = random.Random(options['seed'])
+        db = _connect(path, tuned)
+        db.executescript(SCHEMA)
+        db.execute('BEGIN')
+        db.executemany('INSERT INTO bench_client (id) VALUES (?)', ((i,) for i in range(1, options['clients'] + 1)))
+        db.executemany(
+            'INSERT INTO bench_tx (client_id, amount, note) VALUES (?, ?, ?)',
+            ((rng.randint(1, options['clients']), rng.randint(100, 100000) / 100, 'seed') for _ in range(options['rows'])),
+        )
+        db.execute('COMMIT')
+        mode = db.execute('PRAGMA journal_mode').fetchone()[0]
+        db.close()
+
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_worker, args=(
+                path, tuned, options['seconds'], options['write_ratio'], options['clients'], options['seed'] + i, results,
+            ))
+            for i in range(options['workers'])
+        ]
+        for p in procs:
+            p.start()
+        stats = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        reads = sum(s['reads'] for s in stats)
+        writes = sum(s['writes'] for s in stats)
+        locked = sum(s['locked'] for s in stats)
+        write_ms = sorted(ms for s in stats for ms in s['write_ms'])
+        p95 = write_ms[int(len(write_ms) * 0.95) - 1] if write_ms else 0
+        seconds = options['seconds']
+
+        label = 'tuned (SQLITE_PERFORMANCE)' if tuned else 'default'
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label}: journal_mode={mode}, {options['workers']} workers"))
+        self.stdout.write(
+            f"  {(reads + writes) / seconds:,.0f} ops/s  ({reads / seconds:,.0f} reads/s, {writes / seconds:,.0f} writes/s)"
+        )
+        self.stdout.write(f"  write p95 {p95:.1f}ms")
+        message = f"  {locked} 'database is locked' errors"
+        self.stdout.write(self.style.WARNING(message) if locked else self.style.SUCCESS(message))
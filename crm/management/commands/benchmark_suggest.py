@@ -0,0 +1,64 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.suggest import TrigramIndex
+
+FIRST = ['Rahim', 'Karim', 'Nusrat', 'Tanvir', 'Farhana', 'Sakib', 'Ayesha', 'Imran', 'Mehedi', 'Sadia',
+         'John', 'Maria', 'David', 'Sarah', 'Ahmed', 'Fatima', 'Arif', 'Rupa', 'Hasan', 'Lamia']
+LAST = ['Hossain', 'Rahman', 'Ahmed', 'Chowdhury', 'Islam', 'Khan', 'Uddin', 'Sarkar', 'Das', 'Smith',
+        'Akter', 'Begum', 'Miah', 'Roy', 'Haque', 'Kabir', 'Alam', 'Siddique', 'Talukder', 'Bhuiyan']
+WORDS = ['Tech', 'Solutions', 'Digital', 'Global', 'Trading', 'Foods', 'Textiles', 'Logistics', 'Agro',
+         'Pharma', 'Builders', 'Media', 'Ventures', 'Systems', 'Apparel', 'Holdings', 'Labs', 'Traders']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-memory trigram suggest index on synthetic names (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=500000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        n = options['names']
+
+        names = []
+        for i in range(n):
+            if i % 2:
+                names.append(f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}")
+            else:
+                names.append(f"{rng.choice(LAST)} {rng.choice(WORDS)} {rng.choice(WORDS)} {i}")
+
+        start = time.perf_counter()
+        index = TrigramIndex()
+        for pk, name in enumerate(names):
+            index.add(pk, name, (name,))
+        index.warm()
+        self.stdout.write(f"Built index of {len(index)} names in {time.perf_counter() - start:.1f}s")
+
+        def typo(text):
+            # prefix of the name, sometimes with one character dropped
+            text = text[:rng.randint(4, min(14, len(text)))]
+            if rng.random() < 0.3 and len(text) > 4:
+                i = rng.randrange(1, len(text) - 1)
+                text = text[:i] + text[i + 1:]
+            return text
+
+        queries = [typo(rng.choice(names)) for _ in range(options['queries'])]
+        timings = []
+        for q in queries:
+            t = time.perf_counter()
+            index.search(q, limit=10)
+            timings.append((time.perf_counter() - t) * 1000)
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        style = self.style.SUCCESS if p95 < 10 else self.style.WARNING
+        self.stdout.write(style(
+            f"{len(queries)} queries over {n} names: p50 {p50:.2f}ms, p95 {p95:.2f}ms, max {timings[-1]:.2f}ms"
+        ))
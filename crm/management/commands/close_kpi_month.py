@@ -0,0 +1,92 @@
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from crm.kpi import compute_actuals, is_closed_month, month_bounds
+from crm.models import KPITarget, KPISnapshot
+
+
+def _parse_month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Invalid month '{value}', expected YYYY-MM")
+
+
+def _init_worker():
+    # Spawned workers need their own app registry; forked ones just need fresh connections
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _compute_month(month):
+    """Worker: live actuals for every staff member that had a target in `month`."""
+    start, end = month_bounds(month)
+    staff_ids = KPITarget.objects.filter(month__gte=start, month__lt=end).values_list('staff_id', flat=True).distinct()
+    return start, compute_actuals(staff_ids, start)
+
+
+class Command(BaseCommand):
+    help = 'Freeze KPI actuals for closed months into KPISnapshot (default: last month)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to close, YYYY-MM (default: previous month)')
+        parser.add_argument('--from', dest='from_month', help='Backfill every closed month from YYYY-MM up to last month')
+        parser.add_argument('--workers', type=int, default=1, help='Compute months in parallel with a process pool')
+        parser.add_argument('--force', action='store_true', help='Re-freeze months that already have snapshots')
+
+    def handle(self, *args, **options):
+        last_closed = (timezone.localdate().replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+
+        if options['from_month']:
+            months, month = [], _parse_month(options['from_month'])
+            while month <= last_closed:
+                months.append(month)
+                month = month_bounds(month)[1]
+        else:
+            months = [_parse_month(options['month']) if options['month'] else last_closed]
+
+        for month in months:
+            if not is_closed_month(month):
+                raise CommandError(f"{month.strftime('%B %Y')} is not closed yet; only past months can be frozen.")
+
+        if not options['force']:
+            frozen = set(KPISnapshot.objects.filter(month__in=months).values_list('month', flat=True).distinct())
+            months = [m for m in months if m not in frozen]
+
+        if not months:
+            self.stdout.write(self.style.SUCCESS("All requested months are already frozen."))
+            return
+
+        workers = max(1, options['workers'])
+        if workers > 1 and len(months) > 1:
+            # Children must not share the parent's DB sockets
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = list(pool.map(_compute_month, months))
+        else:
+            results = [_compute_month(month) for month in months]
+
+        total = 0
+        for month, actuals in results:
+            snapshots = [
+                KPISnapshot(
+                    staff_id=uid, month=month,
+                    leads=a['leads'], tasks=a['tasks'], interactions=a['interactions'],
+                    revenue=Decimal(str(a['revenue'])),
+                )
+                for uid, a in actuals.items()
+            ]
+            with transaction.atomic():
+                if options['force']:
+                    KPISnapshot.objects.filter(month=month).delete()
+                KPISnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+            total += len(snapshots)
+            self.stdout.write(f"Froze {len(snapshots)} KPI snapshot(s) for {month.strftime('%B %Y')}")
+
+        self.stdout.write(self.style.SUCCESS(f"Closed {len(results)} month(s), {total} snapshot(s) written."))
@@ -0,0 +1,34 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crm.funnel import refresh_cohorts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the LeadCohort funnel table (run periodically, e.g. hourly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only recompute cohorts from YYYY-MM onwards (default: all)')
+        parser.add_argument('--months', type=int, help='Only recompute the last N cohort months')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.datetime.strptime(options['since'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid --since '{options['since']}', expected YYYY-MM")
+        elif options['months']:
+            since = timezone.localdate().replace(day=1)
+            for _ in range(options['months'] - 1):
+                since = (since - datetime.timedelta(days=1)).replace(day=1)
+
+        start = time.time()
+        written = refresh_cohorts(since)
+        scope = f"from {since:%B %Y}" if since else "for all months"
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed lead cohorts {scope}: {written} row(s) in {time.time() - start:.1f}s."
+        ))
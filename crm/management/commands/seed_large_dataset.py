@@ -0,0 +1,450 @@
+import contextlib
+import datetime
+import itertools
+import math
+import random
+import time
+from bisect import bisect
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from crm import metrics, models, signals
+from crm.funnel import refresh_cohorts
+from crm.models import Client, Document, Interaction, KPITarget, Lead, Project, Task, TaskChecklist, Transaction
+
+# Volumes at --scale 1 (about 1.3M rows); the per-parent averages don't scale
+VOLUMES = {
+    'staff': 25,
+    'clients': 5000,
+    'leads': 100000,
+    'projects_per_client': 4,
+    'tasks_per_project': 10,
+    'checklist_per_task': 3,
+    'interactions': 100000,
+    'transactions': 300000,
+}
+PER_PARENT = ('projects_per_client', 'tasks_per_project', 'checklist_per_task')
+MIN_STAFF = 3
+MANAGER_SHARE = 0.1
+CHUNK = 500
+
+FIRST_NAMES = ('Arif', 'Nadia', 'Rahim', 'Sadia', 'Tanvir', 'Farhana', 'Imran', 'Nusrat', 'Karim', 'Ayesha',
+               'James', 'Maria', 'David', 'Sarah', 'Omar', 'Lina', 'Chen', 'Priya', 'Lucas', 'Emma')
+LAST_NAMES = ('Hossain', 'Rahman', 'Ahmed', 'Islam', 'Chowdhury', 'Khan', 'Smith', 'Garcia', 'Lee', 'Patel',
+              'Müller', 'Silva', 'Kim', 'Nguyen', 'Brown', 'Haque', 'Sarkar', 'Das', 'Roy', 'Ali')
+COMPANY_WORDS = ('Apex', 'Blue', 'Nova', 'Green', 'Delta', 'Prime', 'Urban', 'Swift', 'Bright', 'Summit',
+                 'Golden', 'Pixel', 'River', 'Metro', 'Orbit', 'Cedar', 'Lotus', 'Vertex', 'Harbor', 'Crest')
+COMPANY_KINDS = ('Traders', 'Textiles', 'Foods', 'Logistics', 'Studio', 'Labs', 'Pharma', 'Motors', 'Realty',
+                 'Fashion', 'Agro', 'Tech', 'Clinic', 'Academy', 'Builders')
+PROJECT_KINDS = ('Website Revamp', 'SEO Campaign', 'Chatbot', 'Mobile App', 'Brand Refresh', 'E-commerce Store',
+                 'Landing Page', 'Dashboard', 'AI Agent', 'Ad Campaign', 'CRM Integration', 'UX Audit')
+TASK_KINDS = ('Wireframes', 'Copywriting', 'Backend API', 'QA pass', 'Client review', 'Deploy', 'Keyword research',
+              'Content calendar', 'Prompt tuning', 'Analytics setup', 'Bug fixes', 'Design system', 'Handover')
+
+# (value, weight) tables
+SERVICES = (('WEB', 40), ('SEO', 25), ('AI', 20), ('UIUX', 15))
+LEAD_SOURCES = (('Facebook', 30), ('Website', 20), ('Referral', 18), ('LinkedIn', 12), ('Google Ads', 10),
+                ('Cold Call', 6), ('Event', 4))
+LEAD_STATUSES = (('COLD', 40), ('WARM', 25), ('HOT', 15), ('CONVERTED', 20))
+INTERACTION_TYPES = (('CALL', 40), ('EMAIL', 30), ('MEETING', 15), ('NOTE', 15))
+PRIORITIES = (('LOW', 30), ('MEDIUM', 50), ('HIGH', 20))
+# Task statuses by project status
+TASK_STATUSES = {
+    'PLANNING': (('TODO', 85), ('IN_PROGRESS', 15)),
+    'IN_PROGRESS': (('TODO', 30), ('IN_PROGRESS', 30), ('REVIEW', 10), ('DONE', 30)),
+    'REVIEW': (('IN_PROGRESS', 5), ('REVIEW', 35), ('DONE', 60)),
+    'COMPLETED': (('DONE', 1),),
+}
+# The project's model-signal receivers (cache bumps, emails, progress and paid-amount sync,
+# typeahead indexing, metrics), as (receiver, signals, senders); detached while seeding
+PROJECT_RECEIVERS = (
+    (signals.on_client_change, (post_save, post_delete), (Client,)),
+    (signals.on_project_change, (post_save, post_delete), (Project,)),
+    (signals.on_lead_change, (post_save, post_delete), (Lead,)),
+    (signals.on_transaction_change, (post_save, post_delete), (Transaction,)),
+    (signals.on_facet_source_change, (post_save, post_delete),
+     (Client, Project, Lead, Transaction, Task, Document, Interaction)),
+    (signals.on_suggest_source_saved, (post_save,), (Client, Lead, Project)),
+    (signals.on_suggest_source_deleted, (post_delete,), (Client, Lead, Project)),
+    (signals.notify_new_client, (post_save,), (Client,)),
+    (signals.notify_new_project, (post_save,), (Project,)),
+    (models.update_project_progress, (post_save, post_delete), (Task,)),
+    (models.sync_task_is_completed, (post_save,), (Task,)),
+    (models.update_client_paid_amount_on_save, (post_save,), (Transaction,)),
+    (models.update_client_paid_amount_on_delete, (post_delete,), (Transaction,)),
+    (metrics.count_post_save, (post_save,), (None,)),
+    (metrics.count_post_delete, (post_delete,), (None,)),
+    (metrics.count_m2m_changed, (m2m_changed,), (None,)),
+)
+# Share of checklist items done by task status
+CHECKLIST_DONE = {'TODO': 0.05, 'IN_PROGRESS': 0.5, 'REVIEW': 0.9, 'DONE': 1.0}
+INCOME_SHARE = 0.65
+DESCRIPTIONS = {
+    'INCOME': ('Milestone payment', 'Advance', 'Monthly retainer', 'Final payment', 'Invoice settlement'),
+    'EXPENSE': ('Hosting', 'Ad spend', 'Freelancer', 'Software licence', 'Stock assets', 'Domain renewal'),
+}
+
+
+class Picker:
+    """Weighted choice over a (value, weight) table with a precomputed CDF."""
+
+    def __init__(self, table):
+        self.values = [value for value, _ in table]
+        self.cum = list(itertools.accumulate(weight for _, weight in table))
+
+    def __call__(self, rng):
+        return self.values[bisect(self.cum, rng.random() * self.cum[-1])]
+
+
+@contextlib.contextmanager
+def disconnected(receivers):
+    """Disconnect (receiver, signals, senders) entries for the block; reconnect the ones that were connected."""
+    detached = []
+    try:
+        for func, model_signals, senders in receivers:
+            for signal in model_signals:
+                for sender in senders:
+                    if signal.disconnect(func, sender=sender):
+                        detached.append((signal, func, sender))
+        yield
+    finally:
+        for signal, func, sender in detached:
+            signal.connect(func, sender=sender)
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """Let created_at (auto_now_add) take the generated values instead of now()."""
+    fields = [f for model in models for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _between(rng, start, end, skew=1.0):
+    """A moment in [start, end]; skew < 1 favours recent ones (the business grows)."""
+    return start + (end - start) * (rng.random() ** skew)
+
+
+def _count(rng, mean):
+    """Per-parent count: exponential around `mean`, capped at 4x."""
+    if mean <= 0:
+        return 0
+    return min(int(rng.expovariate(1 / mean) + 0.5), int(mean * 4) or 1)
+
+
+def _money(value):
+    return Decimal(f'{max(value, 1):.2f}')
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with a large synthetic CRM (staff, clients, leads, projects, tasks, checklists, '
+            'interactions, transactions, KPI targets) for performance testing; deterministic by --seed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Same seed, same data (relative to today)')
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply every volume (default 1 = ~1.3M rows)')
+        parser.add_argument('--years', type=int, default=3, help='History to spread records over')
+        for name, default in VOLUMES.items():
+            scaled = '' if name in PER_PARENT else ' x --scale'
+            parser.add_argument(f"--{name.replace('_', '-')}", type=float, help=f'Default: {default}{scaled}')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-cohorts', action='store_true', help="Don't refresh the LeadCohort funnel table")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.db = options['database']
+        if not connections[self.db].features.can_return_rows_from_bulk_insert:
+            raise CommandError(f"{connections[self.db].vendor} can't return ids from bulk inserts; use SQLite or PostgreSQL.")
+        if options['scale'] <= 0 or options['years'] < 1:
+            raise CommandError('--scale must be positive and --years at least 1.')
+
+        self.volumes = {
+            name: options[name] if options[name] is not None else default * (1 if name in PER_PARENT else options['scale'])
+            for name, default in VOLUMES.items()
+        }
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.today = timezone.localdate(self.now)
+        self.start = self.now - datetime.timedelta(days=365 * options['years'])
+        self.totals = {}
+
+        started = time.time()
+        with transaction.atomic(using=self.db), disconnected(PROJECT_RECEIVERS), \
+                explicit_timestamps(Client, Lead, Project, TaskChecklist, Interaction, Transaction, KPITarget):
+            self.seed_staff(options['seed'])
+            self.seed_clients()
+            self.seed_leads()
+            self.seed_projects()
+            self.seed_interactions()
+            self.seed_transactions()
+            self.seed_kpi_targets()
+
+        if not options['skip_cohorts']:
+            start = time.time()
+            written = refresh_cohorts(using=self.db)
+            self.stdout.write(f"  lead cohorts: {written:,} in {time.time() - start:.1f}s")
+
+        rows = sum(self.totals.values())
+        elapsed = time.time() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 0.001):,.0f} rows/s)."
+        ))
+
+    # --- Helpers ---
+    def insert(self, model, objs):
+        created = model.objects.using(self.db).bulk_create(objs, batch_size=self.batch_size)
+        self.totals[model] = self.totals.get(model, 0) + len(created)
+        return created
+
+    def report(self, start, *models):
+        for model in models:
+            self.stdout.write(
+                f"  {model._meta.verbose_name_plural}: {self.totals.get(model, 0):,} in {time.time() - start:.1f}s"
+            )
+
+    def staff_for(self, rng):
+        return self.staff_ids[bisect(self.staff_cum, rng.random() * self.staff_cum[-1])]
+
+    # --- Stages ---
+    def seed_staff(self, seed):
+        """Staff users (one in ten a Manager), with a skewed share of the work (a few top performers)."""
+        start = time.time()
+        rng = self.rng
+        prefix = f'seed{seed}_'
+        existing = {u.username: u for u in User.objects.using(self.db).filter(username__startswith=prefix)}
+        password = make_password(None)
+        users = []
+        for i in range(max(int(self.volumes['staff']), MIN_STAFF)):
+            username = f'{prefix}staff{i:03d}'
+            if username in existing:
+                users.append(existing[username])
+                continue
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(username=username, first_name=first, last_name=last, password=password, is_staff=True,
+                              email=f'{first}.{last}.{i}@example.com'.lower()))
+        self.insert(User, [u for u in users if u.pk is None])
+
+        managers = users[:max(int(len(users) * MANAGER_SHARE), 1)] if len(users) > 1 else []
+        agents = [u for u in users if u not in managers]
+        for name, members in (('Manager', managers), ('Sales Agent', agents)):
+            group = Group.objects.using(self.db).filter(name=name).first()
+            if group:
+                group.user_set.add(*members)
+
+        self.managers = managers
+        self.staff_ids = [u.pk for u in agents or users]
+        self.staff_cum = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(self.staff_ids))))
+        self.report(start, User)
+
+    def seed_clients(self):
+        """Clients over the years, each with 1-3 staff and a 'size' that drives how much they transact."""
+        start = time.time()
+        rng = self.rng
+        services = Picker(SERVICES)
+        clients, self.client_staff, self.client_size = [], {}, {}
+        for i in range(int(self.volumes['clients'])):
+            company = f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)}'
+            clients.append(Client(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', company_name=f'{company} {i}',
+                services=services(rng), created_at=_between(rng, self.start, self.now, skew=0.7),
+            ))
+        clients = self.insert(Client, clients)
+
+        through = Client.assigned_to.through
+        links = []
+        for client in clients:
+            staff = {self.staff_for(rng) for _ in range((1, 1, 1, 2, 2, 3)[rng.randrange(6)])}
+            self.client_staff[client.pk] = sorted(staff)
+            self.client_size[client.pk] = rng.lognormvariate(0, 1)
+            links.extend(through(client_id=client.pk, user_id=user_id) for user_id in self.client_staff[client.pk])
+        self.insert(through, links)
+        self.clients = [(c.pk, c.created_at) for c in clients]
+        self.report(start, Client, Client.assigned_to.through)
+
+    def seed_leads(self):
+        """Leads across the funnel; conversions take days to weeks, open leads have follow-ups."""
+        start = time.time()
+        rng = self.rng
+        sources, statuses = Picker(LEAD_SOURCES), Picker(LEAD_STATUSES)
+        self.leads = []
+        total = int(self.volumes['leads'])
+        for offset in range(0, total, self.batch_size):
+            batch = []
+            for i in range(offset, min(offset + self.batch_size, total)):
+                created = _between(rng, self.start, self.now, skew=0.7)
+                status = statuses(rng)
+                converted_at = next_follow_up = None
+                if status == 'CONVERTED':
+                    converted_at = min(created + datetime.timedelta(days=rng.expovariate(1 / 21)), self.now)
+                elif (self.now - created).days < 120 or rng.random() < 0.2:
+                    next_follow_up = created.date() + datetime.timedelta(days=rng.randint(1, 45))
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                batch.append(Lead(
+                    name=f'{first} {last}', company_name=f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)}',
+                    source=sources(rng), contact_info=f'{first}.{last}.{i}@example.com'.lower(), status=status,
+                    next_follow_up=next_follow_up, assigned_to_id=None if rng.random() < 0.05 else self.staff_for(rng),
+                    created_at=created, converted_at=converted_at,
+                ))
+            self.leads.extend((lead.pk, lead.created_at, lead.assigned_to_id) for lead in self.insert(Lead, batch))
+        self.report(start, Lead)
+
+    def seed_projects(self):
+        """Projects per client, their tasks (status follows the project's) and checklists; progress matches."""
+        start = time.time()
+        rng = self.rng
+        priorities = Picker(PRIORITIES)
+        task_statuses = {status: Picker(table) for status, table in TASK_STATUSES.items()}
+        v = self.volumes
+        self.client_projects = {}
+        numbers = itertools.count(1)
+
+        for offset in range(0, len(self.clients), CHUNK):
+            projects, plans = [], []
+            for client_id, client_created in self.clients[offset:offset + CHUNK]:
+                for _ in range(_count(rng, v['projects_per_client'])):
+                    created = _between(rng, client_created, self.now, skew=0.8)
+                    deadline = (created + datetime.timedelta(days=rng.randint(14, 180))).date()
+                    if deadline < self.today - datetime.timedelta(days=30):
+                        status = 'COMPLETED' if rng.random() < 0.85 else 'REVIEW'
+                    else:
+                        status = ('PLANNING', 'IN_PROGRESS', 'IN_PROGRESS', 'REVIEW')[rng.randrange(4)]
+                    tasks = [task_statuses[status](rng) for _ in range(_count(rng, v['tasks_per_project']))]
+                    done = sum(1 for s in tasks if s == 'DONE')
+                    projects.append(Project(
+                        client_id=client_id, project_name=f'{rng.choice(PROJECT_KINDS)} #{next(numbers)}',
+                        status=status, deadline=deadline, created_at=created,
+                        progress_percentage=int(done / len(tasks) * 100) if tasks else 0,
+                    ))
+                    plans.append(tasks)
+            projects = self.insert(Project, projects)
+
+            tasks, checklist_plans = [], []
+            for project, statuses in zip(projects, plans):
+                self.client_projects.setdefault(project.client_id, []).append(project.pk)
+                staff = self.client_staff[project.client_id]
+                span = max((project.deadline - project.created_at.date()).days, 1)
+                for status in statuses:
+                    tasks.append(Task(
+                        project_id=project.pk, task_name=rng.choice(TASK_KINDS), status=status,
+                        is_completed=status == 'DONE', priority=priorities(rng),
+                        assigned_to_id=rng.choice(staff) if rng.random() < 0.9 else None,
+                        due_date=project.created_at.date() + datetime.timedelta(days=rng.randint(1, span)),
+                    ))
+                    checklist_plans.append((status, project.created_at))
+            tasks = self.insert(Task, tasks)
+
+            items = []
+            for task, (status, project_created) in zip(tasks, checklist_plans):
+                for n in range(_count(rng, v['checklist_per_task'])):
+                    items.append(TaskChecklist(
+                        task_id=task.pk, item_name=f'Step {n + 1}', is_done=rng.random() < CHECKLIST_DONE[status],
+                        created_at=_between(rng, project_created, self.now),
+                    ))
+            self.insert(TaskChecklist, items)
+        self.report(start, Project, Task, TaskChecklist)
+
+    def seed_interactions(self):
+        """Calls, emails and meetings logged against clients (70%) or leads (30%) by their staff."""
+        start = time.time()
+        rng = self.rng
+        kinds = Picker(INTERACTION_TYPES)
+        if not (self.clients or self.leads):
+            return
+        total = int(self.volumes['interactions'])
+        for offset in range(0, total, self.batch_size):
+            batch = []
+            for _ in range(min(self.batch_size, total - offset)):
+                if self.leads and (rng.random() < 0.3 or not self.clients):
+                    lead_id, created, owner = self.leads[rng.randrange(len(self.leads))]
+                    target = {'lead_id': lead_id, 'created_by_id': owner or self.staff_for(rng)}
+                else:
+                    client_id, created = self.clients[rng.randrange(len(self.clients))]
+                    target = {'client_id': client_id, 'created_by_id': rng.choice(self.client_staff[client_id])}
+                kind = kinds(rng)
+                batch.append(Interaction(
+                    interaction_type=kind, notes=f'{kind.title()} follow-up',
+                    created_at=_between(rng, created, self.now, skew=0.8), **target,
+                ))
+            self.insert(Interaction, batch)
+        self.report(start, Interaction)
+
+    def seed_transactions(self):
+        """Income and expenses since each client joined, weighted by client size; paid_amount matches."""
+        start = time.time()
+        rng = self.rng
+        if not self.clients:
+            return
+        cum = list(itertools.accumulate(self.client_size[pk] for pk, _ in self.clients))
+        income = {}
+        total = int(self.volumes['transactions'])
+        for offset in range(0, total, self.batch_size):
+            batch = []
+            for _ in range(min(self.batch_size, total - offset)):
+                client_id, created = self.clients[bisect(cum, rng.random() * cum[-1])]
+                kind = 'INCOME' if rng.random() < INCOME_SHARE else 'EXPENSE'
+                # Typical payment ~800, expense ~150, long-tailed
+                amount = _money(rng.lognormvariate(math.log(800 if kind == 'INCOME' else 150), 0.9))
+                projects = self.client_projects.get(client_id)
+                when = _between(rng, created, self.now, skew=0.8)
+                batch.append(Transaction(
+                    client_id=client_id, project_id=rng.choice(projects) if projects and rng.random() < 0.7 else None,
+                    transaction_type=kind, amount=amount, date=when.date(), created_at=when,
+                    description=rng.choice(DESCRIPTIONS[kind]), created_by_id=rng.choice(self.client_staff[client_id]),
+                ))
+                if kind == 'INCOME':
+                    income[client_id] = income.get(client_id, 0) + amount
+            self.insert(Transaction, batch)
+
+        # What the Transaction signals would have kept: paid = income; about half still owe something
+        clients = []
+        for client_id, _ in self.clients:
+            paid = income.get(client_id, Decimal('0.00'))
+            due = Decimal('0.00') if rng.random() < 0.55 else _money(float(paid) * rng.uniform(0.05, 0.5) + 100)
+            clients.append(Client(pk=client_id, paid_amount=paid, total_payable=paid + due))
+        Client.objects.using(self.db).bulk_update(clients, ['paid_amount', 'total_payable'], batch_size=1000)
+        self.report(start, Transaction)
+
+    def seed_kpi_targets(self):
+        """Monthly targets per agent across the whole history, scaled to each agent's share of the work."""
+        start = time.time()
+        rng = self.rng
+        months, month = [], self.start.date().replace(day=1)
+        while month <= self.today:
+            months.append(month)
+            month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+        weights = [b - a for a, b in zip([0] + self.staff_cum, self.staff_cum)]
+        share = {pk: w / sum(weights) for pk, w in zip(self.staff_ids, weights)}
+        monthly_leads = self.volumes['leads'] / max(len(months), 1)
+        created_by = self.managers[0].pk if self.managers else None
+        # Re-seeding keeps targets that already exist (unique per staff and month)
+        existing = set(KPITarget.objects.using(self.db).filter(staff_id__in=self.staff_ids).values_list('staff_id', 'month'))
+        targets = []
+        for staff_id in self.staff_ids:
+            for month in months:
+                if (staff_id, month) in existing:
+                    continue
+                base = monthly_leads * share[staff_id]
+                # Set a few days before the month starts
+                set_at = timezone.make_aware(datetime.datetime.combine(month - datetime.timedelta(days=3), datetime.time(10)))
+                targets.append(KPITarget(
+                    staff_id=staff_id, month=month, created_by_id=created_by, created_at=set_at,
+                    target_leads=max(int(base * 0.2 * rng.uniform(0.8, 1.3)), 1),
+                    target_tasks=max(int(base * rng.uniform(0.3, 0.6)), 1),
+                    target_interactions=max(int(base * rng.uniform(0.5, 1.0)), 1),
+                    target_revenue=_money(base * 0.2 * 800 * rng.uniform(0.8, 1.3)),
+                ))
+        self.insert(KPITarget, targets)
+        self.report(start, KPITarget)
@@ -0,0 +1,147 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.html import escape
+
+from crm.models import Lead, Task, ReminderLog
+
+
+class Command(BaseCommand):
+    help = 'Send one daily digest of due lead follow-ups and overdue tasks to each staff member'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Run as if today were YYYY-MM-DD (default: today)')
+        parser.add_argument('--dry-run', action='store_true', help='Build digests but do not send or log them')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['date']:
+            today = datetime.date.fromisoformat(options['date'])
+
+        # 1. Recipients: active staff with an email who have NOT been reminded today
+        # (a cheap pre-filter; the claim in step 5 is what prevents double sends)
+        already_sent = ReminderLog.objects.filter(sent_on=today).values_list('staff_id', flat=True)
+        staff = {
+            u.id: u for u in User.objects.filter(is_staff=True, is_active=True)
+            .exclude(email='').exclude(id__in=already_sent)
+        }
+        if not staff:
+            self.stdout.write(self.style.SUCCESS(f"No reminders pending for {today}."))
+            return
+
+        # 2. Everyone's due follow-ups in one query, grouped in Python
+        follow_ups = defaultdict(list)
+        leads = (
+            Lead.objects.filter(next_follow_up__lte=today, assigned_to_id__in=staff.keys())
+            .exclude(status='CONVERTED')
+            .order_by('next_follow_up')
+            .values('id', 'name', 'company_name', 'source', 'status', 'next_follow_up', 'assigned_to_id')
+        )
+        for lead in leads:
+            follow_ups[lead['assigned_to_id']].append(lead)
+
+        # 3. Everyone's overdue tasks in one query
+        overdue = defaultdict(list)
+        tasks = (
+            Task.objects.filter(due_date__lt=today, is_completed=False, assigned_to_id__in=staff.keys())
+            .order_by('due_date')
+            .values('id', 'task_name', 'priority', 'due_date', 'project__project_name', 'assigned_to_id')
+        )
+        for task in tasks:
+            overdue[task['assigned_to_id']].append(task)
+
+        # 4. Build one digest per staff member
+        messages, logs = [], []
+        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'crm@techvilo.com')
+        for uid, user in staff.items():
+            user_leads, user_tasks = follow_ups.get(uid, []), overdue.get(uid, [])
+            if not user_leads and not user_tasks:
+                continue
+
+            subject, text, html = self.build_digest(user, today, user_leads, user_tasks)
+            msg = EmailMultiAlternatives(subject, text, from_email, [user.email])
+            msg.attach_alternative(html, 'text/html')
+            messages.append(msg)
+            logs.append(ReminderLog(
+                staff=user, sent_on=today,
+                follow_up_count=len(user_leads), overdue_task_count=len(user_tasks),
+                lead_ids=[l['id'] for l in user_leads], task_ids=[t['id'] for t in user_tasks],
+            ))
+
+        if options['dry_run']:
+            for log in logs:
+                self.stdout.write(f"[dry-run] {log.staff.email}: {log.follow_up_count} follow-ups, {log.overdue_task_count} overdue tasks")
+            return
+
+        if not messages:
+            self.stdout.write(self.style.SUCCESS(f"Nothing due for {today}."))
+            return
+
+        # 5. Claim each digest by inserting its log row, then send it. The
+        # (staff, sent_on) unique constraint makes the insert the lock: an
+        # overlapping run or a rerun can't send the same digest twice. A
+        # failed send gives its claim back so the next run retries it.
+        sent = skipped = failed = 0
+        with get_connection() as connection:
+            for msg, log in zip(messages, logs):
+                try:
+                    with transaction.atomic():
+                        log.save(force_insert=True)
+                except IntegrityError:
+                    skipped += 1
+                    continue
+                try:
+                    sent += connection.send_messages([msg]) or 0
+                except Exception as e:
+                    log.delete()
+                    failed += 1
+                    self.stderr.write(f"Failed to send to {log.staff.email}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {sent} reminder digest(s) for {today}"
+            + (f", {skipped} already sent by another run" if skipped else '')
+            + (f", {failed} failed (will retry)" if failed else '') + "."
+        ))
+
+    def build_digest(self, user, today, leads, tasks):
+        subject = f"⏰ Your CRM reminders for {today.strftime('%b %d, %Y')}"
+        name = user.get_full_name() or user.username
+
+        lines = [f"Hi {name},", ""]
+        if leads:
+            lines.append(f"Lead follow-ups due ({len(leads)}):")
+            lines += [f"  - {l['name'] or l['source']} ({l['status']}) — {l['next_follow_up']}" for l in leads]
+            lines.append("")
+        if tasks:
+            lines.append(f"Overdue tasks ({len(tasks)}):")
+            lines += [f"  - {t['task_name']} [{t['project__project_name']}] — due {t['due_date']}" for t in tasks]
+        text = "\n".join(lines)
+
+        lead_rows = "".join(
+            f'<tr><td style="padding: 6px 10px;"><a href="http://127.0.0.1:8000/admin/crm/lead/{l["id"]}/change/">{escape(l["name"] or l["source"])}</a></td>'
+            f'<td style="padding: 6px 10px;">{l["status"]}</td><td style="padding: 6px 10px;">{l["next_follow_up"]}</td></tr>'
+            for l in leads
+        )
+        task_rows = "".join(
+            f'<tr><td style="padding: 6px 10px;">{escape(t["task_name"])}</td>'
+            f'<td style="padding: 6px 10px;">{escape(t["project__project_name"])}</td><td style="padding: 6px 10px; color: #dc3545;">{t["due_date"]}</td></tr>'
+            for t in tasks
+        )
+
+        html = f"""
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #e0e0e0; border-radius: 8px;">
+            <h2 style="color: #15173D; text-align: center;">Techvilo CRM</h2>
+            <hr style="border: 0; border-top: 1px solid #eee;">
+            <p style="color: #555;">Hi {escape(name)}, here is what needs your attention today.</p>
+            {f'<h3 style="color: #007bff;">📞 Follow-ups due ({len(leads)})</h3><table style="width: 100%; border-collapse: collapse;">{lead_rows}</table>' if leads else ''}
+            {f'<h3 style="color: #dc3545;">✅ Overdue tasks ({len(tasks)})</h3><table style="width: 100%; border-collapse: collapse;">{task_rows}</table>' if tasks else ''}
+            <p style="text-align: center; color: #999; font-size: 12px; margin-top: 30px;">This is an automated reminder from Techvilo CRM.</p>
+        </div>
+        """
+        return subject, text, html
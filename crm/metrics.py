@@ -0,0 +1,333 @@
+"""
+In-process metrics in the Prometheus text format, served on /metrics.
+
+MetricsMiddleware times every request per view and, through a database
+execute wrapper installed on each connection, counts its queries and query
+time - including queries run by worker threads the request starts
+(sync_to_async copies the request's context). InstrumentedLocMemCache
+counts cache hits and misses per key namespace. Model signals, dashboard
+cache invalidations and the staff-notification email queue are counted
+too, and timed() blocks replace the old print("DEBUG: ...") timings.
+
+Each response gets a Server-Timing header (app, db, cache and any timed()
+blocks) for the browser's network panel.
+
+The registry lives in the process: under gunicorn every worker exposes its
+own numbers, so scrape each worker or sum across them.
+"""
+import contextvars
+import hmac
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines = [
+            f'{self.name}_bucket{_labels(self.labelnames, key, [("le", _number(bound))])} {count}'
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}')
+        return lines
+
+
+REGISTRY = []
+
+REQUEST_SECONDS = Histogram('crm_http_request_duration_seconds', 'Request latency by view.', ['view', 'method', 'status'])
+REQUEST_QUERIES = Histogram('crm_http_request_queries', 'Database queries per request by view.', ['view'], QUERY_BUCKETS)
+QUERY_SECONDS = Counter('crm_db_query_seconds_total', 'Time spent in database queries by view.', ['view'])
+QUERIES = Counter('crm_db_queries_total', 'Database queries by view and connection alias.', ['view', 'alias'])
+CACHE_REQUESTS = Counter('crm_cache_requests_total', 'Cache lookups by key namespace and result.', ['namespace', 'result'])
+TIMINGS = Histogram('crm_timing_seconds', 'Timed application blocks (dashboard sections, admin hooks).', ['name'])
+SIGNALS = Counter('crm_model_signals_total', 'Model signals sent, by signal and model.', ['signal', 'model'])
+DASHBOARD_INVALIDATIONS = Counter('crm_dashboard_cache_invalidations_total', 'Dashboard cache version bumps.')
+EMAILS = Counter('crm_notification_emails_total', 'Staff notification emails by outcome.', ['result'])
+EMAILS_IN_FLIGHT = Gauge('crm_notification_emails_in_flight', 'Notification emails queued on background threads.')
+
+
+class RequestStats:
+    """What one request did; shared with the threads it starts."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.by_alias = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = []
+        self.lock = threading.Lock()
+
+
+_current = contextvars.ContextVar('crm_request_stats', default=None)
+
+
+def current_stats():
+    return _current.get()
+
+
+# --- Database ---
+def _record_query(alias):
+    def wrapper(execute, sql, params, many, context):
+        stats = _current.get()
+        if stats is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with stats.lock:
+                stats.queries += 1
+                stats.query_seconds += elapsed
+                stats.by_alias[alias] = stats.by_alias.get(alias, 0) + 1
+    wrapper.crm_metrics = True
+    return wrapper
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if not any(getattr(w, 'crm_metrics', False) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(_record_query(connection.alias))
+
+
+# --- Cache ---
+_MISSING = object()
+_NAMESPACE = re.compile(r'[A-Za-z]+(?:_[A-Za-z]+)*')
+
+
+def cache_namespace(key):
+    """'dashboard_data_5_True_3' -> 'dashboard_data', 'facets:crm.client:2' -> 'facets'."""
+    match = _NAMESPACE.match(str(key))
+    return match.group(0) if match else 'other'
+
+
+def record_cache(key, hit):
+    CACHE_REQUESTS.inc(namespace=cache_namespace(key), result='hit' if hit else 'miss')
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """LocMemCache that records hits and misses (CACHES BACKEND in settings)."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        record_cache(key, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        for key in keys:
+            record_cache(key, key in found)
+        return found
+
+
+# --- Application timings ---
+def observe_timing(name, seconds):
+    TIMINGS.observe(seconds, name=name)
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.timings.append((name, seconds))
+
+
+@contextmanager
+def timed(name):
+    """Time a block into crm_timing_seconds{name} and the response's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_timing(name, time.perf_counter() - start)
+
+
+# --- Signals ---
+@receiver(post_save)
+def count_post_save(sender, **kwargs):
+    SIGNALS.inc(signal='post_save', model=sender._meta.label)
+
+
+@receiver(post_delete)
+def count_post_delete(sender, **kwargs):
+    SIGNALS.inc(signal='post_delete', model=sender._meta.label)
+
+
+@receiver(m2m_changed)
+def count_m2m_changed(sender, **kwargs):
+    SIGNALS.inc(signal='m2m_changed', model=sender._meta.label)
+
+
+# --- Middleware and endpoint ---
+def _server_timing(stats, total):
+    def entry(name, seconds, desc=None):
+        text = f'{re.sub(r"[^A-Za-z0-9_.-]", "-", name)};dur={seconds * 1000:.1f}'
+        return text + (f';desc="{desc}"' if desc else '')
+
+    parts = [entry('app', total), entry('db', stats.query_seconds, f'{stats.queries} queries')]
+    if stats.cache_hits or stats.cache_misses:
+        parts.append(f'cache;desc="{stats.cache_hits} hit / {stats.cache_misses} miss"')
+    parts.extend(entry(name, seconds) for name, seconds in stats.timings[:20])
+    return ', '.join(parts)
+
+
+class MetricsMiddleware:
+    """
+    Per-view latency, query and cache metrics plus a Server-Timing header.
+    Sync and async capable, so async views aren't pushed onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    def record(self, request, response, stats, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unmatched'
+        REQUEST_SECONDS.observe(total, view=view, method=request.method, status=response.status_code)
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        QUERY_SECONDS.inc(stats.query_seconds, view=view)
+        for alias, count in stats.by_alias.items():
+            QUERIES.inc(count, view=view, alias=alias)
+        # Streaming responses are timed up to their first byte
+        response['Server-Timing'] = _server_timing(stats, total)
+        return response
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: Bearer METRICS_TOKEN when set, otherwise superusers only."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode())
+    else:
+        allowed = request.user.is_authenticated and request.user.is_superuser
+    if not allowed:
+        return HttpResponseForbidden('Forbidden', content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0017_add_amount_min_validator'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sent_on', models.DateField(verbose_name='Reminder Date')),
+                ('follow_up_count', models.IntegerField(default=0, verbose_name='Due Follow-ups')),
+                ('overdue_task_count', models.IntegerField(default=0, verbose_name='Overdue Tasks')),
+                ('lead_ids', models.JSONField(blank=True, default=list)),
+                ('task_ids', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reminder Log',
+                'verbose_name_plural': 'Reminder Logs',
+                'ordering': ['-sent_on', 'staff'],
+                'unique_together': {('staff', 'sent_on')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0018_reminder_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Month')),
+                ('leads', models.IntegerField(default=0, verbose_name='Leads Converted')),
+                ('tasks', models.IntegerField(default=0, verbose_name='Tasks Completed')),
+                ('interactions', models.IntegerField(default=0, verbose_name='Interactions')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenue (৳)')),
+                ('frozen_at', models.DateTimeField(auto_now_add=True)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'KPI Snapshot',
+                'verbose_name_plural': 'KPI Snapshots',
+                'ordering': ['-month', 'staff'],
+                'unique_together': {('staff', 'month')},
+            },
+        ),
+    ]
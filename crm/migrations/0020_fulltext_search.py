@@ -0,0 +1,75 @@
+# Full-text search indexes (FTS5 tables + triggers on SQLite, GIN tsvector indexes on Postgres)
+#
+# The table/column list and the DDL are frozen here rather than imported
+# from crm.search, so later changes to FULLTEXT_FIELDS need a migration of
+# their own instead of silently changing this one.
+
+from django.db import migrations
+
+# table -> indexed text columns (crm.search.FULLTEXT_FIELDS at the time)
+FULLTEXT_TABLES = {
+    'crm_lead': ('name', 'company_name', 'source', 'contact_info'),
+    'crm_client': ('name', 'company_name'),
+    'crm_project': ('project_name',),
+    'crm_transaction': ('description',),
+}
+
+
+def _pg_document(columns):
+    return "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({c}, '')" for c in columns) + ")"
+
+
+def install_sql(vendor, table, columns):
+    if vendor == 'sqlite':
+        fts = f'{table}_fts'
+        cols = ', '.join(columns)
+        new_cols = ', '.join(f'new.{c}' for c in columns)
+        old_cols = ', '.join(f'old.{c}' for c in columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='unicode61')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    if vendor == 'postgresql':
+        return [f"CREATE INDEX IF NOT EXISTS {table}_fts_idx ON {table} USING GIN ({_pg_document(columns)})"]
+    return []
+
+
+def uninstall_sql(vendor, table):
+    if vendor == 'sqlite':
+        fts = f'{table}_fts'
+        return [f"DROP TRIGGER IF EXISTS {fts}_{t}" for t in ('ai', 'ad', 'au')] + [f"DROP TABLE IF EXISTS {fts}"]
+    if vendor == 'postgresql':
+        return [f"DROP INDEX IF EXISTS {table}_fts_idx"]
+    return []
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, columns in FULLTEXT_TABLES.items():
+        for sql in install_sql(vendor, table, columns):
+            schema_editor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in FULLTEXT_TABLES:
+        for sql in uninstall_sql(vendor, table):
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0019_kpi_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
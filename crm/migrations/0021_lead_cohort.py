@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0020_fulltext_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_month', models.DateField(verbose_name='Cohort Month')),
+                ('source', models.CharField(max_length=100)),
+                ('total', models.IntegerField(default=0, verbose_name='Leads')),
+                ('cold', models.IntegerField(default=0)),
+                ('warm', models.IntegerField(default=0)),
+                ('hot', models.IntegerField(default=0)),
+                ('converted', models.IntegerField(default=0)),
+                ('ttc_days_total', models.FloatField(default=0, verbose_name='Days to Convert (sum)')),
+                ('ttc_buckets', models.JSONField(blank=True, default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lead_cohorts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lead Cohort',
+                'verbose_name_plural': 'Lead Cohorts',
+                'ordering': ['-cohort_month', 'source'],
+                'unique_together': {('cohort_month', 'source', 'staff')},
+            },
+        ),
+    ]
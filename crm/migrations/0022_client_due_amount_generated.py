@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:58
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0021_lead_cohort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='due_amount',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_payable'), '-', models.F('paid_amount')), output_field=models.DecimalField(decimal_places=2, max_digits=11), verbose_name='Due Amount'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0023_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('tasks', 'Tasks'), ('projects', 'Projects')], max_length=10)),
+                ('kind', models.CharField(choices=[('MOVED', 'Moved'), ('ADDED', 'Added'), ('PROGRESS', 'Progress')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='board_events', to='crm.client')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Board Event',
+                'verbose_name_plural': 'Board Events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# SQLite rebuilds crm_client to add the generated due_amount column (0022),
+# which drops the FTS5 triggers 0020 put on it. Reinstall them and rebuild
+# the index so clients created since are searchable. Postgres keeps its GIN
+# index through ALTER TABLE and needs nothing.
+
+from django.db import migrations
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS crm_client_fts_ai AFTER INSERT ON crm_client BEGIN "
+    "INSERT INTO crm_client_fts(rowid, name, company_name) VALUES (new.id, new.name, new.company_name); END",
+    "CREATE TRIGGER IF NOT EXISTS crm_client_fts_ad AFTER DELETE ON crm_client BEGIN "
+    "INSERT INTO crm_client_fts(crm_client_fts, rowid, name, company_name) "
+    "VALUES ('delete', old.id, old.name, old.company_name); END",
+    "CREATE TRIGGER IF NOT EXISTS crm_client_fts_au AFTER UPDATE ON crm_client BEGIN "
+    "INSERT INTO crm_client_fts(crm_client_fts, rowid, name, company_name) "
+    "VALUES ('delete', old.id, old.name, old.company_name); "
+    "INSERT INTO crm_client_fts(rowid, name, company_name) VALUES (new.id, new.name, new.company_name); END",
+    "INSERT INTO crm_client_fts(crm_client_fts) VALUES ('rebuild')",
+]
+
+
+def reinstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def noop(apps, schema_editor):
+    # Unapplying 0022 rebuilds the table again; 0020's reverse drops the rest
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0024_board_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(reinstall, noop),
+    ]
@@ -20,13 +20,18 @@ class Client(models.Model):
     services = models.CharField(max_length=100)
     total_payable = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Computed and stored by the database, so receivables can be sorted,
+    # filtered and range-scanned (due_amount > 0) in SQL
+    due_amount = models.GeneratedField(
+        expression=models.F('total_payable') - models.F('paid_amount'),
+        output_field=models.DecimalField(max_digits=11, decimal_places=2),
+        db_persist=True,
+        db_index=True,
+        verbose_name='Due Amount',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     assigned_to = models.ManyToManyField(User, blank=True, related_name='assigned_clients')
 
-    @property
-    def due_amount(self):
-        return self.total_payable - self.paid_amount
-
     def __str__(self):
         return self.name
     
@@ -50,6 +55,12 @@ class Lead(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     converted_at = models.DateTimeField(null=True, blank=True, verbose_name='Converted At')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='crm_lead_status_idx'),
+            models.Index(fields=['next_follow_up'], name='crm_lead_follow_up_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name or self.source} - {self.status}"
     
@@ -70,6 +81,12 @@ class Project(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Upcoming deadlines of active projects (dashboard, calendar)
+            models.Index(fields=['status', 'deadline'], name='crm_project_status_dl_idx'),
+        ]
+
     def __str__(self):
         return f"{self.project_name} - {self.client.name}"
 
@@ -96,17 +113,35 @@ class Task(models.Model):
     is_completed = models.BooleanField(default=False) 
     due_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard deadlines / overdue tasks and KPI "completed this month"
+            models.Index(fields=['assigned_to', 'is_completed', 'due_date'], name='crm_task_assignee_due_idx'),
+        ]
+
     def __str__(self):
         return f"{self.task_name} ({self.project.project_name})"
 
+    # Lists annotate these (see with_checklist_counts) to avoid a query per task
     @property
     def checklist_total(self):
+        if hasattr(self, 'checklist_total_annotated'):
+            return self.checklist_total_annotated
         return self.checklist_items.count()
 
     @property
     def checklist_done(self):
+        if hasattr(self, 'checklist_done_annotated'):
+            return self.checklist_done_annotated
         return self.checklist_items.filter(is_done=True).count()
 
+    @staticmethod
+    def with_checklist_counts(qs):
+        return qs.annotate(
+            checklist_total_annotated=models.Count('checklist_items'),
+            checklist_done_annotated=models.Count('checklist_items', filter=models.Q(checklist_items__is_done=True)),
+        )
+
 class TaskChecklist(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='checklist_items')
     item_name = models.CharField(max_length=200)
@@ -120,6 +155,7 @@ class TaskChecklist(models.Model):
 @receiver([post_save, post_delete], sender=Task)
 def update_project_progress(sender, instance, **kwargs):
     project = instance.project
+    previous = project.progress_percentage
     total_tasks = project.tasks.count()
     
     if total_tasks > 0:
@@ -131,6 +167,12 @@ def update_project_progress(sender, instance, **kwargs):
         project.progress_percentage = 0
     project.save()
 
+    # Open project boards patch the card (see crm.board). Not on delete: a
+    # cascade from the client would journal a row pointing at it.
+    if kwargs['signal'] is post_save and project.progress_percentage != previous:
+        from .board import record_progress
+        record_progress(project)
+
 # --- Auto-sync is_completed when Task status changes ---
 @receiver(post_save, sender=Task)
 def sync_task_is_completed(sender, instance, **kwargs):
@@ -155,6 +197,13 @@ class Interaction(models.Model):
     notes = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'created_at'], name='crm_interaction_author_idx'),
+            # Managers' "recent interactions" (newest first, nobody filtered out)
+            models.Index(fields=['created_at'], name='crm_interaction_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_interaction_type_display()} - {self.created_at.strftime('%Y-%m-%d')}"
 
@@ -176,6 +225,12 @@ class Transaction(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Income/expense charts and P&L: type + date range
+            models.Index(fields=['transaction_type', 'date'], name='crm_txn_type_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_transaction_type_display()}: {self.amount} ({self.date})"
 
@@ -285,42 +340,31 @@ class KPITarget(models.Model):
 
     # ── Auto-calculated actuals (computed from live data) ──────────────
 
+    def actuals(self):
+        """
+        All four actuals for this target, computed once and memoized on the instance.
+        Lists of targets should be primed in bulk with crm.kpi.attach_actuals().
+        """
+        if getattr(self, '_kpi_actuals', None) is None:
+            from .kpi import load_actuals
+            self._kpi_actuals = load_actuals([self.staff_id], self.month)[self.staff_id]
+        return self._kpi_actuals
+
     def actual_leads(self):
         """Count leads CONVERTED by this staff member this month (by conversion date)."""
-        return Lead.objects.filter(
-            assigned_to=self.staff,
-            status='CONVERTED',
-            converted_at__month=self.month.month,
-            converted_at__year=self.month.year,
-        ).count()
+        return self.actuals()['leads']
 
     def actual_tasks(self):
         """Count tasks COMPLETED by this staff member this month."""
-        return Task.objects.filter(
-            assigned_to=self.staff,
-            is_completed=True,
-            due_date__month=self.month.month,
-            due_date__year=self.month.year,
-        ).count()
+        return self.actuals()['tasks']
 
     def actual_interactions(self):
         """Count interactions logged by this staff member this month."""
-        return Interaction.objects.filter(
-            created_by=self.staff,
-            created_at__month=self.month.month,
-            created_at__year=self.month.year,
-        ).count()
+        return self.actuals()['interactions']
 
     def actual_revenue(self):
         """Sum of INCOME transactions created by this staff member this month."""
-        from django.db.models import Sum as _Sum
-        result = Transaction.objects.filter(
-            created_by=self.staff,
-            transaction_type='INCOME',
-            date__month=self.month.month,
-            date__year=self.month.year,
-        ).aggregate(total=_Sum('amount'))['total'] or 0
-        return float(result)
+        return self.actuals()['revenue']
 
     def pct(self, actual, target):
         """Safe percentage calculation."""
@@ -342,4 +386,110 @@ class KPITarget(models.Model):
 
     def overall_pct(self):
         parts = [self.leads_pct(), self.tasks_pct(), self.interactions_pct(), self.revenue_pct()]
-        return int(sum(parts) / len(parts))
\ No newline at end of file
+        return int(sum(parts) / len(parts))
+
+
+# --- REMINDER LOG MODEL ---
+class ReminderLog(models.Model):
+    """One row per staff member per day a reminder digest was sent (keeps send_reminders idempotent)."""
+    staff = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminder_logs')
+    sent_on = models.DateField(verbose_name='Reminder Date')
+    follow_up_count = models.IntegerField(default=0, verbose_name='Due Follow-ups')
+    overdue_task_count = models.IntegerField(default=0, verbose_name='Overdue Tasks')
+    lead_ids = models.JSONField(default=list, blank=True)
+    task_ids = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('staff', 'sent_on')
+        ordering = ['-sent_on', 'staff']
+        verbose_name = 'Reminder Log'
+        verbose_name_plural = 'Reminder Logs'
+
+    def __str__(self):
+        return f"{self.staff.username} — {self.sent_on}"
+
+# --- KPI SNAPSHOT MODEL ---
+class KPISnapshot(models.Model):
+    """Frozen KPI actuals for a closed month (written by the close_kpi_month command)."""
+    staff = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_snapshots')
+    month = models.DateField(verbose_name='Month')
+    leads = models.IntegerField(default=0, verbose_name='Leads Converted')
+    tasks = models.IntegerField(default=0, verbose_name='Tasks Completed')
+    interactions = models.IntegerField(default=0, verbose_name='Interactions')
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Revenue (৳)')
+    frozen_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('staff', 'month')
+        ordering = ['-month', 'staff']
+        verbose_name = 'KPI Snapshot'
+        verbose_name_plural = 'KPI Snapshots'
+
+    def __str__(self):
+        return f"{self.staff.username} — {self.month.strftime('%B %Y')} (frozen)"
+
+    def as_actuals(self):
+        return {'leads': self.leads, 'tasks': self.tasks,
+                'interactions': self.interactions, 'revenue': float(self.revenue)}
+
+# --- LEAD COHORT MODEL ---
+class LeadCohort(models.Model):
+    """
+    Lead funnel per creation month x source x staff member (written by the
+    refresh_lead_cohorts command). ttc_buckets counts converted leads per
+    time-to-convert band, see crm.funnel.TTC_BUCKET_EDGES.
+    """
+    cohort_month = models.DateField(verbose_name='Cohort Month')
+    source = models.CharField(max_length=100)
+    staff = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='lead_cohorts')
+    total = models.IntegerField(default=0, verbose_name='Leads')
+    cold = models.IntegerField(default=0)
+    warm = models.IntegerField(default=0)
+    hot = models.IntegerField(default=0)
+    converted = models.IntegerField(default=0)
+    ttc_days_total = models.FloatField(default=0, verbose_name='Days to Convert (sum)')
+    ttc_buckets = models.JSONField(default=list, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('cohort_month', 'source', 'staff')
+        ordering = ['-cohort_month', 'source']
+        verbose_name = 'Lead Cohort'
+        verbose_name_plural = 'Lead Cohorts'
+
+    def __str__(self):
+        return f"{self.cohort_month.strftime('%b %Y')} — {self.source}"
+
+# --- KANBAN CHANGE JOURNAL ---
+class BoardEvent(models.Model):
+    """
+    Append-only journal of kanban changes (card moves, quick-adds, project
+    progress), written by the kanban update paths and streamed to open
+    boards by crm.board. The id is the stream cursor; client scopes RLS.
+    """
+    BOARD_CHOICES = [
+        ('tasks', 'Tasks'),
+        ('projects', 'Projects'),
+    ]
+    KIND_CHOICES = [
+        ('MOVED', 'Moved'),
+        ('ADDED', 'Added'),
+        ('PROGRESS', 'Progress'),
+    ]
+
+    board = models.CharField(max_length=10, choices=BOARD_CHOICES)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='board_events')
+    payload = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Board Event'
+        verbose_name_plural = 'Board Events'
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.board} #{self.object_id}"
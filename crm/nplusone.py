@@ -0,0 +1,185 @@
+"""
+N+1 query detection for development and tests.
+
+Every query a request runs is reduced to its shape - literals, parameters
+and IN (...) lists stripped - and counted. A shape seen `threshold` times
+(NPLUSONE_THRESHOLD, default 10) in one request is reported with the
+application stack that first repeated it, which is where the missing
+select_related / prefetch_related / annotation belongs.
+
+NPlusOneMiddleware does this for every request when NPLUSONE_DETECT is on
+(the default under DEBUG): it logs a warning per repeated shape, or raises
+NPlusOneError when NPLUSONE_RAISE is set. Tests wrap client calls in
+detect_n_plus_one() (or NPlusOneTestMixin.assertNoNPlusOne()), which raises
+on exit. Queries from worker threads the request starts are counted too
+(sync_to_async copies the request's context).
+"""
+import contextvars
+import logging
+import re
+import threading
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 10
+# Application frames kept per reported stack (innermost last)
+STACK_DEPTH = 8
+# Query plumbing, not where a query comes from
+_PLUMBING = ('/django/db/', '/crm/metrics.py', '/crm/nplusone.py', '/manage.py')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+# Transaction bookkeeping repeats by design
+_IGNORED = re.compile(r'^\s*(?:SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+
+
+class NPlusOneError(AssertionError):
+    """Repeated query shapes; an AssertionError so tests report a failure, not an error."""
+
+
+def fingerprint(sql):
+    """The shape of a statement: 'WHERE id IN (%s, %s)' and 'WHERE id IN (1)' look the same."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql).replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _app_stack():
+    """
+    The innermost project frames, plus the frame that ran the query when
+    that is library code (an admin list_display, a template tag).
+    """
+    base = str(Path(settings.BASE_DIR).resolve())
+    frames = [frame for frame in traceback.extract_stack()
+              if not any(part in frame.filename for part in _PLUMBING)]
+    if not frames:
+        return []
+    app = [frame for frame in frames if frame.filename.startswith(base) and 'site-packages' not in frame.filename]
+    stack = app[-STACK_DEPTH:]
+    if frames[-1] not in stack:
+        stack.append(frames[-1])
+    return traceback.format_list(stack)
+
+
+class QueryLog:
+    """Query shapes seen in one request or test block."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+        self.counts = {}
+        self.stacks = {}
+        self.lock = threading.Lock()
+
+    def record(self, sql):
+        if _IGNORED.match(sql):
+            return
+        shape = fingerprint(sql)
+        with self.lock:
+            count = self.counts[shape] = self.counts.get(shape, 0) + 1
+        if count == 2:
+            # The first repeat is taken where the loop is
+            self.stacks[shape] = _app_stack()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def repeated(self):
+        """[(shape, count, stack)] of shapes seen `threshold` times or more, most frequent first."""
+        return sorted(
+            ((shape, count, self.stacks.get(shape, [])) for shape, count in self.counts.items()
+             if count >= self.threshold),
+            key=lambda item: -item[1],
+        )
+
+    def report(self, label=''):
+        lines = [f"{label + ': ' if label else ''}N+1 queries ({self.total} queries in all)"]
+        for shape, count, stack in self.repeated():
+            lines.append(f"  {count}x {shape[:300]}")
+            lines.extend('    ' + line.rstrip().replace('\n', '\n    ') for line in stack)
+        return '\n'.join(lines)
+
+
+_active = contextvars.ContextVar('crm_nplusone_log', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    log = _active.get()
+    if log is not None:
+        log.record(sql)
+    return execute(sql, params, many, context)
+
+
+_record_query.crm_nplusone = True
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if not any(getattr(w, 'crm_nplusone', False) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, raise_error=True, label=''):
+    """
+    Count query shapes inside the block; on exit raise NPlusOneError (or,
+    with raise_error=False, log a warning) if any repeated `threshold` times.
+    Yields the QueryLog.
+    """
+    log = QueryLog(threshold)
+    token = _active.set(log)
+    try:
+        yield log
+    finally:
+        _active.reset(token)
+    if log.repeated():
+        if raise_error:
+            raise NPlusOneError(log.report(label))
+        logger.warning(log.report(label))
+
+
+class NPlusOneTestMixin:
+    """TestCase mixin: `with self.assertNoNPlusOne(): self.client.get(...)`."""
+    nplusone_threshold = None
+
+    def assertNoNPlusOne(self, threshold=None, label=''):
+        return detect_n_plus_one(threshold or self.nplusone_threshold, raise_error=True, label=label)
+
+
+class NPlusOneMiddleware:
+    """Flags N+1 queries per request when NPLUSONE_DETECT is on (logs, or raises with NPLUSONE_RAISE)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_DETECT', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.detect(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self.detect(request):
+            return await self.get_response(request)
+
+    def detect(self, request):
+        raise_error = getattr(settings, 'NPLUSONE_RAISE', False)
+        return detect_n_plus_one(raise_error=raise_error, label=f'{request.method} {request.path}')
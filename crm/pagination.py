@@ -0,0 +1,331 @@
+"""
+Opt-in pagination for large admin changelists.
+
+KeysetPaginationMixin swaps in:
+  * EstimatedCountPaginator - unfiltered lists use the planner's row estimate
+    (pg_class.reltuples / sqlite_stat1) or a cached count instead of COUNT(*);
+    small tables and filtered lists still get an exact count.
+  * KeysetChangeList - "Next" links carry a cursor of the last row's ordering
+    values, so deep pages seek on the index (WHERE key < last) instead of
+    OFFSET-scanning everything before them. Plain ?p=N links keep working.
+
+PaginatedInlineMixin / InlinePagesMixin do the same for change-page inlines:
+only the newest rows get forms, older ones are fetched as JSON on demand.
+"""
+import base64
+import datetime
+import json
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import display_for_field, display_for_value, label_for_field, lookup_field, unquote
+from django.contrib.admin.views.main import ChangeList, PAGE_VAR
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet, _get_foreign_key
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import conditional_escape
+
+CURSOR_VAR = 'after'
+EXACT_COUNT_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 300
+INLINE_PAGE_SIZE = 20
+
+
+def estimate_row_count(model, using='default'):
+    """Row estimate from DB statistics, or None when the backend has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None
+            if connection.vendor == 'sqlite':
+                # Populated by ANALYZE; the first number of each row is the table's row count
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+                counts = [int(stat.split()[0]) for (stat,) in cursor.fetchall() if stat]
+                return max(counts) if counts else None
+    except DatabaseError:
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large, unfiltered tables. An estimate
+    can overshoot; a short page proves where the rows end, so page() (and
+    KeysetChangeList for seeks) clamp the count to it.
+    """
+    exact_count_threshold = EXACT_COUNT_THRESHOLD
+    estimated = False
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if qs.query.where:
+            return super().count
+
+        model, using = qs.model, qs.db
+        estimate = estimate_row_count(model, using)
+        if estimate is None:
+            # No planner statistics: fall back to a cached counter
+            key = f"rowcount:{using}:{model._meta.db_table}"
+            estimate = cache.get(key)
+            if estimate is None:
+                estimate = super().count
+                cache.set(key, estimate, COUNT_CACHE_TIMEOUT)
+                return estimate
+
+        if estimate < self.exact_count_threshold:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def page(self, number):
+        page = super().page(number)
+        self.clamp(page.number, len(page.object_list))
+        return page
+
+    def clamp(self, number, rows):
+        """Settle an estimated count from page `number` holding `rows` rows."""
+        if not self.estimated or rows >= self.per_page:
+            return
+        if rows or number == 1:
+            count = (number - 1) * self.per_page + rows
+        else:
+            # Past the real end: only an exact count says where it is
+            count = self.object_list.count()
+        self.estimated = False
+        self.count = count
+        for name in ('num_pages', 'page_range'):
+            self.__dict__.pop(name, None)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder rounds times to milliseconds; seeks need them exact."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=CursorEncoder).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def keyset_fields(opts, ordering):
+    """
+    [(field, descending)] for `ordering` if it can be seeked: plain,
+    non-null local fields ending in the primary key. Else None.
+    """
+    fields = {f.name: f for f in opts.concrete_fields}
+    keys = []
+    for part in ordering:
+        if not isinstance(part, str):
+            return None
+        name = part.lstrip('-')
+        field = opts.pk if name == 'pk' else fields.get(name)
+        if field is None or field.null or field.is_relation:
+            return None
+        keys.append((field, part.startswith('-')))
+    if not keys or not keys[-1][0].primary_key:
+        return None
+    return keys
+
+
+def seek_filter(keys, values):
+    """WHERE clause selecting the rows strictly after `values` in the given ordering."""
+    condition = Q()
+    for i, (field, desc) in enumerate(keys):
+        term = Q(**{f"{field.attname}__{'lt' if desc else 'gt'}": values[i]})
+        for j in range(i):
+            term &= Q(**{keys[j][0].attname: values[j]})
+        condition |= term
+    return condition
+
+
+def cursor_for(keys, obj):
+    return encode_cursor([getattr(obj, field.attname) for field, _ in keys])
+
+
+def decode_cursor_values(keys, token):
+    try:
+        values = decode_cursor(token)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise IncorrectLookupParameters
+        return [field.to_python(v) for (field, _), v in zip(keys, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise IncorrectLookupParameters
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList that seeks from a cursor instead of using OFFSET when it can."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        if self.cursor is not None:
+            # Not a field lookup: hide it from the admin's filter parsing
+            request.GET = request.GET.copy()
+            del request.GET[CURSOR_VAR]
+        self.next_cursor_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_keyset_fields(self):
+        return keyset_fields(self.opts, self.queryset.query.order_by)
+
+    def get_results(self, request):
+        keys = self.get_keyset_fields()
+        if self.cursor is None or keys is None or self.show_all:
+            super().get_results(request)
+        else:
+            values = decode_cursor_values(keys, self.cursor)
+            paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+            self.result_count = paginator.count
+            self.show_full_result_count = False
+            self.show_admin_actions = True
+            self.full_result_count = None
+            self.can_show_all = False
+            self.multi_page = True
+            self.paginator = paginator
+            self.page_num = max(1, min(self.page_num, paginator.num_pages))
+            self.result_list = list(self.queryset.filter(seek_filter(keys, values))[:self.list_per_page])
+            if isinstance(paginator, EstimatedCountPaginator):
+                paginator.clamp(self.page_num, len(self.result_list))
+
+        if self.paginator.count != self.result_count:
+            # A short page settled an estimated count
+            self.result_count = self.paginator.count
+            self.multi_page = self.result_count > self.list_per_page
+
+        if keys is None or not self.multi_page or (self.show_all and self.can_show_all):
+            return
+        rows = list(self.result_list)
+        if len(rows) < self.list_per_page:
+            return
+        cursor = cursor_for(keys, rows[-1])
+        self.next_cursor_url = self.get_query_string({PAGE_VAR: self.page_num + 1, CURSOR_VAR: cursor})
+
+
+class KeysetPaginationMixin:
+    """Opt a ModelAdmin into estimated counts and keyset "Next" links."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class RecentInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset with forms for the newest `per_page` rows only. Bound
+    formsets load just the rows that were posted back, so edits still save
+    if newer rows were added in between.
+    """
+    per_page = INLINE_PAGE_SIZE
+    ordering = ('-pk',)
+    older_url = None
+    older_cursor = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            qs = self.queryset.order_by(*self.ordering)
+            if self.is_bound:
+                pk = self.model._meta.pk.name
+                posted = [self.data.get(f'{self.add_prefix(i)}-{pk}') for i in range(self.initial_form_count())]
+                self._queryset = list(qs.filter(pk__in=[v for v in posted if v]))
+            else:
+                rows = list(qs[:self.per_page + 1])
+                self._queryset = rows[:self.per_page]
+                if len(rows) > self.per_page:
+                    self.older_cursor = cursor_for(keyset_fields(self.model._meta, self.ordering), rows[-2])
+        return self._queryset
+
+
+class PaginatedInlineMixin:
+    """
+    InlineModelAdmin mixin: render the newest `per_page` rows (by
+    `inline_ordering`, which must end in the pk) and a "Load older" button
+    backed by the parent admin's InlinePagesMixin endpoint.
+    """
+    formset = RecentInlineFormSet
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = INLINE_PAGE_SIZE
+    inline_ordering = ('-pk',)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.ordering = self.inline_ordering
+        if obj is not None and obj.pk is not None:
+            opts = self.parent_model._meta
+            formset.older_url = reverse(
+                f'{self.admin_site.name}:{opts.app_label}_{opts.model_name}_inline_page',
+                args=[obj.pk, self.opts.model_name],
+            )
+        return formset
+
+    def older_rows(self, request, parent, cursor):
+        """One page of rows after `cursor` as {'fields', 'rows', 'next'}, cells as escaped HTML."""
+        keys = keyset_fields(self.opts, self.inline_ordering)
+        fk = _get_foreign_key(self.parent_model, self.model, fk_name=self.fk_name)
+        qs = self.get_queryset(request).filter(**{fk.name: parent}).order_by(*self.inline_ordering)
+        if cursor:
+            qs = qs.filter(seek_filter(keys, decode_cursor_values(keys, cursor)))
+        rows = list(qs[:self.per_page + 1])
+        page = rows[:self.per_page]
+
+        names = [name for name in self.get_fields(request, parent) if name != fk.name]
+        empty = self.get_empty_value_display()
+
+        def cell(obj, name):
+            field, attr, value = lookup_field(name, obj, self)
+            if field is None:
+                return conditional_escape(display_for_value(value, empty))
+            return conditional_escape(display_for_field(value, field, empty))
+
+        return {
+            'fields': [str(label_for_field(name, self.model, self)) for name in names],
+            'rows': [{'id': obj.pk, 'cells': [cell(obj, name) for name in names]} for obj in page],
+            'next': cursor_for(keys, page[-1]) if len(rows) > self.per_page else None,
+        }
+
+
+class InlinePagesMixin:
+    """ModelAdmin mixin serving older pages of its PaginatedInlineMixin inlines as JSON."""
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('<path:object_id>/inline/<str:model_name>/',
+                 self.admin_site.admin_view(self.inline_page_view),
+                 name='%s_%s_inline_page' % info),
+        ] + super().get_urls()
+
+    def inline_page_view(self, request, object_id, model_name):
+        # get_object goes through get_queryset, so RLS applies to the parent
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+        for inline in self.get_inline_instances(request, obj):
+            if isinstance(inline, PaginatedInlineMixin) and inline.opts.model_name == model_name:
+                try:
+                    return JsonResponse(inline.older_rows(request, obj, request.GET.get(CURSOR_VAR)))
+                except IncorrectLookupParameters:
+                    return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        raise Http404
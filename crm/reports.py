@@ -0,0 +1,291 @@
+"""
+Financial reports: profit and loss, receivables aging.
+
+Transactions for the requested range are pulled in one projected query,
+summed by the database at (month, type, client|project) grain as exact
+decimals and carried into pandas as integer cents, and everything else - income/expense split, the per-month pivot, running
+totals and margins - is done with vectorized pandas/NumPy. Finished reports
+are cached per RLS scope and filter set; the key embeds the Transaction/Client/Project versions that
+crm.signals bumps on every write, so edits invalidate it.
+
+Receivables aging starts from the indexed, database-generated
+Client.due_amount column, so "who owes us" is an index range scan
+(due_amount > 0) rather than a pass over every client.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import json
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import CharField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Substr
+
+from .exports import safe_text
+from .filters import facet_version
+from .models import Client, Project, Transaction
+from .rls_utils import get_filtered_queryset, is_manager
+
+PNL_CACHE_TIMEOUT = 900
+PNL_GROUPS = ('client', 'project', 'none')
+UNASSIGNED = 'Unassigned'
+
+
+def month_floor(day):
+    return day.replace(day=1)
+
+
+def load_transactions(user, start, end, group_by='client', clients=None, projects=None):
+    """
+    DataFrame [month ('YYYY-MM'), type, key, cents] of the transactions
+    `user` may see between `start` and `end` (inclusive), summed per month,
+    type and group key (client or project id; 0 when ungrouped or unset).
+    Sums stay decimal in the database; cents are int64, so totals are exact.
+    A transaction's client falls back to its project's client, as in
+    paid-amount sums.
+    """
+    qs = get_filtered_queryset(user, Transaction).filter(date__gte=start, date__lte=end)
+    if clients:
+        qs = qs.filter(client_id__in=clients) | qs.filter(client__isnull=True, project__client_id__in=clients)
+    if projects:
+        qs = qs.filter(project_id__in=projects)
+
+    # The month key uses plain string functions (ISO date text), which every
+    # backend runs natively - SQLite's date-trunc is a per-row Python UDF
+    qs = qs.order_by().annotate(report_month=Substr(Cast('date', CharField()), 1, 7))
+    if group_by == 'client':
+        qs = qs.annotate(report_key=Coalesce('client_id', 'project__client_id'))
+    elif group_by == 'project':
+        qs = qs.annotate(report_key=Coalesce('project_id', 0))
+    keys = ['report_month', 'transaction_type'] + (['report_key'] if group_by != 'none' else [])
+    rows = [
+        (*row[:-1], int((row[-1] or 0) * 100))
+        for row in qs.values(*keys).annotate(total=Sum('amount')).values_list(*keys, 'total')
+    ]
+
+    df = pd.DataFrame.from_records(rows, columns=['month', 'type'] + (['key'] if group_by != 'none' else []) + ['cents'])
+    if 'key' not in df:
+        df['key'] = 0
+    df['key'] = pd.to_numeric(df['key']).fillna(0).astype('int64')
+    df['cents'] = df['cents'].astype('int64')
+    return df
+
+
+def _margin(net, income):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(income > 0, net / income * 100, np.nan)
+    return np.round(margin, 1)
+
+
+def _units(cents):
+    return round(cents / 100, 2)
+
+
+def _nan_to_none(values):
+    return [None if v != v else v for v in values.tolist()]
+
+
+def build_pnl(df, start, end, group_by='client', names=None):
+    """
+    P&L dict for a transactions frame: overall totals, a monthly series
+    with running (cumulative) net, and one row per client/project with
+    totals, margin and net per month.
+    """
+    months = pd.period_range(month_floor(start), month_floor(end), freq='M')
+    month_labels = [str(m) for m in months]
+
+    is_income = (df['type'] == 'INCOME').to_numpy()
+    cents = df['cents'].to_numpy(dtype='int64')
+    frame = pd.DataFrame({
+        'month': pd.PeriodIndex(df['month'], freq='M'),
+        'key': df['key'].to_numpy(),
+        'income': np.where(is_income, cents, 0),
+        'expense': np.where(is_income, 0, cents),
+    })
+    frame['net'] = frame['income'] - frame['expense']
+
+    monthly = frame.groupby('month')[['income', 'expense', 'net']].sum().reindex(months, fill_value=0)
+    monthly['cumulative_net'] = monthly['net'].cumsum()
+    monthly['margin'] = _margin(monthly['net'].to_numpy(), monthly['income'].to_numpy())
+
+    income, expense = int(frame['income'].sum()), int(frame['expense'].sum())
+    report = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'months': month_labels,
+        'totals': {
+            'income': _units(income), 'expense': _units(expense), 'net': _units(income - expense),
+            'margin': _nan_to_none(_margin(np.array([income - expense]), np.array([income])))[0],
+        },
+        'monthly': [
+            {'month': label, 'income': _units(i), 'expense': _units(e), 'net': _units(n),
+             'cumulative_net': _units(c), 'margin': m}
+            for label, i, e, n, c, m in zip(
+                month_labels, monthly['income'].tolist(), monthly['expense'].tolist(), monthly['net'].tolist(),
+                monthly['cumulative_net'].tolist(), _nan_to_none(monthly['margin'].to_numpy()),
+            )
+        ],
+        'rows': [],
+    }
+    if group_by == 'none' or frame.empty:
+        return report
+
+    totals = frame.groupby('key')[['income', 'expense', 'net']].sum()
+    totals['margin'] = _margin(totals['net'].to_numpy(), totals['income'].to_numpy())
+    per_month = frame.pivot_table(
+        index='key', columns='month', values='net', aggfunc='sum', fill_value=0, observed=True
+    ).reindex(columns=months, fill_value=0).reindex(totals.index, fill_value=0)
+    totals = totals.sort_values('net', ascending=False)
+    per_month = per_month.loc[totals.index]
+
+    names = names or {}
+    report['rows'] = [
+        {'id': int(k) or None, 'name': names.get(int(k), UNASSIGNED), 'income': _units(i), 'expense': _units(e),
+         'net': _units(n), 'margin': m, 'monthly_net': [_units(v) for v in row]}
+        for k, i, e, n, m, row in zip(
+            totals.index.tolist(), totals['income'].tolist(), totals['expense'].tolist(), totals['net'].tolist(),
+            _nan_to_none(totals['margin'].to_numpy()), per_month.to_numpy().tolist(),
+        )
+    ]
+    return report
+
+
+def _group_names(group_by, ids):
+    ids = [i for i in ids if i]
+    if group_by == 'client':
+        return dict(Client.objects.filter(pk__in=ids).values_list('pk', 'name'))
+    if group_by == 'project':
+        return dict(Project.objects.filter(pk__in=ids).values_list('pk', 'project_name'))
+    return {}
+
+
+def pnl_report(user, start, end, group_by='client', clients=None, projects=None):
+    """Cached P&L for `user`'s RLS scope and the given filters."""
+    params = json.dumps([start.isoformat(), end.isoformat(), group_by, sorted(clients or []), sorted(projects or [])])
+    scope = 'all' if is_manager(user) else f'user:{user.pk}'
+    versions = ':'.join(str(facet_version(m)) for m in (Transaction, Client, Project))
+    key = f"pnl:{scope}:{versions}:{hashlib.md5(params.encode()).hexdigest()}"
+
+    report = cache.get(key)
+    if report is None:
+        df = load_transactions(user, start, end, group_by, clients, projects)
+        ids = df['key'].unique().tolist() if group_by != 'none' else []
+        report = build_pnl(df, start, end, group_by, _group_names(group_by, ids))
+        cache.set(key, report, PNL_CACHE_TIMEOUT)
+    return report
+
+
+def pnl_csv(report):
+    """CSV text: one line per group (or month when ungrouped) plus a total line."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if report['rows']:
+        writer.writerow([report['group_by'].title(), 'Income', 'Expense', 'Net', 'Margin %'] + report['months'])
+        for row in report['rows']:
+            writer.writerow([safe_text(row['name']), row['income'], row['expense'], row['net'], row['margin']] + row['monthly_net'])
+        writer.writerow(['Total', report['totals']['income'], report['totals']['expense'], report['totals']['net'],
+                         report['totals']['margin']] + [m['net'] for m in report['monthly']])
+    else:
+        writer.writerow(['Month', 'Income', 'Expense', 'Net', 'Cumulative Net', 'Margin %'])
+        for m in report['monthly']:
+            writer.writerow([m['month'], m['income'], m['expense'], m['net'], m['cumulative_net'], m['margin']])
+        t = report['totals']
+        writer.writerow(['Total', t['income'], t['expense'], t['net'], '', t['margin']])
+    return out.getvalue()
+
+
+def parse_month_range(start, end, today=None):
+    """(start date, end date) from 'YYYY-MM' or 'YYYY-MM-DD' strings; default is the last 12 months."""
+    today = today or datetime.date.today()
+
+    def parse(value, last_day):
+        if not value:
+            return None
+        if len(value) == 7:
+            day = datetime.datetime.strptime(value, '%Y-%m').date()
+            if last_day:
+                day = (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+            return day
+        return datetime.date.fromisoformat(value)
+
+    end_day = parse(end, True) or today
+    start_day = parse(start, False) or (month_floor(end_day) - datetime.timedelta(days=330)).replace(day=1)
+    if start_day > end_day:
+        raise ValueError('start is after end')
+    return start_day, end_day
+
+
+# --- Receivables aging ---
+# Bands by days since the client's last payment (or since they became a
+# client, if they never paid); None = open-ended
+AGING_BANDS = ((30, '0-30 days'), (60, '31-60 days'), (90, '61-90 days'), (None, '90+ days'))
+
+
+def _aging_band(days):
+    for limit, label in AGING_BANDS:
+        if limit is None or days <= limit:
+            return label
+
+
+def receivables_aging(user, today, min_due=0):
+    """
+    Clients in `user`'s scope owing more than `min_due`, largest balance
+    first, each with its last payment date and aging band, plus totals per band.
+    """
+    last_payment = (
+        Transaction.objects.filter(Q(client=OuterRef('pk')) | Q(client__isnull=True, project__client=OuterRef('pk')))
+        .filter(transaction_type='INCOME')
+        .order_by('-date')
+        .values('date')[:1]
+    )
+    clients = get_filtered_queryset(user, Client).filter(due_amount__gt=min_due)
+    if not is_manager(user):
+        clients = clients.distinct()
+    rows = clients.annotate(last_payment=Subquery(last_payment)).order_by('-due_amount', 'pk').values_list(
+        'id', 'name', 'company_name', 'total_payable', 'paid_amount', 'due_amount', 'created_at', 'last_payment',
+    )
+
+    bands = {label: {'band': label, 'clients': 0, 'due': Decimal('0')} for _, label in AGING_BANDS}
+    report_rows = []
+    for pk, name, company, payable, paid, due, created_at, last_payment in rows:
+        since = last_payment or created_at.date()
+        days = max((today - since).days, 0)
+        band = _aging_band(days)
+        bands[band]['clients'] += 1
+        bands[band]['due'] += due
+        report_rows.append({
+            'id': pk, 'name': name, 'company_name': company, 'total_payable': float(payable),
+            'paid_amount': float(paid), 'due_amount': float(due),
+            'last_payment': last_payment.isoformat() if last_payment else None, 'days': days, 'band': band,
+        })
+
+    total_due = sum(b['due'] for b in bands.values())
+    for band in bands.values():
+        band['due'] = float(band['due'])
+    return {
+        'as_of': today.isoformat(),
+        'min_due': float(min_due),
+        'totals': {'clients': len(report_rows), 'due': float(total_due)},
+        'bands': list(bands.values()),
+        'rows': report_rows,
+    }
+
+
+def receivables_csv(report):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Client', 'Company', 'Total Payable', 'Paid', 'Due', 'Last Payment', 'Days', 'Band'])
+    for row in report['rows']:
+        writer.writerow([safe_text(row['name']), safe_text(row['company_name'] or ''), row['total_payable'], row['paid_amount'],
+                         row['due_amount'], row['last_payment'] or '', row['days'], row['band']])
+    writer.writerow([])
+    writer.writerow(['Band', 'Clients', 'Due'])
+    for band in report['bands']:
+        writer.writerow([band['band'], band['clients'], band['due']])
+    writer.writerow(['Total', report['totals']['clients'], report['totals']['due']])
+    return out.getvalue()
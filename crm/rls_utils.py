@@ -1,4 +1,10 @@
-from .models import Client, Project, Lead, Task, Transaction
+from .models import Client, Project, Lead, Task, Transaction, Interaction
+
+def is_manager(user):
+    """Manager/Superuser check, remembered on the user object (one query per request, not per queryset)."""
+    if not hasattr(user, '_crm_is_manager'):
+        user._crm_is_manager = user.is_superuser or user.groups.filter(name='Manager').exists()
+    return user._crm_is_manager
 
 def get_filtered_queryset(user, model_class):
     """
@@ -7,7 +13,7 @@ def get_filtered_queryset(user, model_class):
     Sales Agent -> Assigned Data Only
     """
     qs = model_class.objects.all()
-    if user.is_superuser or user.groups.filter(name='Manager').exists():
+    if is_manager(user):
         return qs
     
     # RLS Logic
@@ -22,5 +28,8 @@ def get_filtered_queryset(user, model_class):
     elif model_class == Transaction:
         # Transactions related to their projects OR clients
         return qs.filter(client__assigned_to=user) | qs.filter(project__client__assigned_to=user)
+    elif model_class == Interaction:
+        # Interactions on their clients OR leads
+        return qs.filter(client__assigned_to=user) | qs.filter(lead__assigned_to=user)
     
     return qs
@@ -0,0 +1,130 @@
+"""
+Read-replica routing for report-style reads.
+
+Only code that opts in with @replica_reads / use_replica() - the dashboard,
+calendar feed, KPI actuals, reports and exports - reads from
+settings.REPLICA_DB_ALIAS; everything else, and every write, uses the
+primary. Once a request writes, the rest of it reads the primary, and
+PrimaryPinMiddleware keeps that browser on the primary for
+REPLICA_STICKY_SECONDS, so users see their own changes despite replica lag.
+
+Without a replica configured (REPLICA_DATABASE_URL) this is all a no-op.
+"""
+import contextvars
+import functools
+import inspect
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'crm_primary_pin'
+
+_replica_reads = contextvars.ContextVar('crm_replica_reads', default=False)
+_pinned = contextvars.ContextVar('crm_pinned_to_primary', default=False)
+_wrote = contextvars.ContextVar('crm_wrote', default=False)
+
+
+def replica_alias():
+    """The configured replica alias, or None."""
+    alias = getattr(settings, 'REPLICA_DB_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def reporting_db():
+    """Alias for explicit .using() on report querysets evaluated outside use_replica() (streamed exports)."""
+    return None if _pinned.get() else replica_alias()
+
+
+@contextmanager
+def use_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(func):
+    """Run `func` (a view or helper, sync or async) with its reads routed to the replica."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            # Threads started by sync_to_async copy this context
+            with use_replica():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _pinned.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes: everything after a write in this context uses the primary
+        if replica_alias() is not None:
+            _pinned.set(True)
+            _wrote.set(True)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {'default', replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class PrimaryPinMiddleware:
+    """
+    Scope router state to the request and pin browsers that just wrote to
+    the primary. Sync and async capable, so async views aren't pushed onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if replica_alias() is None:
+            return self.get_response(request)
+        pinned, wrote = self.scope(request)
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            _pinned.reset(pinned)
+            _wrote.reset(wrote)
+
+    async def __acall__(self, request):
+        if replica_alias() is None:
+            return await self.get_response(request)
+        pinned, wrote = self.scope(request)
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            _pinned.reset(pinned)
+            _wrote.reset(wrote)
+
+    def scope(self, request):
+        """Fresh router state for this request; the reset tokens."""
+        return _pinned.set(PIN_COOKIE in request.COOKIES), _wrote.set(False)
+
+    def pin(self, response):
+        if _wrote.get():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,123 @@
+"""
+Full-text search for the crm admin.
+
+SQLite: an external-content FTS5 table per model (crm_<model>_fts), kept in
+sync by AFTER INSERT/UPDATE/DELETE triggers, so bulk_create and queryset
+.update() are indexed too.
+Postgres: a GIN index on the model's to_tsvector('simple', ...) expression,
+which the database maintains itself.
+
+Other backends (or a term with no searchable words) return None and callers
+fall back to Django's default icontains search.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# model label -> indexed text columns
+FULLTEXT_FIELDS = {
+    'crm.lead': ('name', 'company_name', 'source', 'contact_info'),
+    'crm.client': ('name', 'company_name'),
+    'crm.project': ('project_name',),
+    'crm.transaction': ('description',),
+}
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def _pg_document(columns):
+    return "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({c}, '')" for c in columns) + ")"
+
+
+def install_sql(vendor, table, columns, pk='id'):
+    """
+    DDL that creates (and backfills) the full-text index for one table.
+    Migrations keep a frozen copy (0020); use this when writing the next one.
+    """
+    if vendor == 'sqlite':
+        fts = _fts_table(table)
+        cols = ', '.join(columns)
+        new_cols = ', '.join(f'new.{c}' for c in columns)
+        old_cols = ', '.join(f'old.{c}' for c in columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='{pk}', tokenize='unicode61')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_cols}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_cols}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_cols}); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    if vendor == 'postgresql':
+        return [f"CREATE INDEX IF NOT EXISTS {table}_fts_idx ON {table} USING GIN ({_pg_document(columns)})"]
+    return []
+
+
+def uninstall_sql(vendor, table):
+    if vendor == 'sqlite':
+        fts = _fts_table(table)
+        return [f"DROP TRIGGER IF EXISTS {fts}_{t}" for t in ('ai', 'ad', 'au')] + [f"DROP TABLE IF EXISTS {fts}"]
+    if vendor == 'postgresql':
+        return [f"DROP INDEX IF EXISTS {table}_fts_idx"]
+    return []
+
+
+def match_subquery(model, search_term, using='default'):
+    """
+    RawSQL selecting the pks of `model` rows matching every word of
+    `search_term` (as prefixes), or None if full-text search can't be used.
+    """
+    columns = FULLTEXT_FIELDS.get(model._meta.label_lower)
+    words = WORD_RE.findall(search_term)
+    vendor = connections[using].vendor
+    if not columns or not words:
+        return None
+
+    table, pk = model._meta.db_table, model._meta.pk.column
+    if vendor == 'sqlite':
+        fts = _fts_table(table)
+        query = ' '.join('"%s"*' % w for w in words)
+        return RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [query])
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{w}:*' for w in words)
+        return RawSQL(
+            f"SELECT {pk} FROM {table} WHERE {_pg_document(columns)} @@ to_tsquery('simple', %s)", [query]
+        )
+    return None
+
+
+class FullTextSearchMixin:
+    """
+    ModelAdmin mixin: answer the changelist search box from the full-text index.
+    `fulltext_related` lists FK fields whose targets are searched too. Each
+    word may match the row or any of those targets, so "acme invoice" finds
+    a transaction of client Acme whose description mentions an invoice.
+    """
+    fulltext_related = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        subquery = match_subquery(queryset.model, search_term, queryset.db)
+        if subquery is None:
+            return super().get_search_results(request, queryset, search_term)
+        if not self.fulltext_related:
+            return queryset.filter(pk__in=subquery), False
+
+        related = [(field_name, queryset.model._meta.get_field(field_name).related_model)
+                   for field_name in self.fulltext_related]
+        condition = Q()
+        for word in WORD_RE.findall(search_term):
+            matches = Q(pk__in=match_subquery(queryset.model, word, queryset.db))
+            for field_name, model in related:
+                related_subquery = match_subquery(model, word, queryset.db)
+                if related_subquery is not None:
+                    matches |= Q(**{f'{field_name}__in': related_subquery})
+            condition &= matches
+        return queryset.filter(condition), False
@@ -1,20 +1,37 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
-from .models import Client, Project, Lead, Transaction
+from django.db import transaction
+from django.utils.html import escape
+from .models import Client, Project, Lead, Transaction, Task, Document, Interaction
 from .utils import send_staff_notification
+from .suggest import index_instance, unindex_instance
+from .filters import acache_version, bump_cache_version, bump_facet_version, cache_version
+from .rollups import refresh_revenue_month
+from .metrics import DASHBOARD_INVALIDATIONS
+
+DASHBOARD_CACHE = 'dashboard'
+
+def dashboard_cache_version():
+    return cache_version(DASHBOARD_CACHE)
+
+async def adashboard_cache_version():
+    return await acache_version(DASHBOARD_CACHE)
 
 def clear_dashboard_cache(instance):
     """Clear all dashboard-related caches when data changes."""
-    # We use a pattern to clear relevant caches. 
-    # Since locmem doesn't support clear by pattern easily, we can just clear everything
-    # or specific keys if we know them. For simplicity and reliability:
-    cache.clear()
-    print("DEBUG: Dashboard cache cleared due to data change.")
+    # Dashboard keys embed dashboard_cache_version(), so bumping it retires
+    # them all; cache.clear() would also wipe the facet counts and rollups
+    bump_cache_version(DASHBOARD_CACHE)
+    DASHBOARD_INVALIDATIONS.inc()
 
 @receiver([post_save, post_delete], sender=Client)
 def on_client_change(sender, instance, **kwargs):
     clear_dashboard_cache(instance)
+    # Only this client's month of the revenue rollup is recomputed
+    if instance.created_at:
+        month = instance.created_at
+        transaction.on_commit(lambda: refresh_revenue_month(month))
 
 @receiver([post_save, post_delete], sender=Project)
 def on_project_change(sender, instance, **kwargs):
@@ -28,6 +45,30 @@ def on_lead_change(sender, instance, **kwargs):
 def on_transaction_change(sender, instance, **kwargs):
     clear_dashboard_cache(instance)
 
+# --- Admin facet counts (crm.filters) are cached per model version ---
+@receiver([post_save, post_delete], sender=Client)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Lead)
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Document)
+@receiver([post_save, post_delete], sender=Interaction)
+def on_facet_source_change(sender, **kwargs):
+    bump_facet_version(sender)
+
+# --- Typeahead index (crm.suggest) stays current as names change ---
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Lead)
+@receiver(post_save, sender=Project)
+def on_suggest_source_saved(sender, instance, using, **kwargs):
+    index_instance(sender._meta.model_name, instance, using)
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Lead)
+@receiver(post_delete, sender=Project)
+def on_suggest_source_deleted(sender, instance, using, **kwargs):
+    unindex_instance(sender._meta.model_name, instance, using)
+
 @receiver(post_save, sender=Client)
 def notify_new_client(sender, instance, created, **kwargs):
     if created:
@@ -124,3 +165,35 @@ def notify_new_project(sender, instance, created, **kwargs):
         """
         
         send_staff_notification(subject, message, html_message=html_message)
+
+def notify_converted_clients(clients):
+    """One digest email for a batch of leads converted to clients (bulk_create skips post_save)."""
+    if not clients:
+        return
+    subject = f"🚀 {len(clients)} New Clients Joined (Lead Conversion)"
+
+    message = "New Clients Added from Leads:\n" + "\n".join(
+        f"- {c.name} ({c.company_name}): http://127.0.0.1:8000/admin/crm/client/{c.id}/change/"
+        for c in clients
+    )
+
+    rows = "".join(
+        f'<tr style="background-color: {"#f9f9f9" if i % 2 == 0 else "#fff"};">'
+        f'<td style="padding: 10px;"><a href="http://127.0.0.1:8000/admin/crm/client/{c.id}/change/">{escape(c.name)}</a></td>'
+        f'<td style="padding: 10px;">{escape(c.company_name)}</td></tr>'
+        for i, c in enumerate(clients[:50])
+    )
+    more = f'<p style="color: #555;">…and {len(clients) - 50} more.</p>' if len(clients) > 50 else ''
+
+    html_message = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #e0e0e0; border-radius: 8px;">
+        <h2 style="color: #FF8C00; text-align: center;">Techvilo CRM</h2>
+        <hr style="border: 0; border-top: 1px solid #eee;">
+        <h3 style="color: #333;">🚀 {len(clients)} Leads Converted to Clients!</h3>
+        <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">{rows}</table>
+        {more}
+        <p style="text-align: center; color: #999; font-size: 12px; margin-top: 30px;">This is an automated notification from Techvilo CRM.</p>
+    </div>
+    """
+
+    send_staff_notification(subject, message, html_message=html_message)
@@ -0,0 +1,179 @@
+"""
+Columnar snapshots of the CRM tables for offline analytics.
+
+`manage.py export_snapshot` writes each table as
+
+    <SNAPSHOT_DIR>/<table>/month=YYYY-MM/part-<first id>.<parquet|feather>
+
+partitioned by the table's date column, and records the highest exported id
+per table in <SNAPSHOT_DIR>/_state.json so the next run only appends newer
+rows. Reports load the files back with load_table() instead of querying the
+OLTP database.
+
+Rows are appended by id, so edits to already-exported rows (a lead changing
+status, say) only show up after an export with --full.
+"""
+import datetime
+import json
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .models import Client, Lead, Project, Task, Interaction, Transaction
+
+# table -> (model, partition date column)
+SNAPSHOT_TABLES = {
+    'client': (Client, 'created_at'),
+    'lead': (Lead, 'created_at'),
+    'project': (Project, 'created_at'),
+    'task': (Task, 'due_date'),
+    'interaction': (Interaction, 'created_at'),
+    'transaction': (Transaction, 'date'),
+}
+FORMATS = ('parquet', 'feather')
+# Partition for rows whose date column is empty (e.g. tasks without a due date)
+UNDATED = 'none'
+STATE_FILE = '_state.json'
+
+
+def snapshot_root(root=None):
+    return Path(root or getattr(settings, 'SNAPSHOT_DIR', settings.BASE_DIR / 'snapshots'))
+
+
+def read_state(root=None):
+    path = snapshot_root(root) / STATE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def write_state(state, root=None):
+    path = snapshot_root(root) / STATE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def snapshot_columns(model):
+    return [f.attname for f in model._meta.concrete_fields]
+
+
+def rows_to_frame(model, rows):
+    """DataFrame for value tuples in snapshot_columns(model) order, with analysis-friendly dtypes."""
+    df = pd.DataFrame.from_records(rows, columns=snapshot_columns(model))
+    for field in model._meta.concrete_fields:
+        col = field.attname
+        if isinstance(field, models.DecimalField):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif isinstance(field, models.DateTimeField):
+            df[col] = pd.to_datetime(df[col], utc=True)
+        elif isinstance(field, models.DateField):
+            df[col] = pd.to_datetime(df[col])
+        elif field.null and isinstance(field.target_field if field.is_relation else field, models.IntegerField):
+            # Nullable ids stay integers (pandas' Int64) rather than object/float
+            df[col] = df[col].astype('Int64')
+    return df
+
+
+def partition_keys(series):
+    """'YYYY-MM' (in the project time zone) for each value of a date/datetime column."""
+    if getattr(series.dt, 'tz', None) is not None:
+        series = series.dt.tz_convert(settings.TIME_ZONE)
+    return series.dt.strftime('%Y-%m').fillna(UNDATED)
+
+
+def _write_frame(df, path, fmt):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    if fmt == 'parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(tmp)
+    tmp.replace(path)
+
+
+def export_table(name, root=None, fmt='parquet', after_id=0, since=None, chunk_size=50000):
+    """
+    Append rows of table `name` with id > after_id (and date column >= since)
+    to the snapshot. Returns (rows written, highest id written or after_id).
+    """
+    model, date_column = SNAPSHOT_TABLES[name]
+    table_dir = snapshot_root(root) / name
+    qs = model.objects.filter(pk__gt=after_id).order_by('pk')
+    if since:
+        if isinstance(model._meta.get_field(date_column), models.DateTimeField):
+            # Local midnight, so partitions and the filter agree on the day
+            since = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min))
+        qs = qs.filter(**{f'{date_column}__gte': since})
+
+    written, last_id, batch = 0, after_id, []
+
+    def flush():
+        df = rows_to_frame(model, batch)
+        for month, part in df.groupby(partition_keys(df[date_column]), sort=False):
+            path = table_dir / f'month={month}' / f'part-{int(part["id"].iloc[0]):012d}.{fmt}'
+            _write_frame(part, path, fmt)
+        batch.clear()
+
+    for row in qs.values_list(*snapshot_columns(model)).iterator(chunk_size=min(chunk_size, 5000)):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            last_id = batch[-1][0]
+            written += len(batch)
+            flush()
+    if batch:
+        last_id = batch[-1][0]
+        written += len(batch)
+        flush()
+    return written, last_id
+
+
+def _month_str(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m')
+    return str(value)[:7]
+
+
+def load_table(name, root=None, start=None, end=None, columns=None):
+    """
+    The snapshot of table `name` as a DataFrame, optionally limited to the
+    month partitions from `start` to `end` (inclusive; dates or 'YYYY-MM').
+    Only matching partition files are read. Adds a 'month' column.
+    """
+    model, _ = SNAPSHOT_TABLES[name]
+    table_dir = snapshot_root(root) / name
+    lo = _month_str(start) if start else None
+    hi = _month_str(end) if end else None
+
+    frames = []
+    for part_dir in sorted(table_dir.glob('month=*')):
+        month = part_dir.name.split('=', 1)[1]
+        if (lo or hi) and (month == UNDATED or (lo and month < lo) or (hi and month > hi)):
+            continue
+        for path in sorted(part_dir.glob('part-*')):
+            if path.suffix == '.parquet':
+                df = pd.read_parquet(path, columns=columns)
+            elif path.suffix == '.feather':
+                df = pd.read_feather(path, columns=columns)
+            else:
+                continue
+            df['month'] = month
+            frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=(columns or snapshot_columns(model)) + ['month'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def snapshot_info(root=None):
+    """{table: state} plus how stale each table is, for reports to display."""
+    state = read_state(root)
+    now = timezone.now()
+    for info in state.get('tables', {}).values():
+        exported = datetime.datetime.fromisoformat(info['exported_at'])
+        info['age_hours'] = round((now - exported).total_seconds() / 3600, 1)
+    return state
@@ -0,0 +1,49 @@
+"""
+Opt-in SQLite performance profile (settings.SQLITE_PERFORMANCE).
+
+Applied to every new SQLite connection through connection_created:
+
+  journal_mode=WAL    readers and the writer no longer block each other
+  synchronous=NORMAL  fsync at checkpoints only; with WAL a power cut can
+                      lose the last commits but never corrupts the file
+  mmap_size           read pages through memory-mapped I/O
+  cache_size          bigger per-connection page cache (negative = KiB)
+  busy_timeout        wait for the write lock instead of failing at once
+                      with "database is locked"
+  temp_store=MEMORY   sorts and temp indexes stay off disk
+
+settings.py also starts transactions with BEGIN IMMEDIATE in this mode, so
+a read-then-write transaction takes the write lock up front (and waits
+busy_timeout for it) instead of deadlocking on the lock upgrade.
+Individual values can be overridden with settings.SQLITE_PRAGMAS.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    return {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """Run PRAGMA name=value for each entry on a DB-API (or Django) cursor."""
+    for name, value in (pragmas or sqlite_pragmas()).items():
+        cursor.execute(f'PRAGMA {name}={value}')
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_PERFORMANCE', False):
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
@@ -0,0 +1,106 @@
+"""
+Client statements: every transaction of a client with running balances.
+
+Running totals are computed by the database with window functions
+(Window(Sum(...)) over date, id). Pages are keyset-paginated on (date, id):
+the page's rows are picked with an index seek + LIMIT, the window only runs
+over those rows, and the totals carried over from earlier pages travel in
+the cursor - so page 500 of a long statement costs the same as page 1. The
+cursor is signed together with the client's pk, so it can't be replayed
+against another client's statement.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When, Window
+
+from .models import Transaction
+from .pagination import seek_filter
+
+STATEMENT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STATEMENT_ORDERING = ('date', 'id')
+CENT = Decimal('0.01')
+_CURSOR_SALT = 'crm.statement'
+
+_money = DecimalField(max_digits=14, decimal_places=2)
+_zero = Value(Decimal('0'), output_field=_money)
+
+
+def client_transactions(client):
+    """Transactions of `client`, directly or through one of its projects (as in paid_amount)."""
+    return Transaction.objects.filter(Q(client=client) | Q(client__isnull=True, project__client=client))
+
+
+def encode_statement_cursor(client, row):
+    """Signed cursor after `row` of `client`'s statement; the client is signed in with it."""
+    return signing.dumps(
+        [client.pk, row['date'].isoformat(), row['id'], str(row['running_paid']), str(row['running_net'])],
+        salt=_CURSOR_SALT, compress=True,
+    )
+
+
+def decode_statement_cursor(client, token):
+    """(date, id, paid so far, net so far) or raises ValueError, also for another client's cursor."""
+    try:
+        client_pk, day, pk, paid, net = signing.loads(token, salt=_CURSOR_SALT)
+        cursor = datetime.date.fromisoformat(day), int(pk), Decimal(paid), Decimal(net)
+    except (signing.BadSignature, TypeError, ValueError, ArithmeticError) as e:
+        raise ValueError('invalid cursor') from e
+    if client_pk != client.pk:
+        # Its carried totals belong to another client's statement
+        raise ValueError('invalid cursor')
+    return cursor
+
+
+def statement_page(client, cursor=None, size=STATEMENT_PAGE_SIZE):
+    """
+    One page of `client`'s statement, oldest first:
+    {'rows': [...], 'next': cursor or None, 'opening_paid', 'opening_net'}.
+    Each row has its amount, the running total paid (income), the balance
+    still due after it (total_payable - paid so far) and the running net
+    (income - expense).
+    """
+    base = client_transactions(client)
+    opening_paid = opening_net = Decimal('0')
+    if cursor:
+        day, pk, opening_paid, opening_net = decode_statement_cursor(client, cursor)
+        base = base.filter(seek_filter(
+            [(Transaction._meta.get_field('date'), False), (Transaction._meta.pk, False)], [day, pk]
+        ))
+
+    # Seek + LIMIT first, then window over just this page's rows
+    page_ids = base.order_by(*STATEMENT_ORDERING).values('pk')[:size + 1]
+    income = Case(When(transaction_type='INCOME', then=F('amount')), default=_zero, output_field=_money)
+    signed = Case(When(transaction_type='INCOME', then=F('amount')), default=-F('amount'), output_field=_money)
+    order = [F('date').asc(), F('id').asc()]
+    rows = list(
+        Transaction.objects.filter(pk__in=page_ids)
+        .annotate(
+            paid_in_page=Window(Sum(income), order_by=order),
+            net_in_page=Window(Sum(signed), order_by=order),
+        )
+        .order_by(*STATEMENT_ORDERING)
+        .values(
+            'id', 'date', 'transaction_type', 'description', 'amount',
+            'project_id', 'project__project_name', 'paid_in_page', 'net_in_page',
+        )
+    )
+
+    has_next = len(rows) > size
+    rows = rows[:size]
+    for row in rows:
+        # SQLite sums NUMERIC as floats; round back to cents
+        row['running_paid'] = opening_paid + Decimal(row.pop('paid_in_page')).quantize(CENT)
+        row['running_net'] = opening_net + Decimal(row.pop('net_in_page')).quantize(CENT)
+        row['balance'] = client.total_payable - row['running_paid']
+        row['project_name'] = row.pop('project__project_name')
+
+    return {
+        'rows': rows,
+        'next': encode_statement_cursor(client, rows[-1]) if has_next else None,
+        'opening_paid': opening_paid,
+        'opening_net': opening_net,
+        'opening_balance': client.total_payable - opening_paid,
+    }
@@ -0,0 +1,327 @@
+"""
+In-memory trigram index for typeahead / fuzzy name lookup.
+
+Indexes Client.name/company_name, Lead.name/company_name and
+Project.project_name. Built lazily on the first lookup (or eagerly with
+get_indexes()) and kept current by the post_save/post_delete receivers in
+crm.signals, applied when the write commits. The index is per process, so
+writes made in other workers (or by bulk_create / queryset.update()) are
+picked up by rebuilding it on a background thread once it is INDEX_MAX_AGE
+old; updates committed during a rebuild are replayed onto the new index.
+reset_indexes() drops it after a bulk write.
+Lookups rank by trigram similarity with a bonus for prefix matches, so
+partial and misspelled names still find their record.
+"""
+import logging
+import threading
+import time
+from array import array
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Client, Lead, Project
+
+# kind -> (model, indexed fields)
+SUGGEST_SOURCES = {
+    'client': (Client, ('name', 'company_name')),
+    'lead': (Lead, ('name', 'company_name')),
+    'project': (Project, ('project_name',)),
+}
+
+# Candidates rescored in Python after the vectorized overlap count
+CANDIDATES_PER_RESULT = 10
+# Trigram count stored for removed terms, so they never rank
+DEAD_SIZE = 65535
+# Seconds before a process rebuilds its index from the database
+INDEX_MAX_AGE = 300
+# Hits fetched per requested result before RLS filtering; grown until `limit` survive
+RLS_OVERFETCH = 3
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def trigrams(text):
+    padded = f'  {normalize(text)} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Trigram -> term-id postings. Posting lists are append-only Python lists
+    with a lazily refreshed numpy copy, so a lookup is a handful of
+    vectorized passes (overlap counts, then Jaccard on the best-overlapping
+    terms) regardless of how common the query's trigrams are. Removed terms
+    are tombstoned and compacted in bulk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}      # trigram -> [term id]
+        self._arrays = {}       # trigram -> np.ndarray snapshot of postings[trigram]
+        self.terms = []         # term id -> (pk, label, text), None once removed
+        self.sizes = array('H') # term id -> trigram count (DEAD_SIZE once removed)
+        self.by_pk = {}         # pk -> [term id]
+        self._dead = 0
+
+    def __len__(self):
+        return len(self.terms) - self._dead
+
+    def add(self, pk, label, values):
+        """(Re)index one record. `values` are the strings it should be findable by."""
+        with self._lock:
+            self._remove(pk)
+            ids = []
+            for text in values:
+                grams = trigrams(text)
+                if not grams:
+                    continue
+                tid = len(self.terms)
+                self.terms.append((pk, label, normalize(text)))
+                self.sizes.append(min(len(grams), DEAD_SIZE - 1))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(tid)
+                    self._arrays.pop(gram, None)
+                ids.append(tid)
+            if ids:
+                self.by_pk[pk] = ids
+
+    def remove(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        for tid in self.by_pk.pop(pk, ()):
+            self.terms[tid] = None
+            self.sizes[tid] = DEAD_SIZE
+            self._dead += 1
+        if self._dead > 10000 and self._dead * 4 > len(self.terms):
+            self._compact()
+
+    def _compact(self):
+        live = [(pk, tid) for pk, tids in self.by_pk.items() for tid in tids]
+        old_terms, old_sizes = self.terms, self.sizes
+        self.terms, self.sizes, self.postings, self._arrays, self.by_pk, self._dead = [], array('H'), {}, {}, {}, 0
+        for pk, tid in live:
+            new_tid = len(self.terms)
+            self.terms.append(old_terms[tid])
+            self.sizes.append(old_sizes[tid])
+            for gram in trigrams(old_terms[tid][2]):
+                self.postings.setdefault(gram, []).append(new_tid)
+            self.by_pk.setdefault(pk, []).append(new_tid)
+
+    def warm(self):
+        """Snapshot every posting list to numpy up front (call after a bulk build)."""
+        with self._lock:
+            for gram in self.postings:
+                self._array(gram)
+
+    def _array(self, gram):
+        arr = self._arrays.get(gram)
+        if arr is None:
+            arr = self._arrays[gram] = np.array(self.postings[gram], dtype=np.int32)
+        return arr
+
+    def search(self, query, limit=10):
+        """
+        Ranked [(score, pk, label)] for `query`, best first, one row per
+        record. Scores are trigram Jaccard similarity plus 0.5 for a prefix match.
+        """
+        q = normalize(query)
+        q_grams = trigrams(q)
+        if not q_grams:
+            return []
+
+        n_q = len(q_grams)
+        want = limit * CANDIDATES_PER_RESULT
+        with self._lock:
+            arrays = [self._array(g) for g in q_grams if g in self.postings]
+            if not arrays:
+                return []
+            shared = np.bincount(np.concatenate(arrays))
+
+            # Lowest overlap that still leaves `want` terms, from the overlap histogram
+            hist = np.bincount(shared)
+            at_least = np.cumsum(hist[::-1])[::-1]
+            qualifying = np.flatnonzero(at_least[1:] >= want)
+            floor = int(qualifying[-1]) + 1 if len(qualifying) else 1
+            ids = np.flatnonzero(shared >= floor)
+
+            sizes = np.frombuffer(self.sizes, dtype=np.uint16)[ids]
+            overlap = shared[ids]
+            jaccard = overlap / (n_q + sizes.astype(np.int64) - overlap)
+            if len(ids) > want:
+                keep = np.argpartition(jaccard, -want)[-want:]
+                ids, jaccard = ids[keep], jaccard[keep]
+            candidates = [(self.terms[tid], score) for tid, score in zip(ids.tolist(), jaccard.tolist())]
+
+        best = {}
+        for term, score in candidates:
+            if term is None:
+                continue
+            pk, label, text = term
+            if text.startswith(q):
+                score += 0.5
+            if score > best.get(pk, (0,))[0]:
+                best[pk] = (score, pk, label)
+
+        return sorted(best.values(), key=lambda r: -r[0])[:limit]
+
+
+_indexes = None
+_built_at = 0.0
+# Serializes builds; _state_lock guards swapping _indexes and the update queue
+_build_lock = threading.Lock()
+_state_lock = threading.Lock()
+# (kind, method, args) updates committed while a build runs, replayed onto its result
+_pending = None
+_refreshing = False
+
+
+def build_indexes():
+    """{kind: TrigramIndex} built from the database."""
+    indexes = {}
+    for kind, (model, fields) in SUGGEST_SOURCES.items():
+        index = indexes[kind] = TrigramIndex()
+        for row in model.objects.values_list('pk', *fields).iterator(chunk_size=5000):
+            pk, values = row[0], row[1:]
+            index.add(pk, suggest_label(kind, values), values)
+        index.warm()
+    return indexes
+
+
+def get_indexes():
+    """
+    {kind: TrigramIndex} for the whole process. The first use builds it
+    inline; once it is INDEX_MAX_AGE old a background thread rebuilds it
+    while lookups keep using the current one.
+    """
+    if _indexes is None:
+        with _build_lock:
+            if _indexes is None:
+                _rebuild()
+    elif time.monotonic() - _built_at >= INDEX_MAX_AGE:
+        _refresh_in_background()
+    return _indexes
+
+
+def rebuild_indexes():
+    """Rebuild from the database now and swap the result in."""
+    with _build_lock:
+        _rebuild()
+
+
+def _rebuild():
+    global _indexes, _built_at, _pending
+    with _state_lock:
+        _pending = []
+    try:
+        indexes = build_indexes()
+        with _state_lock:
+            # Writes committed after build_indexes() read their table
+            for kind, method, args in _pending:
+                getattr(indexes[kind], method)(*args)
+            _indexes, _built_at = indexes, time.monotonic()
+    finally:
+        with _state_lock:
+            _pending = None
+
+
+def _refresh_in_background():
+    global _refreshing
+    with _state_lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_background_refresh, name='crm-suggest-refresh', daemon=True).start()
+
+
+def _background_refresh():
+    global _refreshing
+    try:
+        rebuild_indexes()
+    except Exception:
+        logger.exception('Rebuilding the suggest index failed; keeping the previous one')
+    finally:
+        connections.close_all()
+        with _state_lock:
+            _refreshing = False
+
+
+def reset_indexes():
+    """Drop this process's index; the next lookup rebuilds it (after bulk writes the signals miss)."""
+    global _indexes
+    with _build_lock, _state_lock:
+        _indexes = None
+
+
+def suggest_label(kind, values):
+    if kind == 'project':
+        return values[0]
+    name, company = values
+    if name and company and company != name:
+        return f'{name} ({company})'
+    return name or company or ''
+
+
+def suggest(query, kinds=None, limit=10, user=None):
+    """
+    Ranked suggestions across `kinds` as [{'type', 'id', 'label', 'score'}].
+    With `user`, results are restricted to rows that user may see (RLS).
+    """
+    from .rls_utils import get_filtered_queryset
+
+    results = []
+    for kind, index in get_indexes().items():
+        if kinds and kind not in kinds:
+            continue
+        if user is None:
+            hits = index.search(query, limit=limit)
+        else:
+            hits = _visible_hits(index, query, limit, get_filtered_queryset(user, SUGGEST_SOURCES[kind][0]))
+        results += [{'type': kind, 'id': pk, 'label': label, 'score': round(score, 3)} for score, pk, label in hits]
+
+    results.sort(key=lambda r: -r['score'])
+    return results[:limit]
+
+
+def _visible_hits(index, query, limit, visible):
+    """
+    The best `limit` hits among rows in the `visible` queryset. Over-fetches
+    RLS_OVERFETCH times `limit`, and fetches more while RLS leaves too few
+    and the index has more to give.
+    """
+    fetch = limit * RLS_OVERFETCH
+    while True:
+        hits = index.search(query, limit=fetch)
+        allowed = set(visible.filter(pk__in=[pk for _, pk, _ in hits]).values_list('pk', flat=True)) if hits else set()
+        kept = [h for h in hits if h[1] in allowed]
+        if len(kept) >= limit or len(hits) < fetch or fetch >= len(index):
+            return kept[:limit]
+        fetch *= 4
+
+
+def index_instance(kind, instance, using=DEFAULT_DB_ALIAS):
+    """Signal hook: refresh one record once the save commits (a rolled-back save never reaches the index)."""
+    fields = SUGGEST_SOURCES[kind][1]
+    values = tuple(getattr(instance, f) for f in fields)
+    args = (instance.pk, suggest_label(kind, values), values)
+    transaction.on_commit(lambda: _update(kind, 'add', args), using=using)
+
+
+def unindex_instance(kind, instance, using=DEFAULT_DB_ALIAS):
+    pk = instance.pk
+    transaction.on_commit(lambda: _update(kind, 'remove', (pk,)), using=using)
+
+
+def _update(kind, method, args):
+    """Apply one update to the live index, and queue it for a build in progress."""
+    with _state_lock:
+        if _indexes is not None:
+            getattr(_indexes[kind], method)(*args)
+        if _pending is not None:
+            _pending.append((kind, method, args))
@@ -1,3 +1,1292 @@
-from django.test import TestCase
+import asyncio
+import contextvars
+import csv
+import datetime
+import importlib.util
+import io
+import json
+import tempfile
+import threading
+import time
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Group, Permission, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import board, funnel, kpi, reports, rls_utils, rollups, snapshot, suggest
+from .exports import stream_csv
+from .management.commands import close_kpi_month
+from .management.commands.seed_large_dataset import PROJECT_RECEIVERS, disconnected
+from .management.commands.send_reminders import Command as SendRemindersCommand
+from .metrics import MetricsMiddleware
+from .models import (
+    BoardEvent, Client, Document, Interaction, KPISnapshot, KPITarget, Lead, LeadCohort, Project, ReminderLog, Task,
+    TaskChecklist, Transaction,
+)
+from .nplusone import NPlusOneError, NPlusOneMiddleware, NPlusOneTestMixin, QueryLog, detect_n_plus_one, fingerprint
+from .pagination import CURSOR_VAR, EstimatedCountPaginator, encode_cursor
+from .routers import PIN_COOKIE, PrimaryPinMiddleware, ReplicaRouter, replica_reads, use_replica
+from .search import FULLTEXT_FIELDS, match_subquery
+
+
+def _in_fresh_context(test):
+    # Router state lives in context variables; keep each test's writes to itself
+    def wrapper(self):
+        contextvars.Context().run(test, self)
+    return wrapper
+
+
+@mock.patch.dict(settings.DATABASES, {'replica': {}})
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    @_in_fresh_context
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Lead))
+
+    @_in_fresh_context
+    def test_report_reads_use_replica(self):
+        @replica_reads
+        def report():
+            return self.router.db_for_read(Lead)
+
+        self.assertEqual(report(), 'replica')
+        self.assertIsNone(self.router.db_for_read(Lead))
+
+    @_in_fresh_context
+    def test_reads_after_a_write_stay_on_primary(self):
+        with use_replica():
+            self.assertIsNone(self.router.db_for_write(Lead))
+            self.assertIsNone(self.router.db_for_read(Lead))
+
+    @_in_fresh_context
+    def test_no_replica_configured(self):
+        with mock.patch.dict(settings.DATABASES, clear=True, default=settings.DATABASES['default']):
+            with use_replica():
+                self.assertIsNone(self.router.db_for_read(Lead))
+
+    @_in_fresh_context
+    def test_middleware_pins_browser_after_write(self):
+        factory = RequestFactory()
+        seen = []
+
+        def view(request):
+            with use_replica():
+                seen.append(self.router.db_for_read(Lead))
+                if request.method == 'POST':
+                    self.router.db_for_write(Lead)
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(view)
+        response = middleware(factory.post('/kanban/update/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        request = factory.get('/dashboard/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        middleware(request)
+        self.assertNotIn(PIN_COOKIE, middleware(factory.get('/dashboard/')).cookies)
+
+        # POST before its write, pinned GET, then an unpinned GET
+        self.assertEqual(seen, ['replica', None, 'replica'])
+
+    @_in_fresh_context
+    def test_middleware_runs_async(self):
+        async def view(request):
+            self.router.db_for_write(Lead)
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertIn(PIN_COOKIE, async_to_sync(middleware)(RequestFactory().post('/kanban/update/')).cookies)
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Lead), 'replica')
+
+    @_in_fresh_context
+    def test_writes_leave_no_state_without_a_replica(self):
+        with mock.patch.dict(settings.DATABASES, clear=True, default=settings.DATABASES['default']):
+            self.router.db_for_write(Lead)
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Lead), 'replica')
+
+
+class NPlusOneDetectorTests(SimpleTestCase):
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM crm_task WHERE id IN (%s, %s, %s) AND name = \'x\' LIMIT 21'),
+            fingerprint('SELECT  *  FROM crm_task WHERE id IN (%s) AND name = %s LIMIT 5'),
+        )
+        self.assertNotEqual(fingerprint('SELECT * FROM crm_task'), fingerprint('SELECT * FROM crm_lead'))
+
+    def test_repeated_shapes_are_reported_with_their_stack(self):
+        log = QueryLog(threshold=3)
+        for i in range(3):
+            log.record(f'SELECT * FROM crm_client WHERE id = {i}')
+        log.record('SAVEPOINT "s1"')
+        log.record('SAVEPOINT "s1"')
+        log.record('SAVEPOINT "s1"')
+        [(shape, count, stack)] = log.repeated()
+        self.assertEqual((shape, count), ('SELECT * FROM crm_client WHERE id = ?', 3))
+        self.assertIn('test_repeated_shapes_are_reported_with_their_stack', ''.join(stack))
+
+    def test_detect_raises_or_logs(self):
+        log = QueryLog(threshold=2)
+        with self.assertRaises(NPlusOneError):
+            with detect_n_plus_one(threshold=2) as log:
+                log.record('SELECT 1')
+                log.record('SELECT 2')
+        with self.assertLogs('crm.nplusone', 'WARNING'):
+            with detect_n_plus_one(threshold=2, raise_error=False) as log:
+                log.record('SELECT 1')
+                log.record('SELECT 2')
+
+
+class ViewQueryTests(NPlusOneTestMixin, TestCase):
+    """
+    Every view in core/urls.py, as a manager and as a Sales Agent, over
+    enough rows (ROWS) that a per-row query crosses the detector threshold.
+    """
+    ROWS = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        cls.agent = User.objects.create_user('agent', 'agent@example.com', 'pw', is_staff=True)
+        cls.agent.user_permissions.set(Permission.objects.filter(content_type__app_label='crm'))
+        staff = User.objects.bulk_create(
+            [User(username=f'staff{i}', is_staff=True) for i in range(cls.ROWS)]
+        )
+
+        # bulk_create: no notification emails, progress or cache signals
+        clients = Client.objects.bulk_create([
+            Client(name=f'Client {i}', services='WEB', total_payable=1000, paid_amount=100 * i)
+            for i in range(cls.ROWS)
+        ])
+        Client.assigned_to.through.objects.bulk_create([
+            Client.assigned_to.through(client=client, user=user)
+            for client in clients for user in (cls.agent, staff[client.pk % cls.ROWS])
+        ])
+        projects = Project.objects.bulk_create([
+            Project(client=client, project_name=f'Project {client.pk}', status=status,
+                    deadline=today + datetime.timedelta(days=2))
+            for client in clients for status in ('PLANNING', 'IN_PROGRESS')
+        ])
+        tasks = Task.objects.bulk_create([
+            Task(project=project, task_name=f'Task {project.pk}', assigned_to=cls.agent, status=status,
+                 due_date=today + datetime.timedelta(days=offset))
+            for project in projects for status, offset in (('TODO', 1), ('IN_PROGRESS', -1))
+        ])
+        TaskChecklist.objects.bulk_create([
+            TaskChecklist(task=task, item_name=f'Step {i}', is_done=i == 0) for task in tasks for i in range(2)
+        ])
+        leads = Lead.objects.bulk_create([
+            Lead(name=f'Lead {i}', source='Web', contact_info='-', assigned_to=cls.agent,
+                 status=('COLD', 'WARM', 'HOT', 'CONVERTED')[i % 4], next_follow_up=today)
+            for i in range(cls.ROWS)
+        ])
+        Interaction.objects.bulk_create([
+            Interaction(client=client, lead=lead, created_by=cls.agent, notes='Called')
+            for client, lead in zip(clients, leads)
+        ])
+        Transaction.objects.bulk_create([
+            Transaction(client=project.client, project=project, transaction_type=kind, amount=100,
+                        date=today - datetime.timedelta(days=30 * (project.pk % 6)), description='-',
+                        created_by=cls.agent)
+            for project in projects for kind in ('INCOME', 'EXPENSE')
+        ])
+        Document.objects.bulk_create([
+            Document(project=project, client=project.client, title=f'Doc {project.pk}', file='documents/x.pdf',
+                     uploaded_by=cls.agent)
+            for project in projects
+        ])
+        KPITarget.objects.bulk_create([
+            KPITarget(staff=user, month=today.replace(day=1), target_leads=5, target_tasks=5, created_by=cls.boss)
+            for user in [cls.agent, *staff]
+        ])
+        cls.client_obj, cls.project, cls.task = clients[0], projects[0], tasks[0]
+
+    def setUp(self):
+        # Dashboard and report contexts are cached; every request should run its queries
+        cache.clear()
+
+    def assertViewQueries(self, url, users=None, method='get', status=200, **extra):
+        for user in users or (self.boss, self.agent):
+            with self.subTest(url=url, user=user.username):
+                self.client.force_login(user)
+                with self.assertNoNPlusOne(label=url):
+                    response = getattr(self.client, method)(url, **extra)
+                self.assertEqual(response.status_code, status)
+
+    def test_dashboard(self):
+        self.assertViewQueries(reverse('dashboard'))
+
+    def test_root_redirect(self):
+        self.assertViewQueries('/', status=301)
+
+    def test_calendar(self):
+        self.assertViewQueries(reverse('calendar_view'))
+        self.assertViewQueries(reverse('calendar_events_api'))
+
+    def test_suggest(self):
+        self.assertViewQueries(reverse('suggest_api') + '?q=Client')
+
+    def test_reports(self):
+        for group in ('client', 'project', 'none'):
+            self.assertViewQueries(reverse('pnl_report') + f'?group={group}')
+        self.assertViewQueries(reverse('pnl_report') + '?format=csv')
+        self.assertViewQueries(reverse('receivables_report'))
+        self.assertViewQueries(reverse('receivables_report') + '?format=csv')
+
+    def test_invoice(self):
+        self.assertViewQueries(reverse('generate_invoice_pdf', args=[self.client_obj.pk]))
+
+    def test_statement(self):
+        self.assertViewQueries(reverse('client_statement', args=[self.client_obj.pk]))
+        self.assertViewQueries(reverse('client_statement_api', args=[self.client_obj.pk]))
+
+    def test_kanban(self):
+        self.assertViewQueries(reverse('kanban_board'))
+        self.assertViewQueries(reverse('kanban_board') + '?type=tasks')
+        self.assertViewQueries(reverse('kanban_events') + '?type=tasks')
+
+    def test_kanban_updates(self):
+        update = reverse('update_kanban_item', args=['task', self.task.pk])
+        self.assertViewQueries(update, method='post', data=json.dumps({'status': 'DONE'}), content_type='application/json')
+        update = reverse('update_kanban_item', args=['project', self.project.pk])
+        self.assertViewQueries(update, method='post', data=json.dumps({'status': 'REVIEW'}), content_type='application/json')
+        self.assertViewQueries(
+            reverse('quick_add_task'), method='post', content_type='application/json',
+            data=json.dumps({'task_name': 'New task', 'project_id': self.project.pk}),
+        )
+
+    def test_health_and_metrics(self):
+        self.assertViewQueries(reverse('health_check'))
+        self.assertViewQueries(reverse('metrics'), users=[self.boss])
+
+    def test_admin_changelists(self):
+        for model in admin.site._registry:
+            if model._meta.app_label == 'crm':
+                opts = model._meta
+                self.assertViewQueries(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+
+    def test_admin_change_forms(self):
+        for obj in (self.client_obj, self.project, self.task):
+            opts = obj._meta
+            self.assertViewQueries(reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[obj.pk]))
+
+    def test_admin_filtered_changelists(self):
+        # LazyRelatedFilter labels the selected projects with Project.__str__
+        query = '&'.join(f'project__id__exact={pk}' for pk in Project.objects.values_list('pk', flat=True))
+        self.assertViewQueries(reverse('admin:crm_task_changelist') + '?' + query)
+
+    def test_detector_catches_a_new_n_plus_one(self):
+        self.client.force_login(self.boss)
+        with self.assertRaises(NPlusOneError) as caught:
+            with self.assertNoNPlusOne():
+                [str(project) for project in Project.objects.all()]
+        self.assertIn('crm_client', str(caught.exception))
+        self.assertIn('__str__', str(caught.exception))
+
+
+class ClientSearchTests(TestCase):
+    def setUp(self):
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.client.force_login(self.boss)
+
+    def test_new_client_is_searchable(self):
+        client = Client.objects.create(name='Zephyr Analytics', company_name='Zephyr Ltd', services='WEB')
+        self.assertEqual(list(Client.objects.filter(pk__in=match_subquery(Client, 'zeph'))), [client])
+        response = self.client.get(reverse('admin:crm_client_changelist') + '?q=zephyr')
+        self.assertEqual(list(response.context['cl'].result_list), [client])
+
+        client.name, client.company_name = 'Boreal Analytics', 'Boreal Ltd'
+        client.save()
+        self.assertFalse(Client.objects.filter(pk__in=match_subquery(Client, 'zephyr')).exists())
+        self.assertTrue(Client.objects.filter(pk__in=match_subquery(Client, 'boreal')).exists())
+
+    def test_due_amount_filter(self):
+        owing = Client.objects.create(name='Owing', services='WEB', total_payable=5000, paid_amount=1000)
+        Client.objects.create(name='Settled', services='WEB', total_payable=5000, paid_amount=5000)
+        changelist = reverse('admin:crm_client_changelist')
+        response = self.client.get(changelist + '?due=2500')
+        self.assertEqual(list(response.context['cl'].result_list), [owing])
+        for bad in ('NaN', 'Infinity', '-inf', 'abc'):
+            with self.subTest(due=bad):
+                # Django redirects rejected lookups to ?e=1
+                self.assertRedirects(self.client.get(changelist, {'due': bad}), changelist + '?e=1',
+                                     fetch_redirect_response=False)
+
+    def test_receivables_rejects_non_finite_min_due(self):
+        url = reverse('receivables_report')
+        for bad in ('NaN', 'sNaN', 'Infinity', 'abc'):
+            with self.subTest(min_due=bad):
+                self.assertEqual(self.client.get(url, {'min_due': bad}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'min_due': '10.5'}).status_code, 200)
+
+
+class KanbanEventsTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('boss', 'boss@example.com', 'pw'))
+        client = Client.objects.create(name='Acme', services='WEB')
+        project = Project.objects.create(client=client, project_name='Site', deadline=timezone.localdate())
+        self.task = Task.objects.create(project=project, task_name='Build', status='TODO')
+        self.url = reverse('kanban_events') + '?type=tasks'
+
+    def test_wsgi_poll_without_pending_events_answers_at_once(self):
+        after = board.latest_event_id()
+        with mock.patch('crm.board.asyncio.sleep', side_effect=AssertionError('WSGI poll must not wait')):
+            response = self.client.get(self.url, HTTP_LAST_EVENT_ID=str(after))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response.content.decode(), f'retry: {board.POLL_RETRY_MS}\n\n')
+
+    def test_wsgi_poll_returns_pending_batch(self):
+        after = board.latest_event_id()
+        event = board.record_task_event('MOVED', self.task)
+        body = self.client.get(self.url, HTTP_LAST_EVENT_ID=str(after)).content.decode()
+        self.assertTrue(body.startswith(f'retry: {board.POLL_RETRY_MS}\n\n'))
+        self.assertIn(f'id: {event.id}\nevent: moved\n', body)
+
+
+
+class KanbanStreamTests(TransactionTestCase):
+    def test_stream_polls_on_its_own_worker_thread(self):
+        boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        project = Project.objects.create(client=Client.objects.create(name='Acme', services='WEB'), project_name='Site')
+        task = Task.objects.create(project=project, task_name='Build', status='TODO')
+        # The board was rendered at an existing event (ids don't restart between tests)
+        after = board.record_task_event('ADDED', task).id
+        event = board.record_task_event('MOVED', task)
+        threads, next_events = [], board.next_events
+
+        def recording(*args):
+            threads.append(threading.current_thread())
+            return next_events(*args)
+
+        async def first_messages():
+            stream = board.event_stream(boss, True, 'tasks', after)
+            try:
+                return [await anext(stream) for _ in range(2)]
+            finally:
+                await stream.aclose()
+
+        with mock.patch('crm.board.next_events', side_effect=recording):
+            messages = async_to_sync(first_messages)()
+        self.assertIn(f'id: {event.id}\nevent: moved\n', messages[1])
+        # Thread-sensitive sync_to_async would have run it on this (the outer sync) thread
+        self.assertNotIn(threading.current_thread(), threads)
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Client.objects.create(name='Acme', services='WEB', total_payable=1000)
+        self.month = rollups._month_start(self.acme.created_at)
+
+    def test_rollup_expires(self):
+        self.assertEqual(rollups.revenue_rollup(), {self.month: 1000.0})
+        # A write the signals never see (another worker's cache, queryset.update())
+        Client.objects.filter(pk=self.acme.pk).update(total_payable=2500)
+        self.assertEqual(rollups.revenue_rollup(), {self.month: 1000.0})
+        with mock.patch('time.time', return_value=time.time() + rollups.ROLLUP_TIMEOUT + 1):
+            self.assertEqual(rollups.revenue_rollup(), {self.month: 2500.0})
+
+    def test_patches_keep_the_original_expiry(self):
+        rollups.revenue_rollup()
+        expires, _ = cache.get(rollups.REVENUE_ROLLUP_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(name='Globex', services='WEB', total_payable=500)
+        self.assertEqual(cache.get(rollups.REVENUE_ROLLUP_KEY), (expires, {self.month: 1500.0}))
+        with mock.patch('time.time', return_value=expires + 1):
+            rollups.refresh_revenue_month(self.acme.created_at)
+            self.assertIsNone(cache.get(rollups.REVENUE_ROLLUP_KEY))
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = suggest.TrigramIndex()
+        self.index.add(1, 'Acme Corp', ['Acme Corp'])
+        self.index.add(2, 'Globex', ['Globex', 'Globex Industries'])
+        self.index.add(3, 'Initech', ['Initech'])
+
+    def test_ranks_prefix_and_misspelled_matches(self):
+        self.assertEqual([pk for _, pk, _ in self.index.search('acm')], [1])
+        self.assertEqual(self.index.search('globx')[0][1], 2)
+        # One row per record, even when both of its values match
+        self.assertEqual([pk for _, pk, _ in self.index.search('globex')], [2])
+
+    def test_readd_and_remove(self):
+        self.index.add(1, 'Umbrella', ['Umbrella'])
+        self.assertEqual(self.index.search('acme'), [])
+        self.assertEqual(self.index.search('umbrella')[0][1], 1)
+        self.index.remove(3)
+        self.assertNotIn(3, [pk for _, pk, _ in self.index.search('initech')])
+        self.assertEqual(len(self.index), 3)  # live terms: Umbrella, Globex, Globex Industries
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        suggest.reset_indexes()
+        self.addCleanup(suggest.reset_indexes)
+        self.agent = User.objects.create_user('agent', 'agent@example.com', 'pw', is_staff=True)
+        # The agent's clients rank below 30 better matches they can't see
+        Client.objects.bulk_create([Client(name=f'Acme {i}', services='WEB') for i in range(30)])
+        mine = Client.objects.bulk_create([
+            Client(name=f'Acme Regional Holdings {i}', services='WEB') for i in range(5)
+        ])
+        for client in mine:
+            client.assigned_to.add(self.agent)
+        self.mine = {client.pk for client in mine}
+
+    def test_rls_still_returns_limit_rows(self):
+        results = suggest.suggest('acme', kinds=['client'], limit=5, user=self.agent)
+        self.assertEqual({r['id'] for r in results}, self.mine)
+
+    def test_stale_index_rebuilds_in_the_background(self):
+        suggest.get_indexes()
+        # Written without signals, as another worker or a bulk write would
+        Client.objects.bulk_create([Client(name='Zenith Labs', services='WEB')])
+        self.assertEqual(suggest.suggest('zenith'), [])
+        with mock.patch('crm.suggest.time.monotonic', return_value=time.monotonic() + suggest.INDEX_MAX_AGE), \
+                mock.patch('crm.suggest.threading.Thread') as thread:
+            # The stale index answers while the rebuild is handed to a thread
+            self.assertEqual(suggest.suggest('zenith'), [])
+            suggest.suggest('zenith')
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+        # Run the thread's target here (it closes its own connections, not the test's)
+        with mock.patch('crm.suggest.connections'):
+            thread.call_args.kwargs['target']()
+        self.assertEqual([r['label'] for r in suggest.suggest('zenith')], ['Zenith Labs'])
+
+    def test_writes_during_a_rebuild_are_replayed(self):
+        suggest.get_indexes()
+        client = Client.objects.create(name='Old Name', services='WEB')
+        build = suggest.build_indexes
+
+        def build_then_rename():
+            indexes = build()
+            client.name = 'Zenith Labs'
+            with self.captureOnCommitCallbacks(execute=True):
+                client.save()
+            return indexes
+
+        with mock.patch('crm.suggest.build_indexes', side_effect=build_then_rename):
+            suggest.rebuild_indexes()
+        self.assertEqual([r['id'] for r in suggest.suggest('zenith labs', limit=1)], [client.pk])
+
+    def test_rolled_back_saves_stay_out_of_the_index(self):
+        suggest.get_indexes()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Client.objects.create(name='Zenith Labs', services='WEB')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Client.objects.create(name='Vertex Studio', services='WEB')
+        self.assertEqual(suggest.suggest('zenith'), [])
+        self.assertEqual([r['label'] for r in suggest.suggest('vertex studio', limit=1)], ['Vertex Studio'])
+
+
+class StatementTests(TestCase):
+    def setUp(self):
+        boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.client.force_login(boss)
+        self.acme = Client.objects.create(name='Acme', services='WEB', total_payable=1000)
+        self.globex = Client.objects.create(name='Globex', services='WEB', total_payable=1000)
+        day = datetime.date(2026, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(client=client, transaction_type='INCOME', amount=100, date=day + datetime.timedelta(days=i),
+                        description='-', created_by=boss)
+            for client in (self.acme, self.globex) for i in range(3)
+        ])
+
+    def page(self, client, after=None):
+        params = {'size': 2, **({'after': after} if after else {})}
+        return self.client.get(reverse('client_statement_api', args=[client.pk]), params)
+
+    def test_cursor_carries_running_totals(self):
+        first = self.page(self.acme).json()
+        second = self.page(self.acme, first['next']).json()
+        self.assertEqual([row['running_paid'] for row in first['rows'] + second['rows']], ['100.00', '200.00', '300.00'])
+        self.assertEqual(second['rows'][-1]['balance'], '700.00')
+        self.assertIsNone(second['next'])
+
+    def test_cursor_is_bound_to_its_client(self):
+        cursor = self.page(self.acme).json()['next']
+        self.assertEqual(self.page(self.globex, cursor).status_code, 400)
+        self.assertEqual(self.page(self.acme, cursor + 'x').status_code, 400)
+
+
+class AsyncMiddlewareTests(TestCase):
+    async def async_view(self, request):
+        return HttpResponse(str(await Client.objects.acount()))
+
+    def test_metrics_middleware_runs_async(self):
+        middleware = MetricsMiddleware(self.async_view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    @override_settings(NPLUSONE_DETECT=True, NPLUSONE_RAISE=True, NPLUSONE_THRESHOLD=3)
+    def test_nplusone_middleware_runs_async(self):
+        async def loop_view(request):
+            for _ in range(3):
+                await Client.objects.acount()
+            return HttpResponse()
+
+        middleware = NPlusOneMiddleware(loop_view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertRaises(NPlusOneError):
+            async_to_sync(middleware)(RequestFactory().get('/loop/'))
+        self.assertEqual(async_to_sync(NPlusOneMiddleware(self.async_view))(RequestFactory().get('/')).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cre').status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+def _async_urlconf():
+    """core.urls as loaded under ASYNC_VIEWS=True (the ASGI profile)."""
+    spec = importlib.util.find_spec('core.urls')
+    module = importlib.util.module_from_spec(spec)
+    with override_settings(ASYNC_VIEWS=True):
+        spec.loader.exec_module(module)
+    return module
+
+
+# TransactionTestCase: the async views query from worker threads on their own connections
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.agent = User.objects.create_user('agent', 'agent@example.com', 'pw', is_staff=True)
+        today = timezone.localdate()
+        for i in range(3):
+            client = Client.objects.create(name=f'Client {i}', services='WEB', total_payable=1000, paid_amount=100 * i)
+            if i:
+                client.assigned_to.add(self.agent)
+            project = Project.objects.create(client=client, project_name=f'Project {i}', status='IN_PROGRESS',
+                                             deadline=today + datetime.timedelta(days=i))
+            Task.objects.create(project=project, task_name=f'Task {i}', status='TODO', assigned_to=self.agent,
+                                due_date=today + datetime.timedelta(days=i))
+            Lead.objects.create(name=f'Lead {i}', source='Web', contact_info='-', assigned_to=self.agent,
+                                next_follow_up=today)
+        self.project = Project.objects.first()
+        self.urlconf = _async_urlconf()
+
+    def both(self, user, method, url, **extra):
+        """(sync response, async response) for the same request as `user`."""
+        cache.clear()
+        self.client.force_login(user)
+        sync = getattr(self.client, method)(url, **extra)
+        cache.clear()
+        self.async_client.force_login(user)
+        with override_settings(ROOT_URLCONF=self.urlconf):
+            response = async_to_sync(getattr(self.async_client, method))(url, **extra)
+            self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+        return sync, response
+
+    def test_pages_match(self):
+        for user in (self.boss, self.agent):
+            for url, keys in ((reverse('dashboard'), None), (reverse('kanban_board'), ['kanban_data']),
+                              (reverse('kanban_board') + '?type=tasks', ['kanban_data'])):
+                with self.subTest(url=url, user=user.username):
+                    sync, response = self.both(user, 'get', url)
+                    self.assertEqual(response.status_code, sync.status_code)
+                    skip = {'request', 'csrf_token', 'user', 'perms', 'messages'}
+                    for key in keys or [k for k in sync.context.keys() if k not in skip]:
+                        self.assertEqual(_plain(response.context[key]), _plain(sync.context[key]), key)
+
+    def test_dashboard_keeps_sync_cache_calls_off_the_event_loop(self):
+        get, on_loop = cache.get, []
+
+        def checked_get(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(args)
+            except RuntimeError:
+                pass
+            return get(*args, **kwargs)
+
+        self.async_client.force_login(self.agent)
+        with override_settings(ROOT_URLCONF=self.urlconf), mock.patch.object(cache, 'get', side_effect=checked_get), \
+                mock.patch('crm.rls_utils.is_manager', wraps=rls_utils.is_manager) as is_manager:
+            for _ in range(2):
+                self.assertEqual(async_to_sync(self.async_client.get)(reverse('dashboard')).status_code, 200)
+        self.assertEqual(on_loop, [])
+        self.assertTrue(is_manager.called)
+
+    def test_calendar_feed_matches(self):
+        for user in (self.boss, self.agent):
+            sync, response = self.both(user, 'get', reverse('calendar_events_api'))
+            self.assertEqual(response.json(), sync.json())
+
+    def test_updates_match(self):
+        task = Task.objects.first()
+        for status in ('DONE', 'REVIEW'):
+            url = reverse('update_kanban_item', args=['task', task.pk])
+            sync, response = self.both(self.boss, 'post', url, data=json.dumps({'status': status}),
+                                       content_type='application/json')
+            self.assertEqual(response.json(), sync.json())
+            task.refresh_from_db()
+            self.assertEqual(task.status, status)
+
+        data = json.dumps({'task_name': 'Quick', 'project_id': self.project.pk, 'status': 'REVIEW'})
+        sync, response = self.both(self.agent, 'post', reverse('quick_add_task'), data=data,
+                                   content_type='application/json')
+        self.assertEqual({**response.json(), 'task_id': None}, {**sync.json(), 'task_id': None})
+        added = Task.objects.filter(task_name='Quick', status='REVIEW', assigned_to=self.agent)
+        self.assertEqual(added.count(), 2)
+        self.assertEqual(BoardEvent.objects.filter(kind='ADDED', object_id__in=added.values('pk')).count(), 2)
+
+
+def _plain(value):
+    """Context values compared by content: querysets as lists, dicts recursively."""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, QuerySet):
+        return list(value)
+    return value
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.client.force_login(self.boss)
+        acme = Client.objects.create(name='Acme', services='WEB')
+        globex = Client.objects.create(name='Globex', services='WEB')
+        site = Project.objects.create(client=acme, project_name='Storefront', deadline=timezone.localdate())
+        self.invoice, self.refund, self.other = Transaction.objects.bulk_create([
+            Transaction(client=client, project=project, transaction_type='INCOME', amount=100,
+                        date=timezone.localdate(), description=description, created_by=self.boss)
+            for client, project, description in (
+                (acme, site, 'March invoice'), (acme, None, 'Refund'), (globex, None, 'April invoice'),
+            )
+        ])
+
+    def search(self, model, term):
+        url = reverse(f'admin:crm_{model._meta.model_name}_changelist')
+        return set(self.client.get(url, {'q': term}).context['cl'].result_list)
+
+    def test_words_match_across_related_documents(self):
+        self.assertEqual(self.search(Transaction, 'acme invoice'), {self.invoice})
+        self.assertEqual(self.search(Transaction, 'storefront invoice'), {self.invoice})
+        self.assertEqual(self.search(Transaction, 'invoice'), {self.invoice, self.other})
+        self.assertEqual(self.search(Transaction, 'acme'), {self.invoice, self.refund})
+        self.assertEqual(self.search(Transaction, 'globex refund'), set())
+
+    def test_prefixes_and_text_fields(self):
+        lead = Lead.objects.create(name='Jane Doe', source='Referral', contact_info='jane@initech.example',
+                                   assigned_to=self.boss)
+        Lead.objects.create(name='John Roe', source='Web', contact_info='-', assigned_to=self.boss)
+        self.assertEqual(self.search(Lead, 'initech'), {lead})
+        self.assertEqual(self.search(Lead, 'refer ja'), {lead})
+        self.assertEqual(self.search(Transaction, 'inv'), {self.invoice, self.other})
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers are SQLite only')
+    def test_migrations_leave_every_trigger_installed(self):
+        # A table rebuild (AlterField on SQLite) drops them silently; 0025 had to put crm_client's back
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_%'")
+            installed = set(cursor.fetchall())
+        for label in FULLTEXT_FIELDS:
+            table = apps.get_model(label)._meta.db_table
+            for suffix in ('ai', 'ad', 'au'):
+                self.assertIn((table, f'{table}_fts_{suffix}'), installed)
+
+
+class BulkConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        suggest.reset_indexes()
+        self.addCleanup(suggest.reset_indexes)
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.leads = [
+            Lead.objects.create(name=f'Lead {name}', company_name=f'{name} Inc', source='Web', contact_info='-',
+                                assigned_to=self.boss)
+            for name in ('Quasar', 'Pulsar', 'Nebula')
+        ]
+        self.interaction = Interaction.objects.create(lead=self.leads[0], created_by=self.boss, notes='Called')
+        self.lead_admin = admin.site._registry[Lead]
+
+    def convert(self, leads):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.lead_admin.bulk_conversion(leads)
+
+    def test_converts_and_refreshes_derived_data(self):
+        from .signals import dashboard_cache_version
+        dashboard = dashboard_cache_version()
+        rollups.revenue_rollup()
+        suggest.get_indexes()
+
+        clients = self.convert(self.leads)
+
+        self.assertEqual(len(clients), 3)
+        self.assertEqual(Lead.objects.filter(status='CONVERTED').count(), 3)
+        self.assertEqual(set(Client.objects.filter(assigned_to=self.boss).values_list('name', flat=True)),
+                         {'Lead Quasar', 'Lead Pulsar', 'Lead Nebula'})
+        self.interaction.refresh_from_db()
+        self.assertEqual(self.interaction.client.name, 'Lead Quasar')
+        self.assertNotEqual(dashboard_cache_version(), dashboard)
+        # The cached (previously empty) rollup gained the clients' month
+        self.assertEqual(list(rollups.revenue_rollup()), [rollups._month_start(clients[0].created_at)])
+        self.assertEqual(suggest.suggest('pulsar', kinds=['client'])[0]['id'], clients[1].pk)
+
+    def test_stale_selection_is_not_converted_twice(self):
+        self.convert(self.leads[:1])
+        # The same (now stale) objects again, as a second admin tab would send
+        clients = self.convert(self.leads)
+        self.assertEqual([client.name for client in clients], ['Lead Pulsar', 'Lead Nebula'])
+        self.assertEqual(Client.objects.count(), 3)
+        self.assertEqual(self.convert(self.leads), [])
+
+
+class ExportTests(TestCase):
+    NAMES = ('=HYPERLINK("http://x","y")', '+1 555', '-cmd', '@SUM(A1)', '\tTab', '\rCR', 'Plain')
+
+    def setUp(self):
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.client.force_login(self.boss)
+        for name in self.NAMES:
+            Lead.objects.create(name=name, source='Web', contact_info='-', assigned_to=self.boss)
+
+    def export(self, action):
+        response = self.client.post(reverse('admin:crm_lead_changelist'), {
+            'action': action, '_selected_action': Lead.objects.values_list('pk', flat=True),
+        })
+        return b''.join(response.streaming_content)
+
+    def test_csv_neutralizes_formulas(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('export_csv').decode())))
+        self.assertEqual(sorted(row['Name'] for row in rows),
+                         sorted("'" + name for name in self.NAMES[:-1]) + ['Plain'])
+
+    def test_xlsx_neutralizes_formulas(self):
+        with zipfile.ZipFile(io.BytesIO(self.export('export_xlsx'))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">\'=HYPERLINK("http://x","y")</t>', sheet)
+        self.assertIn("<t xml:space=\"preserve\">'@SUM(A1)</t>", sheet)
+        self.assertNotIn('<t xml:space="preserve">=', sheet)
+
+    def test_numbers_and_reports(self):
+        self.assertEqual(''.join(stream_csv([(Decimal('-5.00'), -3, '-3')], ['a', 'b', 'c'])),
+                         "a,b,c\r\n-5.00,-3,'-3\r\n")
+        Client.objects.create(name='=cmd|calc', company_name='@corp', services='WEB', total_payable=100)
+        text = self.client.get(reverse('receivables_report'), {'format': 'csv'}).content.decode()
+        self.assertIn("'=cmd|calc,'@corp,", text)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        self.agent = User.objects.create_user('agent', 'agent@example.com', 'pw', is_staff=True)
+        self.acme = Client.objects.create(name='Acme', services='WEB', total_payable=1000)
+        self.globex = Client.objects.create(name='Globex', services='WEB', total_payable=1000)
+        self.acme.assigned_to.add(self.agent)
+        day = datetime.date(2026, 3, 15)
+        Transaction.objects.bulk_create([
+            Transaction(client=client, transaction_type=kind, amount=Decimal(amount), date=day,
+                        description='-', created_by=self.boss)
+            for client, kind, amount in (
+                (self.acme, 'INCOME', '0.10'), (self.acme, 'INCOME', '0.10'), (self.acme, 'INCOME', '0.10'),
+                (self.acme, 'EXPENSE', '0.20'), (self.globex, 'INCOME', '12345678.91'),
+                (self.globex, 'EXPENSE', '0.01'),
+            )
+        ])
+        self.month = (datetime.date(2026, 3, 1), datetime.date(2026, 3, 31))
+
+    def test_pnl_sums_are_exact(self):
+        report = reports.pnl_report(self.boss, *self.month)
+        self.assertEqual(report['totals'], {'income': 12345679.21, 'expense': 0.21, 'net': 12345679.0, 'margin': 100.0})
+        rows = {row['name']: row for row in report['rows']}
+        self.assertEqual((rows['Acme']['income'], rows['Acme']['net'], rows['Acme']['margin']), (0.3, 0.1, 33.3))
+        self.assertEqual(rows['Globex']['net'], 12345678.9)
+        self.assertEqual(reports.load_transactions(self.boss, *self.month)['cents'].dtype, 'int64')
+
+    def test_pnl_scope_follows_rls(self):
+        self.assertEqual([row['name'] for row in reports.pnl_report(self.agent, *self.month)['rows']], ['Acme'])
+        manager, _ = Group.objects.get_or_create(name='Manager')
+        # A fresh user object: is_manager() is remembered per instance
+        self.agent.groups.add(manager)
+        agent = User.objects.get(pk=self.agent.pk)
+        self.assertEqual({row['name'] for row in reports.pnl_report(agent, *self.month)['rows']}, {'Acme', 'Globex'})
+
+    def test_receivables_totals(self):
+        report = reports.receivables_aging(self.boss, datetime.date(2026, 4, 1))
+        self.assertEqual(report['totals'], {'clients': 2, 'due': 2000.0})
+        self.assertEqual([row['name'] for row in reports.receivables_aging(self.agent, datetime.date(2026, 4, 1))['rows']],
+                         ['Acme'])
+
+
+class SendRemindersTests(TestCase):
+    def setUp(self):
+        self.today = datetime.date(2026, 5, 4)
+        self.staff = [
+            User.objects.create_user(f'staff{i}', f'staff{i}@example.com', 'pw', is_staff=True) for i in range(2)
+        ]
+        for user in self.staff:
+            Lead.objects.create(name=f'Lead for {user.username}', source='Web', contact_info='-', assigned_to=user,
+                                next_follow_up=self.today)
+
+    def run_command(self):
+        call_command('send_reminders', date=self.today.isoformat(), stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_reruns_do_not_resend(self):
+        self.run_command()
+        self.run_command()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['staff0@example.com', 'staff1@example.com'])
+        self.assertEqual(ReminderLog.objects.filter(sent_on=self.today).count(), 2)
+
+    def test_overlapping_run_claims_first(self):
+        build_digest = SendRemindersCommand.build_digest
+
+        def claimed_meanwhile(command, user, *args):
+            # Another run logs staff0 after this one picked its recipients
+            if user == self.staff[0]:
+                ReminderLog.objects.create(staff=user, sent_on=self.today)
+            return build_digest(command, user, *args)
+
+        with mock.patch.object(SendRemindersCommand, 'build_digest', claimed_meanwhile):
+            self.run_command()
+        self.assertEqual([m.to[0] for m in mail.outbox], ['staff1@example.com'])
+
+    def test_failed_send_is_retried(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.run_command()
+        self.assertFalse(ReminderLog.objects.exists())
+        self.run_command()
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class LeadFunnelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw', is_staff=True)
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw', is_staff=True)
+        for user, status, source in ((self.alice, 'CONVERTED', 'Web'), (self.alice, 'HOT', 'Web'),
+                                     (self.bob, 'CONVERTED', 'Referral'), (self.bob, 'COLD', 'Web')):
+            lead = Lead.objects.create(name='Lead', source=source, contact_info='-', assigned_to=user, status=status)
+            if status == 'CONVERTED':
+                Lead.objects.filter(pk=lead.pk).update(converted_at=lead.created_at + datetime.timedelta(days=3))
+
+    def test_widgets_read_the_cohort_table(self):
+        today = timezone.localdate()
+        empty = funnel.changelist_metrics(today)
+        # Live counters only until the cohorts are refreshed; Lead is never scanned for the funnel
+        self.assertEqual((empty['total_leads'], empty['converted_leads']), (4, 2))
+        self.assertEqual((empty['by_source'], empty['cohorts'], empty['refreshed_at']), ([], [], None))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            funnel.refresh_cohorts()
+        metrics = funnel.changelist_metrics(today)
+        self.assertEqual({row['source']: row['total'] for row in metrics['by_source']}, {'Web': 3, 'Referral': 1})
+        self.assertEqual(metrics['avg_days_to_convert'], 3.0)
+        self.assertIsNotNone(metrics['refreshed_at'])
+
+    def test_new_leads_do_not_recompute_the_funnel(self):
+        funnel.refresh_cohorts()
+        funnel.changelist_metrics(timezone.localdate())
+        Lead.objects.create(name='New', source='Ads', contact_info='-')
+        with mock.patch('crm.funnel.funnel_summary') as summary:
+            metrics = funnel.changelist_metrics(timezone.localdate())
+        summary.assert_not_called()
+        self.assertEqual(metrics['total_leads'], 5)
+
+    def test_deleting_staff_keeps_their_cohorts(self):
+        funnel.refresh_cohorts()
+        self.bob.delete()
+        self.assertEqual(LeadCohort.objects.filter(staff__isnull=True).count(), 2)
+        self.assertEqual(funnel.funnel_summary()['total_leads'], 4)
+
+
+@mock.patch('crm.pagination.estimate_row_count', return_value=50000)
+class EstimatedCountPaginatorTests(TestCase):
+    ROWS = 45
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        Lead.objects.bulk_create([
+            Lead(name=f'Lead {i}', source='Web', contact_info='-') for i in range(cls.ROWS)
+        ])
+
+    def paginator(self):
+        return EstimatedCountPaginator(Lead.objects.order_by('pk'), 10)
+
+    def test_short_page_clamps_the_estimate(self, estimate):
+        paginator = self.paginator()
+        self.assertEqual(paginator.num_pages, 5000)
+        self.assertEqual(len(paginator.page(5).object_list), 5)
+        self.assertEqual((paginator.count, paginator.num_pages, list(paginator.page_range)[-1]), (45, 5, 5))
+
+    def test_page_past_the_end_takes_an_exact_count(self, estimate):
+        paginator = self.paginator()
+        self.assertEqual(len(paginator.page(9).object_list), 0)
+        self.assertEqual((paginator.count, paginator.num_pages), (45, 5))
+
+    def test_full_pages_keep_the_estimate(self, estimate):
+        paginator = self.paginator()
+        paginator.page(2)
+        self.assertEqual(paginator.count, 50000)
+
+    def test_changelist_links_stop_at_the_last_page(self, estimate):
+        self.client.force_login(self.boss)
+        changelist = reverse('admin:crm_lead_changelist')
+        with mock.patch.object(admin.site._registry[Lead], 'list_per_page', 20):
+            cl = self.client.get(changelist, {'p': 3}).context['cl']
+            self.assertEqual((cl.result_count, cl.paginator.num_pages, len(cl.result_list)), (45, 3, 5))
+
+            # The same through keyset "Next" links
+            cl = self.client.get(changelist).context['cl']
+            self.assertEqual(cl.result_count, 50000)
+            cl = self.client.get(changelist + cl.next_cursor_url).context['cl']
+            self.assertEqual(cl.result_count, 50000)
+            cl = self.client.get(changelist + cl.next_cursor_url).context['cl']
+            self.assertEqual((cl.result_count, cl.paginator.num_pages, len(cl.result_list)), (45, 3, 5))
+            self.assertIsNone(cl.next_cursor_url)
+
+
+
+class KeysetChangeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        Lead.objects.bulk_create([Lead(name=f'Lead {i}', source='Web', contact_info='-') for i in range(45)])
+        cls.changelist = reverse('admin:crm_lead_changelist')
+
+    def setUp(self):
+        self.client.force_login(self.boss)
+        patcher = mock.patch.object(admin.site._registry[Lead], 'list_per_page', 20)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cursor_seeks_past_the_last_row(self):
+        newest = list(Lead.objects.order_by('-pk').values_list('pk', flat=True))
+        cl = self.client.get(self.changelist).context['cl']
+        self.assertEqual([lead.pk for lead in cl.result_list], newest[:20])
+        cl = self.client.get(self.changelist + cl.next_cursor_url).context['cl']
+        self.assertEqual([lead.pk for lead in cl.result_list], newest[20:40])
+        self.assertEqual(cl.page_num, 2)
+
+    def test_bad_cursor_is_an_invalid_lookup(self):
+        for cursor in ('not-a-cursor', encode_cursor({'pk': 1}), encode_cursor(['abc'])):
+            response = self.client.get(self.changelist, {CURSOR_VAR: cursor})
+            self.assertRedirects(response, self.changelist + '?e=1', fetch_redirect_response=False)
+
+    def test_cursor_with_the_wrong_number_of_values_is_an_invalid_lookup(self):
+        for values in ([], [10, 5]):
+            response = self.client.get(self.changelist, {CURSOR_VAR: encode_cursor(values)})
+            self.assertRedirects(response, self.changelist + '?e=1', fetch_redirect_response=False)
+
+class SeedLargeDatasetTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_large_dataset', scale=0.001, years=1, stdout=io.StringIO(), **options)
+
+    def test_seeds_without_project_receivers(self):
+        self.seed()
+        self.assertEqual((Client.objects.count(), Lead.objects.count()), (5, 100))
+        self.assertTrue(LeadCohort.objects.exists())
+        # notify_new_client / notify_new_project stayed disconnected
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_receivers_are_reconnected(self):
+        with disconnected(PROJECT_RECEIVERS):
+            for model in (Client, Lead, Project, Task, Transaction):
+                self.assertFalse(post_save.has_listeners(model) or post_delete.has_listeners(model), model)
+        for model in (Client, Lead, Project, Task, Transaction):
+            self.assertTrue(post_save.has_listeners(model) and post_delete.has_listeners(model), model)
+
+        project = Project.objects.create(client=Client.objects.create(name='C'), project_name='P')
+        Task.objects.create(project=project, task_name='T', status='DONE')
+        project.refresh_from_db()
+        self.assertEqual(project.progress_percentage, 100)
+
+    def test_cohorts_are_refreshed_in_the_seeded_database(self):
+        with mock.patch('crm.management.commands.seed_large_dataset.refresh_cohorts', return_value=0) as refresh:
+            self.seed(database='default')
+        refresh.assert_called_once_with(using='default')
+
+
+def _log_kpi_activity(user, project, day, amount=100):
+    """One of each KPI actual for `user` on `day` (local noon): a conversion, a done task, an interaction, income."""
+    at = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+    Lead.objects.create(name='Lead', source='Web', contact_info='-', assigned_to=user, status='CONVERTED',
+                        converted_at=at)
+    Task.objects.create(project=project, task_name='Task', assigned_to=user, status='DONE', due_date=day)
+    Interaction.objects.filter(pk=Interaction.objects.create(client=project.client, created_by=user, notes='-').pk) \
+        .update(created_at=at)
+    Transaction.objects.create(client=project.client, transaction_type='INCOME', amount=amount, date=day,
+                               description='-', created_by=user)
+
+
+class KpiActualsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw', is_staff=True)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw', is_staff=True)
+        project = Project.objects.create(client=Client.objects.create(name='Acme', services='WEB'), project_name='P')
+        cls.open_month = timezone.localdate().replace(day=1)
+        cls.closed_month = (cls.open_month - datetime.timedelta(days=1)).replace(day=1)
+        for month in (cls.open_month, cls.closed_month):
+            _log_kpi_activity(cls.alice, project, month)
+            _log_kpi_activity(cls.alice, project, month, amount=50)
+            _log_kpi_activity(cls.bob, project, month)
+            KPITarget.objects.create(staff=cls.alice, month=month)
+            KPITarget.objects.create(staff=cls.bob, month=month)
+        # The last day of the month before: outside both months
+        _log_kpi_activity(cls.bob, project, cls.closed_month - datetime.timedelta(days=1))
+
+    def per_object(self, month):
+        return {
+            target.staff_id: {'leads': target.actual_leads(), 'tasks': target.actual_tasks(),
+                              'interactions': target.actual_interactions(), 'revenue': target.actual_revenue()}
+            for target in KPITarget.objects.filter(month=month)
+        }
+
+    def attached(self, month):
+        targets = kpi.attach_actuals(list(KPITarget.objects.filter(month=month)))
+        return {target.staff_id: target.actuals() for target in targets}
+
+    def test_month_bounds(self):
+        self.assertEqual(kpi.month_bounds(datetime.date(2026, 12, 15)),
+                         (datetime.date(2026, 12, 1), datetime.date(2027, 1, 1)))
+
+    def test_open_month_is_live(self):
+        self.assertEqual(self.attached(self.open_month), self.per_object(self.open_month))
+        self.assertEqual(self.attached(self.open_month)[self.alice.pk],
+                         {'leads': 2, 'tasks': 2, 'interactions': 2, 'revenue': 150.0})
+        self.assertEqual(self.attached(self.open_month)[self.bob.pk],
+                         {'leads': 1, 'tasks': 1, 'interactions': 1, 'revenue': 100.0})
+        targets = list(KPITarget.objects.filter(month=self.open_month))
+        # Four grouped queries for every target in the month
+        with self.assertNumQueries(4):
+            kpi.attach_actuals(targets)
+
+    def test_closed_month_reads_snapshots(self):
+        KPISnapshot.objects.create(staff=self.alice, month=self.closed_month, leads=7, tasks=6, interactions=5,
+                                   revenue=Decimal('400.00'))
+        self.assertEqual(self.attached(self.closed_month), self.per_object(self.closed_month))
+        self.assertEqual(self.attached(self.closed_month)[self.alice.pk],
+                         {'leads': 7, 'tasks': 6, 'interactions': 5, 'revenue': 400.0})
+        # Bob has no snapshot yet: computed live
+        self.assertEqual(self.attached(self.closed_month)[self.bob.pk],
+                         {'leads': 1, 'tasks': 1, 'interactions': 1, 'revenue': 100.0})
+
+    def test_actuals_are_memoized_per_request(self):
+        request = RequestFactory().get('/')
+        staff = [self.alice.pk, self.bob.pk]
+        first = kpi.get_actuals_map(staff, self.open_month, request)
+        with self.assertNumQueries(0):
+            self.assertEqual(kpi.get_actuals_map(staff, self.open_month, request), first)
+            self.assertEqual(kpi.get_actuals_map([self.bob.pk], self.open_month, request),
+                             {self.bob.pk: first[self.bob.pk]})
+
+
+class CloseKpiMonthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw', is_staff=True)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw', is_staff=True)
+        cls.project = Project.objects.create(client=Client.objects.create(name='Acme', services='WEB'), project_name='P')
+        cls.last_month = (timezone.localdate().replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+        cls.earlier = (cls.last_month - datetime.timedelta(days=1)).replace(day=1)
+        for month in (cls.earlier, cls.last_month):
+            for user in (cls.alice, cls.bob):
+                _log_kpi_activity(user, cls.project, month)
+                KPITarget.objects.create(staff=user, month=month)
+
+    def close(self, **options):
+        out = io.StringIO()
+        call_command('close_kpi_month', stdout=out, **options)
+        return out.getvalue()
+
+    def frozen(self):
+        return sorted(KPISnapshot.objects.values_list('month', 'staff__username', 'leads'))
+
+    def test_closes_last_month_by_default(self):
+        self.close()
+        self.assertEqual(self.frozen(), [(self.last_month, 'alice', 1), (self.last_month, 'bob', 1)])
+
+    def test_month_and_from(self):
+        self.close(month=self.earlier.strftime('%Y-%m'))
+        self.assertEqual({month for month, _, _ in self.frozen()}, {self.earlier})
+        # --from skips months that are already frozen
+        self.assertIn('Closed 1 month(s), 2 snapshot(s)', self.close(from_month=self.earlier.strftime('%Y-%m')))
+        self.assertEqual(len(self.frozen()), 4)
+
+    def test_only_closed_months(self):
+        for month in (timezone.localdate().strftime('%Y-%m'), '2026-13'):
+            with self.assertRaises(CommandError):
+                self.close(month=month)
+
+    def test_rerun_is_idempotent(self):
+        self.close()
+        self.assertIn('already frozen', self.close())
+
+        # A concurrent run froze Alice in between: her row is kept, Bob's is added
+        KPISnapshot.objects.all().delete()
+        compute = close_kpi_month._compute_month
+
+        def racing(month):
+            KPISnapshot.objects.create(staff=self.alice, month=month, leads=9)
+            return compute(month)
+
+        with mock.patch.object(close_kpi_month, '_compute_month', side_effect=racing):
+            self.close()
+        self.assertEqual(self.frozen(), [(self.last_month, 'alice', 9), (self.last_month, 'bob', 1)])
+
+    def test_frozen_month_ignores_later_edits_until_forced(self):
+        self.close()
+        _log_kpi_activity(self.alice, self.project, self.last_month)
+        self.assertEqual(kpi.load_actuals([self.alice.pk], self.last_month)[self.alice.pk]['leads'], 1)
+        self.assertEqual(KPITarget.objects.get(staff=self.alice, month=self.last_month).actual_leads(), 1)
+
+        self.close(force=True)
+        self.assertEqual(self.frozen(), [(self.last_month, 'alice', 2), (self.last_month, 'bob', 1)])
+        self.assertEqual(kpi.load_actuals([self.alice.pk], self.last_month)[self.alice.pk]['leads'], 2)
+
+
+@skipUnless(importlib.util.find_spec('pyarrow'), 'needs pyarrow')
+class SnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.january = self.client_on(datetime.date(2026, 1, 15))
+        self.march = self.client_on(datetime.date(2026, 3, 15))
+
+    @staticmethod
+    def client_on(day):
+        client = Client.objects.create(name=f'Client {day}', services='WEB')
+        created = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+        Client.objects.filter(pk=client.pk).update(created_at=created)
+        return client.pk
+
+    def export(self, **options):
+        out = io.StringIO()
+        call_command('export_snapshot', tables=['client'], output=str(self.root), stdout=out, **options)
+        return out.getvalue()
+
+    def ids(self, **kwargs):
+        return sorted(snapshot.load_table('client', self.root, **kwargs)['id'].tolist())
+
+    def test_round_trip_appends_only_new_ids(self):
+        self.assertIn('client: 2 new row(s), 2 total', self.export())
+        self.assertEqual(self.ids(), [self.january, self.march])
+        self.assertEqual(snapshot.read_state(self.root)['tables']['client']['last_id'], self.march)
+
+        april = self.client_on(datetime.date(2026, 4, 2))
+        self.assertIn('client: 1 new row(s), 3 total', self.export())
+        self.assertEqual(self.ids(), [self.january, self.march, april])
+        self.assertEqual(sorted(p.parent.name for p in self.root.glob('client/*/part-*')),
+                         ['month=2026-01', 'month=2026-03', 'month=2026-04'])
+
+    def test_load_table_reads_only_matching_partitions(self):
+        self.export()
+        with mock.patch('crm.snapshot.pd.read_parquet', wraps=pd.read_parquet) as read:
+            self.assertEqual(self.ids(start='2026-02', end=datetime.date(2026, 3, 31)), [self.march])
+        self.assertEqual([Path(call.args[0]).parent.name for call in read.call_args_list], ['month=2026-03'])
+
+    def test_since_filters_rows(self):
+        self.export(since='2026-02-01')
+        self.assertEqual(self.ids(), [self.march])
+
+    def test_format_switch_needs_full(self):
+        self.export()
+        with self.assertRaises(CommandError):
+            self.export(format='feather')
+        self.export(format='feather', full=True)
+        self.assertEqual(snapshot.read_state(self.root)['format'], 'feather')
+        self.assertEqual({p.suffix for p in self.root.glob('client/*/part-*')}, {'.feather'})
+        self.assertEqual(self.ids(), [self.january, self.march])
+
+
+class AuditQueryPlansTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        boss = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        client = Client.objects.create(name='Acme', services='WEB')
+        project = Project.objects.create(client=client, project_name='Site', status='IN_PROGRESS')
+        Task.objects.create(project=project, task_name='Build', assigned_to=boss, due_date=timezone.localdate())
+        Lead.objects.create(name='Lead', source='Web', contact_info='-', assigned_to=boss)
+
+    def audit(self, *args, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('audit_query_plans', *args, paths=['dashboard', 'kanban'], stdout=out, stderr=err, **options)
+        self.assertEqual(err.getvalue(), '')
+        return out.getvalue()
+
+    def test_flags_scans_of_small_tables_with_min_rows_zero(self):
+        output = self.audit(min_rows=0)
+        self.assertRegex(output, r'dashboard: [1-9]\d* queries')
+        self.assertIn('FULL SCAN', output)
+        with self.assertRaises(CommandError):
+            self.audit(min_rows=0, fail=True)
+
+    def test_small_tables_pass_by_default(self):
+        self.assertIn('No full scans of large tables.', self.audit())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite profile')
+class SqliteProfileTests(SimpleTestCase):
+    def open(self, **options):
+        """A fresh connection to a throwaway SQLite file, configured like settings.DATABASES['default']."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        default = connections['default']
+        settings_dict = {**default.settings_dict, 'NAME': str(Path(tmp.name) / 'profile.sqlite3'), 'OPTIONS': options}
+        probe = connections['sqlite_profile'] = default.__class__(settings_dict, alias='sqlite_profile')
+        self.addCleanup(connections.__delitem__, 'sqlite_profile')
+        self.addCleanup(probe.close)
+        probe.ensure_connection()
+        return probe
+
+    def pragmas(self, probe):
+        values = {}
+        with probe.cursor() as cursor:
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store', 'mmap_size'):
+                values[name] = cursor.execute(f'PRAGMA {name}').fetchone()[0]
+        return values
+
+    @override_settings(SQLITE_PERFORMANCE=True, SQLITE_PRAGMAS={'busy_timeout': 7000})
+    def test_profile_configures_new_connections(self):
+        probe = self.open(transaction_mode='IMMEDIATE')
+        self.assertEqual(self.pragmas(probe), {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 7000, 'cache_size': -64000, 'temp_store': 2,
+            'mmap_size': 256 * 1024 * 1024,
+        })
+        with CaptureQueriesContext(probe) as queries, transaction.atomic(using='sqlite_profile'):
+            pass
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    @override_settings(SQLITE_PERFORMANCE=False)
+    def test_profile_off_leaves_sqlite_defaults(self):
+        values = self.pragmas(self.open())
+        self.assertEqual((values['journal_mode'], values['synchronous'], values['temp_store'], values['mmap_size']),
+                         ('delete', 2, 0, 0))
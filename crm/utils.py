@@ -1,8 +1,13 @@
+import logging
 import threading
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.models import User
 
+from .metrics import EMAILS, EMAILS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
 def send_staff_notification(subject, message, html_message=None):
     """
     Sends an email notification to all staff members in a background thread.
@@ -11,7 +16,7 @@ def send_staff_notification(subject, message, html_message=None):
     staff_emails = list(User.objects.filter(is_staff=True).exclude(email='').values_list('email', flat=True))
     
     if not staff_emails:
-        print("No staff emails found to send notification.")
+        EMAILS.inc(result='skipped')
         return
     
     def _send():
@@ -24,11 +29,16 @@ def send_staff_notification(subject, message, html_message=None):
                 fail_silently=False,
                 html_message=html_message
             )
-            print(f"Notification sent in background to {len(staff_emails)} staff members.")
-        except Exception as e:
-            print(f"Failed to send staff notification in background: {e}")
+            EMAILS.inc(result='sent')
+        except Exception:
+            EMAILS.inc(result='failed')
+            logger.exception("Failed to send staff notification in background")
+        finally:
+            EMAILS_IN_FLIGHT.dec()
 
     # Start the email sending in a background thread to avoid blocking the main request
     thread = threading.Thread(target=_send)
     thread.daemon = True # Ensure thread doesn't block program exit
+    EMAILS.inc(result='queued')
+    EMAILS_IN_FLIGHT.inc()
     thread.start()
@@ -6,15 +6,23 @@ from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template.loader import get_template
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
 from django.db.models import Sum, Count
 from xhtml2pdf import pisa
 import pandas as pd
 
 from .models import Lead, Client, Project, Task, Interaction, Transaction, KPITarget
+from .kpi import attach_actuals
+from .routers import replica_reads
+from .dashboard import adashboard_context, dashboard_context, run_concurrently
+from . import board, rls_utils
+from .metrics import timed
 
 # 1. Lead Import Logic
 def import_leads(request):
@@ -83,221 +91,118 @@ from .rls_utils import get_filtered_queryset
 from django.core.cache import cache
 
 @login_required
+@replica_reads
 def dashboard(request):
-    import time
-    start_time = time.time()
-    def log_time(label):
-        print(f"DEBUG: {label} took {time.time() - start_time:.4f}s")
-
     # Generate a unique cache key based on user and manager status
     is_manager = request.user.is_superuser or request.user.groups.filter(name='Manager').exists()
-    cache_key = f"dashboard_data_{request.user.id}_{is_manager}"
+    from .signals import dashboard_cache_version
+    cache_key = f"dashboard_data_{request.user.id}_{is_manager}_{dashboard_cache_version()}"
     cached_context = cache.get(cache_key)
     
     if cached_context:
-        log_time("Retrieved from Cache")
         return render(request, 'admin/dashboard.html', cached_context)
 
-    # 1. Base counts
-    total_leads = get_filtered_queryset(request.user, Lead).count()
-    total_clients = get_filtered_queryset(request.user, Client).count()
-    active_projects = get_filtered_queryset(request.user, Project).filter(status='IN_PROGRESS').count()
-    log_time("Base counts")
-    
-    # 2. Financials & Recent Activity
-    tx_qs = get_filtered_queryset(request.user, Transaction)
-    tx_totals = tx_qs.values('transaction_type').annotate(total=Sum('amount'))
-    total_income = 0
-    total_expense = 0
-    for item in tx_totals:
-        if item['transaction_type'] == 'INCOME': total_income = item['total'] or 0
-        if item['transaction_type'] == 'EXPENSE': total_expense = item['total'] or 0
-    net_profit = total_income - total_expense
-    log_time("Financials")
-    
-    if is_manager:
-        recent_interactions = Interaction.objects.select_related('client', 'lead', 'created_by').order_by('-created_at')[:5]
-    else:
-        recent_interactions = Interaction.objects.filter(
-            client__assigned_to=request.user
-        ).select_related('client', 'lead', 'created_by').order_by('-created_at')[:5]
-    log_time("Interactions")
-
-    # 3. Deadlines
-    today = timezone.now().date()
-    next_week = today + datetime.timedelta(days=7)
-    upcoming_projects = get_filtered_queryset(request.user, Project).filter(deadline__range=[today, next_week]).order_by('deadline')
-    
-    task_qs = get_filtered_queryset(request.user, Task)
-    if not is_manager:
-        task_qs = task_qs.filter(assigned_to=request.user)
-
-    upcoming_tasks = task_qs.filter(due_date__range=[today, next_week], is_completed=False).order_by('due_date')
-    overdue_tasks = task_qs.filter(due_date__lt=today, is_completed=False).order_by('due_date')
-    overdue_count = overdue_tasks.count()
-    log_time("Deadlines")
-
-    # 4. Chart Data Preparation (Bulk)
-    lead_qs = get_filtered_queryset(request.user, Lead)
-    lead_status_data = lead_qs.values('status').annotate(count=Count('id'))
-    lead_counts = {item['status']: item['count'] for item in lead_status_data}
-    lead_dataset = [lead_counts.get('COLD', 0), lead_counts.get('WARM', 0), lead_counts.get('HOT', 0), lead_counts.get('CONVERTED', 0)]
-
-    # Sales Trend (Last 7 Days)
-    trend_labels = []
-    trend_data_map = { (today - datetime.timedelta(days=i)): 0 for i in range(7) }
-    trend_qs = tx_qs.filter(transaction_type='INCOME', date__gte=today - datetime.timedelta(days=6)).values('date').annotate(total=Sum('amount'))
-    for item in trend_qs:
-        if item['date'] in trend_data_map:
-            trend_data_map[item['date']] = float(item['total'] or 0)
-    
-    trend_data = []
-    for i in range(6, -1, -1):
-        day = today - datetime.timedelta(days=i)
-        trend_labels.append(day.strftime('%a'))
-        trend_data.append(trend_data_map[day])
-    log_time("Charts Part 1")
-
-    # Monthly Progress (Last 6 Months)
-    import calendar as _cal
-    monthly_labels, monthly_income, monthly_expense = [], [], []
-    for i in range(5, -1, -1):
-        month = today.month - i
-        year = today.year
-        while month <= 0: month += 12; year -= 1
-        m_start = datetime.date(year, month, 1)
-        m_end = datetime.date(year, month, _cal.monthrange(year, month)[1])
-        if i == 0: m_end = today
-        
-        m_tx = tx_qs.filter(date__gte=m_start, date__lte=m_end).values('transaction_type').annotate(total=Sum('amount'))
-        inc, exp = 0, 0
-        for item in m_tx:
-            if item['transaction_type'] == 'INCOME': inc = item['total'] or 0
-            if item['transaction_type'] == 'EXPENSE': exp = item['total'] or 0
-        
-        monthly_labels.append(m_start.strftime("%b %y"))
-        monthly_income.append(float(inc))
-        monthly_expense.append(float(exp))
-    log_time("Charts Part 2")
-
-    # 5. KPI Data
-    kpi_month_start = today.replace(day=1)
-    kpi_targets = KPITarget.objects.filter(month=kpi_month_start)
-    if not is_manager:
-        kpi_targets = kpi_targets.filter(staff=request.user)
-    kpi_targets = kpi_targets.select_related('staff')
-
-    staff_ids = [k.staff_id for k in kpi_targets]
-    m_start = today.replace(day=1)
-    m_end_plus = (m_start + datetime.timedelta(days=32)).replace(day=1)
-
-    def get_actuals_map(model, date_field, user_field, is_count=True):
-        filters = { f"{date_field}__gte": m_start, f"{date_field}__lt": m_end_plus, f"{user_field}__in": staff_ids }
-        if model == Lead: filters['status'] = 'CONVERTED'
-        if model == Task: filters['is_completed'] = True
-        if model == Transaction: filters['transaction_type'] = 'INCOME'
-        
-        qs = model.objects.filter(**filters).values(user_field)
-        if is_count: res = qs.annotate(val=Count('id'))
-        else: res = qs.annotate(val=Sum('amount'))
-        return { item[user_field]: item['val'] for item in res }
-
-    leads_map = get_actuals_map(Lead, 'converted_at', 'assigned_to')
-    tasks_map = get_actuals_map(Task, 'due_date', 'assigned_to')
-    interactions_map = get_actuals_map(Interaction, 'created_at', 'created_by')
-    revenue_map = get_actuals_map(Transaction, 'date', 'created_by', is_count=False)
-    log_time("KPI Maps")
-
-    kpi_widget_data = []
-    for kpi in kpi_targets:
-        uid = kpi.staff_id
-        act_l, act_t, act_i, act_r = leads_map.get(uid, 0), tasks_map.get(uid, 0), interactions_map.get(uid, 0), float(revenue_map.get(uid, 0))
-        
-        def calc_pct(a, t): 
-            if not t: return 100 if a else 0
-            return min(int((a / float(t)) * 100), 100)
-        
-        m_leads = {'label': '📞 Leads', 'actual': act_l, 'target': kpi.target_leads, 'pct': calc_pct(act_l, kpi.target_leads)}
-        m_tasks = {'label': '✅ Tasks', 'actual': act_t, 'target': kpi.target_tasks, 'pct': calc_pct(act_t, kpi.target_tasks)}
-        m_comms = {'label': '💬 Comms', 'actual': act_i, 'target': kpi.target_interactions, 'pct': calc_pct(act_i, kpi.target_interactions)}
-        m_rev   = {'label': '💰 Revenue', 'actual': int(act_r), 'target': int(kpi.target_revenue), 'pct': calc_pct(act_r, kpi.target_revenue)}
-        
-        overall = int((m_leads['pct'] + m_tasks['pct'] + m_comms['pct'] + m_rev['pct']) / 4)
-        
-        kpi_widget_data.append({
-            'username': kpi.staff.get_full_name() or kpi.staff.username,
-            'overall_pct': overall,
-            'metrics': [m_leads, m_tasks, m_comms, m_rev]
-        })
-    log_time("KPI Loop")
-
-    context = {
-        'total_leads': total_leads, 'total_clients': total_clients, 'active_projects': active_projects,
-        'total_income': total_income, 'total_expense': total_expense, 'net_profit': net_profit,
-        'recent_interactions': recent_interactions, 'upcoming_projects': upcoming_projects,
-        'upcoming_tasks': upcoming_tasks, 'overdue_tasks': overdue_tasks, 'overdue_count': overdue_count,
-        'is_manager': is_manager, 'kpi_widget_data': kpi_widget_data, 'kpi_month': today.strftime('%B %Y'),
-        'lead_dataset': json.dumps(lead_dataset), 'income_expense_dataset': json.dumps([float(total_income), float(total_expense)]),
-        'trend_labels': json.dumps(trend_labels), 'trend_data': json.dumps(trend_data),
-        'monthly_labels': json.dumps(monthly_labels), 'monthly_income': json.dumps(monthly_income), 'monthly_expense': json.dumps(monthly_expense),
-    }
+    # Sections (counts, financials, deadlines, charts, KPI maps) live in crm/dashboard.py
+    with timed('dashboard.context'):
+        context = dashboard_context(request, request.user, is_manager, timezone.now().date())
 
     # Store in cache for 5 minutes (300 seconds)
     cache.set(cache_key, context, 300)
-    log_time("Final Context & Cached")
     return render(request, 'admin/dashboard.html', context)
 
-def health_check(request):
-    """Diagnostic view to verify database connectivity."""
-    from django.db import connection
-    status = "Unknown"
-    details = ""
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        status = "Green"
-    except Exception as e:
-        status = "Red"
-        details = str(e)
-    
-    return HttpResponse(f"Database Status: {status}<br>Details: {details if details else 'Connection OK'}")
+# 3b. Async Dashboard (ASGI profile, see core/asgi.py)
+@login_required
+@replica_reads
+async def dashboard_async(request):
+    """dashboard() with its sections queried concurrently."""
+    from .signals import adashboard_cache_version
+    user = await request.auser()
+    is_manager = await sync_to_async(rls_utils.is_manager)(user)
+    cache_key = f"dashboard_data_{user.id}_{is_manager}_{await adashboard_cache_version()}"
+    context = await cache.aget(cache_key)
+
+    if not context:
+        with timed('dashboard.context'):
+            context = await adashboard_context(request, user, is_manager, timezone.now().date())
+        await cache.aset(cache_key, context, 300)
+    return await sync_to_async(render)(request, 'admin/dashboard.html', context)
 
 # 4. Kanban Board
+# Kanban statuses for Tasks and Projects (using Project.STATUS_CHOICES)
+KANBAN_COLUMNS = {
+    'tasks': ('TODO', 'IN_PROGRESS', 'REVIEW', 'DONE'),
+    'projects': ('PLANNING', 'IN_PROGRESS', 'REVIEW', 'COMPLETED'),
+}
+
+def _kanban_board_type(board_type):
+    return 'tasks' if board_type == 'tasks' else 'projects'
+
+def _kanban_items(user, board_type):
+    if _kanban_board_type(board_type) == 'tasks':
+        return Task.with_checklist_counts(get_filtered_queryset(user, Task).select_related('project', 'assigned_to'))
+    return get_filtered_queryset(user, Project).select_related('client')
+
+def _kanban_column(user, board_type, status):
+    return list(_kanban_items(user, board_type).filter(status=status))
+
 @login_required
 def kanban_board(request):
     board_type = request.GET.get('type', 'projects') # Default to projects
-    
-    if board_type == 'tasks':
-        items = get_filtered_queryset(request.user, Task).select_related('project', 'assigned_to')
-        # Kanban statuses for Tasks
-        kanban_data = {
-            'TODO': items.filter(status='TODO'),
-            'IN_PROGRESS': items.filter(status='IN_PROGRESS'),
-            'REVIEW': items.filter(status='REVIEW'),
-            'DONE': items.filter(status='DONE'),
-        }
-    else:
-        # Projects
-        items = get_filtered_queryset(request.user, Project).select_related('client')
-        # Kanban statuses for Projects (using Project.STATUS_CHOICES)
-        kanban_data = {
-            'PLANNING': items.filter(status='PLANNING'),
-            'IN_PROGRESS': items.filter(status='IN_PROGRESS'),
-            'REVIEW': items.filter(status='REVIEW'),
-            'COMPLETED': items.filter(status='COMPLETED'),
-        }
-    
-    projects = get_filtered_queryset(request.user, Project).only('id', 'project_name')
+    items = _kanban_items(request.user, board_type)
+    kanban_data = {status: items.filter(status=status) for status in KANBAN_COLUMNS[_kanban_board_type(board_type)]}
+
     today = timezone.now().date()
     
+    # Quick-add looks projects up through /api/suggest/ instead of a full <select>
     return render(request, 'admin/kanban_board.html', {
         'kanban_data': kanban_data,
         'board_type': board_type,
-        'projects': projects,
-        'today': today
+        'today': today,
+        # Live updates (kanban_events) start from here
+        'last_event_id': board.latest_event_id(),
+    })
+
+@login_required
+async def kanban_board_async(request):
+    """kanban_board() with the columns queried concurrently."""
+    user = await request.auser()
+    board_type = request.GET.get('type', 'projects')
+    statuses = KANBAN_COLUMNS[_kanban_board_type(board_type)]
+    last_event_id, *columns = await run_concurrently(
+        (board.latest_event_id,), *((_kanban_column, user, board_type, status) for status in statuses)
+    )
+
+    return await sync_to_async(render)(request, 'admin/kanban_board.html', {
+        'kanban_data': dict(zip(statuses, columns)),
+        'board_type': board_type,
+        'today': timezone.now().date(),
+        'last_event_id': last_event_id,
     })
 
+@login_required
+async def kanban_events(request):
+    """Server-sent kanban changes for ?type=tasks|projects after Last-Event-ID / ?after= (crm.board)."""
+    user = await request.auser()
+    is_manager = await sync_to_async(rls_utils.is_manager)(user)
+    board_type = _kanban_board_type(request.GET.get('type'))
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.GET.get('after'))
+    except (TypeError, ValueError):
+        after = None
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            board.event_stream(user, is_manager, board_type, after), content_type='text/event-stream'
+        )
+    else:
+        # WSGI can't hold a worker open: answer now, EventSource reconnects after POLL_RETRY_MS
+        response = HttpResponse(
+            await board.poll(user, is_manager, board_type, after), content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @csrf_exempt
 @login_required
 def update_kanban_item(request, item_type, item_id):
@@ -307,7 +212,7 @@ def update_kanban_item(request, item_type, item_id):
             new_status = data.get('status')
             
             if item_type == 'task':
-                item = Task.objects.get(id=item_id)
+                item = Task.objects.select_related('project', 'assigned_to').get(id=item_id)
                 item.status = new_status
                 if new_status == 'DONE':
                     item.is_completed = True
@@ -315,10 +220,47 @@ def update_kanban_item(request, item_type, item_id):
                     item.is_completed = False
             else:
                 # project
-                item = Project.objects.get(id=item_id)
+                item = Project.objects.select_related('client').get(id=item_id)
                 item.status = new_status
                 
-            item.save()
+            with transaction.atomic():
+                item.save()
+                # Journal the move for other open boards (crm.board)
+                if item_type == 'task':
+                    board.record_task_event('MOVED', item, request.user)
+                else:
+                    board.record_project_event('MOVED', item, request.user)
+            return JsonResponse({'success': True})
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+    return JsonResponse({'success': False, 'error': 'Invalid request'})
+
+@csrf_exempt
+@login_required
+async def update_kanban_item_async(request, item_type, item_id):
+    """update_kanban_item() on the async ORM; the save and its journal entry share a transaction."""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            new_status = data.get('status')
+
+            user = await request.auser()
+            if item_type == 'task':
+                item = await Task.objects.select_related('project', 'assigned_to').aget(id=item_id)
+                item.status = new_status
+                item.is_completed = new_status == 'DONE'
+                record = board.record_task_event
+            else:
+                item = await Project.objects.select_related('client').aget(id=item_id)
+                item.status = new_status
+                record = board.record_project_event
+
+            @transaction.atomic
+            def save_and_record():
+                item.save()
+                record('MOVED', item, user)
+
+            await sync_to_async(save_and_record)()
             return JsonResponse({'success': True})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
@@ -338,12 +280,14 @@ def quick_add_task(request):
                 return JsonResponse({'success': False, 'error': 'Missing task name or project'})
             
             project = Project.objects.get(id=project_id)
-            task = Task.objects.create(
-                task_name=task_name,
-                project=project,
-                status=status,
-                assigned_to=request.user
-            )
+            with transaction.atomic():
+                task = Task.objects.create(
+                    task_name=task_name,
+                    project=project,
+                    status=status,
+                    assigned_to=request.user
+                )
+                board.record_task_event('ADDED', task, request.user)
             
             return JsonResponse({
                 'success': True,
@@ -356,46 +300,200 @@ def quick_add_task(request):
             return JsonResponse({'success': False, 'error': str(e)})
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
+@csrf_exempt
+@login_required
+async def quick_add_task_async(request):
+    """quick_add_task() on the async ORM; the insert and its journal entry share a transaction."""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            task_name = data.get('task_name')
+            project_id = data.get('project_id')
+            status = data.get('status', 'TODO')
+
+            if not task_name or not project_id:
+                return JsonResponse({'success': False, 'error': 'Missing task name or project'})
+
+            user = await request.auser()
+            project = await Project.objects.aget(id=project_id)
+
+            @transaction.atomic
+            def create_and_record():
+                task = Task.objects.create(
+                    task_name=task_name,
+                    project=project,
+                    status=status,
+                    assigned_to=user
+                )
+                board.record_task_event('ADDED', task, user)
+                return task
+
+            task = await sync_to_async(create_and_record)()
+
+            return JsonResponse({
+                'success': True,
+                'task_id': task.id,
+                'task_name': task.task_name,
+                'project_name': project.project_name,
+                'assigned_to': user.username
+            })
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+    return JsonResponse({'success': False, 'error': 'Invalid request'})
+
 # --- CALENDAR VIEW ---
 @login_required
 def calendar_view(request):
     return render(request, 'admin/calendar.html')
 
+def _lead_events(user):
+    """Lead Follow-ups"""
+    return [{
+        'title': f"📞 {lead.source} ({lead.get_status_display()})",
+        'start': lead.next_follow_up.isoformat(),
+        'color': '#007bff', # Blue
+        'url': f'/admin/crm/lead/{lead.id}/change/'
+    } for lead in get_filtered_queryset(user, Lead).filter(next_follow_up__isnull=False)]
+
+def _project_events(user):
+    """Project Deadlines"""
+    return [{
+        'title': f"🚀 {project.project_name}",
+        'start': project.deadline.isoformat(),
+        'color': '#dc3545', # Red
+        'url': f'/admin/crm/project/{project.id}/change/'
+    } for project in get_filtered_queryset(user, Project).filter(deadline__isnull=False)]
+
+def _task_events(user):
+    """Task Due Dates"""
+    return [{
+        'title': f"✅ {task.task_name}",
+        'start': task.due_date.isoformat(),
+        'color': '#28a745', # Green
+        'url': f'/admin/crm/project/{task.project_id}/change/' # Redirect to project for now
+    } for task in get_filtered_queryset(user, Task).filter(due_date__isnull=False)]
+
+CALENDAR_EVENT_SOURCES = (_lead_events, _project_events, _task_events)
+
 @login_required
+@replica_reads
 def calendar_events_api(request):
     events = []
+    for source in CALENDAR_EVENT_SOURCES:
+        events.extend(source(request.user))
+    return JsonResponse(events, safe=False)
+
+@login_required
+@replica_reads
+async def calendar_events_api_async(request):
+    """calendar_events_api() with the three event sources queried concurrently."""
+    user = await request.auser()
+    results = await run_concurrently(*((source, user) for source in CALENDAR_EVENT_SOURCES))
+    return JsonResponse([event for events in results for event in events], safe=False)
+
+# --- TYPEAHEAD / FUZZY NAME LOOKUP ---
+@login_required
+def suggest_api(request):
+    """Ranked name suggestions from the in-memory trigram index (crm.suggest)."""
+    from .suggest import suggest, SUGGEST_SOURCES
 
-    # 1. Lead Follow-ups
-    leads = get_filtered_queryset(request.user, Lead).filter(next_follow_up__isnull=False)
-    for lead in leads:
-        events.append({
-            'title': f"📞 {lead.source} ({lead.get_status_display()})",
-            'start': lead.next_follow_up.isoformat(),
-            'color': '#007bff', # Blue
-            'url': f'/admin/crm/lead/{lead.id}/change/'
-        })
-
-    # 2. Project Deadlines
-    projects = get_filtered_queryset(request.user, Project).filter(deadline__isnull=False)
-    for project in projects:
-        events.append({
-            'title': f"🚀 {project.project_name}",
-            'start': project.deadline.isoformat(),
-            'color': '#dc3545', # Red
-            'url': f'/admin/crm/project/{project.id}/change/'
-        })
-
-    # 3. Task Due Dates
-    tasks = get_filtered_queryset(request.user, Task).filter(due_date__isnull=False)
-    for task in tasks:
-        events.append({
-            'title': f"✅ {task.task_name}",
-            'start': task.due_date.isoformat(),
-            'color': '#28a745', # Green
-            'url': f'/admin/crm/project/{task.project.id}/change/' # Redirect to project for now
-        })
+    query = request.GET.get('q', '').strip()
+    kinds = [k for k in request.GET.get('types', '').split(',') if k in SUGGEST_SOURCES]
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    return JsonResponse({'results': suggest(query, kinds=kinds or None, limit=limit, user=request.user)})
+
+# --- PROFIT & LOSS REPORT ---
+@login_required
+@replica_reads
+def pnl_report_view(request):
+    """P&L by client/project/month over ?start=&end= (YYYY-MM or YYYY-MM-DD), as JSON or ?format=csv."""
+    from .reports import PNL_GROUPS, parse_month_range, pnl_csv, pnl_report
+
+    group_by = request.GET.get('group', 'client')
+    if group_by not in PNL_GROUPS:
+        return JsonResponse({'error': f"group must be one of {', '.join(PNL_GROUPS)}"}, status=400)
+    try:
+        start, end = parse_month_range(request.GET.get('start'), request.GET.get('end'), timezone.localdate())
+        clients = [int(v) for v in request.GET.getlist('client') if v]
+        projects = [int(v) for v in request.GET.getlist('project') if v]
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid filter: {e}'}, status=400)
+
+    report = pnl_report(request.user, start, end, group_by, clients, projects)
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(pnl_csv(report), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="pnl-{start:%Y-%m}-{end:%Y-%m}.csv"'
+        return response
+    return JsonResponse(report)
+
+# --- RECEIVABLES AGING REPORT ---
+@login_required
+@replica_reads
+def receivables_report_view(request):
+    """Clients owing more than ?min_due= (default 0), aged by last payment, as JSON or ?format=csv."""
+    from .filters import parse_min_due
+    from .reports import receivables_aging, receivables_csv
+
+    try:
+        min_due = parse_min_due(request.GET.get('min_due') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'min_due must be a finite number'}, status=400)
+
+    today = timezone.localdate()
+    report = receivables_aging(request.user, today, min_due)
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(receivables_csv(report), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="receivables-{today:%Y-%m-%d}.csv"'
+        return response
+    return JsonResponse(report)
+
+
+# --- CLIENT STATEMENT ---
+def _statement_page(request, client_id):
+    """(client, page) for the statement views; 404 outside the user's RLS scope."""
+    from django.shortcuts import get_object_or_404
+    from .statements import MAX_PAGE_SIZE, STATEMENT_PAGE_SIZE, statement_page
+
+    client = get_object_or_404(get_filtered_queryset(request.user, Client).distinct(), pk=client_id)
+    try:
+        size = min(max(int(request.GET.get('size', STATEMENT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        size = STATEMENT_PAGE_SIZE
+    return client, statement_page(client, request.GET.get('after'), size), size
+
+@login_required
+def client_statement(request, client_id):
+    """Every transaction of a client with running balances, oldest first, page by page (?after=)."""
+    try:
+        client, page, size = _statement_page(request, client_id)
+    except ValueError:
+        return redirect(request.path)
+    return render(request, 'admin/client_statement.html', {
+        'title': f'Statement - {client.name}',
+        'client': client,
+        'page': page,
+        'size': size,
+        'is_first_page': not request.GET.get('after'),
+    })
+
+@login_required
+def client_statement_api(request, client_id):
+    try:
+        client, page, size = _statement_page(request, client_id)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'client': {'id': client.id, 'name': client.name, 'total_payable': client.total_payable,
+                   'paid_amount': client.paid_amount, 'due_amount': client.due_amount},
+        **page,
+    })
 
-    return JsonResponse(events, safe=False)
 
 
 def health_check(request):